@@ -1,6 +1,5 @@
 # agents/base_agent.py
 from typing import Any, Optional
-from template_engine.jinja_engine import JinjaEngine
 
 
 class AgentError(Exception):
@@ -9,7 +8,16 @@ class AgentError(Exception):
 class BaseAgent:
     def __init__(self, llm=None):
         """
-        Every agent gets a shared LLM (optional) and a template engine.
+        Every agent gets a shared LLM (optional) and the shared,
+        precompiled template engine.
         """
         self.llm = llm
-        self.engine = JinjaEngine()
\ No newline at end of file
+        self._engine = None
+
+    @property
+    def engine(self):
+        # Loaded on first render: runs that reuse every page skip Jinja
+        if self._engine is None:
+            from template_engine.jinja_engine import get_engine
+            self._engine = get_engine()
+        return self._engine
@@ -0,0 +1,204 @@
+# agents/catalog_analytics.py
+
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from infrastructure.config import Config
+
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_price(value: Any) -> float:
+    """
+    Numeric price of a field like "₹699", "$1,299.00" or 450; NaN when
+    there is no number in it.
+    """
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value or ""))
+    if not match:
+        return math.nan
+    try:
+        return float(match.group().replace(",", ""))
+    except ValueError:
+        return math.nan
+
+
+def _items(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = [value]
+    elif not isinstance(value, (list, tuple)):
+        return []
+    return [str(item) for item in value if str(item).strip()]
+
+
+class _Column:
+    """
+    A list field of every product, flattened: value ids (one vocabulary
+    for the catalog, case-insensitive) and per-product offsets.
+    """
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.ids: List[int] = []
+        self.names: List[str] = []
+        self.offsets: List[int] = [0]
+
+    def add(self, value: Any):
+        seen = set()
+        for item in _items(value):
+            key = item.strip().lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            self.ids.append(self.vocabulary.setdefault(key, len(self.vocabulary)))
+            self.names.append(item)
+        self.offsets.append(len(self.ids))
+
+    def freeze(self):
+        self.ids = np.asarray(self.ids, dtype=np.int32)
+        self.offsets = np.asarray(self.offsets, dtype=np.int64)
+        # Products containing each value (values are unique per product)
+        self.counts = np.bincount(self.ids, minlength=len(self.vocabulary))
+
+
+class CatalogAnalytics:
+    """
+    Catalog-wide facts for the page generators, computed once per batch
+    run before any page is built.
+
+    One streaming pass collects numeric prices and the ingredient and
+    skin type columns; price percentiles, ingredient frequencies and skin
+    type coverage are then computed over whole NumPy arrays. `facts(i)`
+    only slices precomputed arrays, so a product's facts cost the same
+    whatever the catalog size.
+
+    Products are addressed by their position in the input (rejected
+    records included), as in ProductStream.
+    """
+
+    def __init__(self, products: Iterable[Optional[Dict[str, Any]]], rare_share: Optional[float] = None):
+        rare_share = Config.RARE_INGREDIENT_SHARE if rare_share is None else rare_share
+
+        prices: List[float] = []
+        valid: List[bool] = []
+        self._ingredients = _Column()
+        self._skin_types = _Column()
+        for product in products:
+            valid.append(product is not None)
+            product = product or {}
+            prices.append(parse_price(product.get("price")))
+            self._ingredients.add(product.get("key_ingredients"))
+            self._skin_types.add(product.get("skin_type"))
+
+        self.size = len(valid)
+        self.products = int(sum(valid))
+        self._ingredients.freeze()
+        self._skin_types.freeze()
+
+        # Price rank: share of catalog prices at or below each price
+        self.prices = np.asarray(prices, dtype=np.float64)
+        known = ~np.isnan(self.prices)
+        ordered = np.sort(self.prices[known])
+        self.priced = len(ordered)
+        self.price_percentiles = np.full(self.size, np.nan)
+        if self.priced:
+            ranks = np.searchsorted(ordered, self.prices[known], side="right")
+            self.price_percentiles[known] = np.round(100.0 * ranks / self.priced)
+            self.price_quartiles = np.percentile(ordered, [25, 50, 75])
+        else:
+            self.price_quartiles = np.full(3, np.nan)
+
+        # Rare ingredients: in at most `rare_share` of the products
+        column = self._ingredients
+        self._rare = column.counts[column.ids] <= rare_share * self.products
+        self.rare_ingredients = int(np.count_nonzero(column.counts <= rare_share * self.products))
+
+        # Skin type coverage: share of the products suitable for each type
+        column = self._skin_types
+        self._coverage = column.counts / self.products if self.products else column.counts.astype(float)
+
+    @classmethod
+    def from_catalog(cls, path: str, parser=None, rare_share: Optional[float] = None) -> "CatalogAnalytics":
+        """
+        Reads and parses the whole catalog once, keeping only the columns.
+        """
+        from infrastructure.ingestion import iter_raw_products
+
+        if parser is None:
+            from agents.parser_agent import ParserAgent
+            parser = ParserAgent()
+
+        def products():
+            for raw in iter_raw_products(path):
+                try:
+                    yield parser.run(raw)
+                except Exception:
+                    yield None
+
+        return cls(products(), rare_share)
+
+    def price_band(self, percentile: float) -> str:
+        if percentile <= 25:
+            return "budget"
+        if percentile > 75:
+            return "premium"
+        return "mid-range"
+
+    def facts(self, index: int) -> Dict[str, Any]:
+        """
+        Grounded facts about the product at `index`:
+
+            price_percentile      share of catalog prices at or below its price (0-100)
+            price_band            budget (bottom quarter) / mid-range / premium (top quarter)
+            catalog_median_price  median numeric price of the catalog
+            rare_ingredients      its ingredients found in few catalog products
+            skin_type_coverage    share of the catalog suitable for each of its skin types
+        """
+        percentile = self.price_percentiles[index]
+        median = self.price_quartiles[1]
+
+        column = self._ingredients
+        lo, hi = column.offsets[index], column.offsets[index + 1]
+        rare = [column.names[j] for j in np.flatnonzero(self._rare[lo:hi]) + lo]
+
+        column = self._skin_types
+        lo, hi = column.offsets[index], column.offsets[index + 1]
+        coverage = {
+            column.names[j]: round(float(self._coverage[column.ids[j]]), 2) for j in range(lo, hi)
+        }
+
+        known = not np.isnan(percentile)
+        return {
+            "price_percentile": int(percentile) if known else None,
+            "price_band": self.price_band(percentile) if known else None,
+            "catalog_median_price": None if np.isnan(median) else round(float(median), 2),
+            "rare_ingredients": rare,
+            "skin_type_coverage": coverage,
+        }
+
+    def grounding(self, index: int) -> Dict[str, Any]:
+        """
+        The facts pages show and are fingerprinted with: the price band and
+        the rare ingredients. Unlike percentiles, the median or coverage,
+        they only change when the product itself changes or another price
+        or ingredient crosses a band / rarity threshold, so editing one
+        product does not regenerate the rest of the catalog.
+        """
+        facts = self.facts(index)
+        return {"price_band": facts["price_band"], "rare_ingredients": facts["rare_ingredients"]}
+
+    def print_summary(self):
+        median = self.price_quartiles[1]
+        price = "n/a" if np.isnan(median) else f"{median:g}"
+        print(
+            f"📊 Catalog analytics: {self.products} products, {self.priced} priced "
+            f"(median {price}), {len(self._ingredients.vocabulary)} ingredients "
+            f"({self.rare_ingredients} rare), {len(self._skin_types.vocabulary)} skin types"
+        )
+
@@ -1,8 +1,19 @@
 # agents/comparison_page_agent.py
 
 import json
-from typing import Dict, Any, List
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
 from agents.base_agent import BaseAgent, AgentError
+from agents.product_record import Product
+
+
+# CatalogAnalytics price bands, cheapest first
+PRICE_BANDS = ("budget", "mid-range", "premium")
+
+
+def _normalize(name: Any) -> str:
+    # Ingredient names compare as in CatalogAnalytics
+    return str(name).strip().lower()
 
 
 class ComparisonPageAgent(BaseAgent):
@@ -10,7 +21,7 @@ class ComparisonPageAgent(BaseAgent):
     Generates a professional comparison JSON between two products.
     """
 
-    def _key_differences(self, a: Dict[str, Any], b: Dict[str, Any]) -> List[str]:
+    def _key_differences(self, a: Product, b: Product) -> List[str]:
         diffs = []
 
         if a.get("price") != b.get("price"):
@@ -19,26 +30,57 @@ class ComparisonPageAgent(BaseAgent):
                 f"while {b.get('product_name')} costs {b.get('price')}."
             )
 
-        a_ing = set(a.get("key_ingredients", []))
-        b_ing = set(b.get("key_ingredients", []))
-
-        if a_ing - b_ing:
+        if a.has_unique_ingredients(b):
             diffs.append(f"{a.get('product_name')} contains unique ingredients not found in the other product.")
-        if b_ing - a_ing:
+        if b.has_unique_ingredients(a):
             diffs.append(f"{b.get('product_name')} contains ingredients not present in the other product.")
 
         return diffs
 
-    def _summary(self, a: Dict[str, Any], b: Dict[str, Any]) -> str:
-        return (
-            f"{a.get('product_name')} and {b.get('product_name')} are comparable products "
-            "with overlapping ingredients and benefits. The final choice depends on "
-            "pricing preferences and formulation differences."
-        )
+    def _summary(self, a: Product, b: Product, facts_a: Optional[Dict[str, Any]] = None,
+                 facts_b: Optional[Dict[str, Any]] = None) -> str:
+        name_a, name_b = a.get("product_name"), b.get("product_name")
+        if not (facts_a and facts_b):
+            return (
+                f"{name_a} and {name_b} are comparable products "
+                "with overlapping ingredients and benefits. The final choice depends on "
+                "pricing preferences and formulation differences."
+            )
+
+        # Grounded in catalog-wide facts (CatalogAnalytics)
+        sentences = []
+        band_a, band_b = facts_a.get("price_band"), facts_b.get("price_band")
+        if band_a in PRICE_BANDS and band_b in PRICE_BANDS:
+            if band_a == band_b:
+                sentences.append(f"{name_a} and {name_b} are both {band_a} products of the catalog.")
+            else:
+                cheaper = name_a if PRICE_BANDS.index(band_a) < PRICE_BANDS.index(band_b) else name_b
+                sentences.append(
+                    f"{name_a} is a {band_a} product of the catalog and {name_b} a {band_b} one, "
+                    f"so {cheaper} is the more affordable choice."
+                )
+        else:
+            sentences.append(f"{name_a} and {name_b} are comparable products.")
+
+        for name, facts, other in ((name_a, facts_a, b), (name_b, facts_b, a)):
+            theirs = {_normalize(i) for i in other.key_ingredients}
+            rare = [i for i in facts.get("rare_ingredients", []) if _normalize(i) not in theirs]
+            if rare:
+                sentences.append(
+                    f"{name} stands out with {', '.join(rare)}, found in few products of the catalog."
+                )
+
+        sentences.append("The final choice depends on pricing preferences and formulation differences.")
+        return " ".join(sentences)
 
-    def run(self, product_a: Dict[str, Any], product_b: Dict[str, Any], template_path: str):
-        a_ing = product_a.get("key_ingredients", [])
-        b_ing = product_b.get("key_ingredients", [])
+    def run(self, product_a: Mapping, product_b: Mapping, template_path: str,
+            facts_a: Optional[Dict[str, Any]] = None, facts_b: Optional[Dict[str, Any]] = None):
+        """
+        `facts_a` / `facts_b` (CatalogAnalytics.facts) ground the summary in
+        the catalog: price percentiles and rare ingredients.
+        """
+        product_a, product_b = Product.coerce(product_a), Product.coerce(product_b)
+        a_ing, b_ing = product_a.key_ingredients, product_b.key_ingredients
 
         context = {
             "product_a": {
@@ -56,9 +98,10 @@ class ComparisonPageAgent(BaseAgent):
             "comparison": {
                 "price_difference": "Same price" if product_a.get("price") == product_b.get("price")
                 else f"{product_a.get('price')} vs {product_b.get('price')}",
-                "shared_ingredients": list(set(a_ing) & set(b_ing)),
+                # Keep product A's ordering so pages are reproducible
+                "shared_ingredients": product_a.shared_ingredients(product_b),
                 "key_differences": self._key_differences(product_a, product_b),
-                "overall_summary": self._summary(product_a, product_b)
+                "overall_summary": self._summary(product_a, product_b, facts_a, facts_b)
             }
         }
 
@@ -1,39 +1,420 @@
 # agents/faq_page_agent.py
 
-import json
+import asyncio
+import threading
+from typing import Any, Generator, List, Optional
+
 from agents.base_agent import BaseAgent
+from agents.faq_reuse import FAQReuse
+from agents.prompt_builder import PromptBuilder, estimate_tokens
 from infrastructure.config import Config
+from infrastructure.instrumentation import METRICS
+from infrastructure.json_extract import JSONItemStream, extract_json
+
+# Starting estimate of the completion tokens of one FAQ item; refined from
+# the responses actually received.
+FAQ_ITEM_TOKENS = 24
+
+
+class FAQList(list):
+    """
+    FAQ items. `degraded` is set when a model request failed and
+    fallback FAQs filled the gap, so checkpointed runs can retry them.
+    """
+    degraded = False
 
 
 class FAQAgent(BaseAgent):
     """
     Generates ≥15 professional FAQs.
+
+    `generate_faq_batch` packs several products into one request and
+    reads back a JSON object keyed by product, which saves the fixed
+    prompt and round-trip cost of one request per product.
+
+    Responses are read with extract_json, so items from fenced, sloppy or
+    truncated output are kept; only the missing items are asked for again.
+    Single-product answers are streamed and cut off at MIN_QUESTIONS items.
+
+    With a FAQReuse, products that are near-identical to one already
+    generated (or to another product of the same call) get its FAQs,
+    renamed, without a model request.
     """
 
-    def generate_faq(self, product: dict):
-        prompt = (
-            "Generate EXACTLY 15 FAQs in JSON.\n"
-            "Return ONLY a JSON array.\n"
-            "Each item must contain: category, question.\n\n"
-            f"Product Name: {product.get('product_name')}\n"
-            f"Key Ingredients: {product.get('key_ingredients', [])}\n"
-            f"Benefits: {product.get('benefits', [])}\n"
-            f"Usage: {product.get('how_to_use', '')}\n"
-        )
+    def __init__(self, llm=None, prompts: Optional[PromptBuilder] = None,
+                 reuse: Optional[FAQReuse] = None):
+        super().__init__(llm)
+        self.prompts = prompts or PromptBuilder()
+        self.reuse = reuse
+        # Shared by the batches of concurrent workers
+        self.item_tokens = float(FAQ_ITEM_TOKENS)
+        self._estimate_lock = threading.Lock()
+
+    @staticmethod
+    def _faq_items(value: Any) -> List[dict]:
+        """
+        Well-formed FAQ items only, without repeated questions.
+        """
+        items, seen = [], set()
+        for item in value if isinstance(value, list) else []:
+            if not isinstance(item, dict) or not isinstance(item.get("question"), str):
+                continue
+            question = item["question"].strip()
+            if question and question.lower() not in seen:
+                seen.add(question.lower())
+                items.append({"category": str(item.get("category") or "General"), "question": question})
+        return items
+
+    # ===================== LLM I/O =====================
+    #
+    # The FAQ flows below are generators: they yield what they need from
+    # the model and get the answer sent back, so the same logic runs on
+    # threads (_drive) and on an event loop (_adrive). Requests are
+    #   ("items", prompt, want)    -> FAQ items (streamed, see _ask_items)
+    #   ("text", prompt, max_tokens) -> raw completion text
+    #   ("wait", future)           -> its result (FAQs of a near-duplicate)
+    # A failed request is thrown into the flow.
+
+    def _reject(self, prompt: str, extraction, max_tokens: Optional[int] = None):
+        # A truncated or unreadable answer is dropped from the LLM cache,
+        # so the next run asks again instead of replaying it
+        forget = getattr(self.llm, "forget", None)
+        if forget is not None and not extraction.complete:
+            forget(prompt, max_tokens)
+        return extraction
+
+    def _ask_items(self, prompt: str, want: int) -> List[dict]:
+        """
+        FAQ items from a prompt answered with a JSON array. With
+        LLM_STREAMING the array is parsed as it arrives and the generation
+        is stopped as soon as `want` valid items are in hand.
+        """
+        if not Config.LLM_STREAMING:
+            return self._faq_items(self._reject(prompt, extract_json(self.llm.run(prompt))).items)
 
+        reader = JSONItemStream()
+        chunks = self.llm.stream(prompt)
         try:
-            raw = self.llm.run(prompt)
-            data = json.loads(raw)
-            if isinstance(data, list) and len(data) >= Config.MIN_QUESTIONS:
-                return data[: Config.MIN_QUESTIONS]
-        except Exception:
-            pass
+            for chunk in chunks:
+                if reader.feed(chunk) and len(self._faq_items(reader.items)) >= want:
+                    METRICS.incr("llm_early_stops_total")
+                    return self._faq_items(reader.items)
+        finally:
+            chunks.close()
+        return self._faq_items(self._reject(prompt, reader.close()).items)
+
+    async def _aask_items(self, prompt: str, want: int) -> List[dict]:
+        if not Config.LLM_STREAMING:
+            return self._faq_items(self._reject(prompt, extract_json(await self.llm.ainvoke(prompt))).items)
+
+        reader = JSONItemStream()
+        chunks = self.llm.astream(prompt)
+        try:
+            async for chunk in chunks:
+                if reader.feed(chunk) and len(self._faq_items(reader.items)) >= want:
+                    METRICS.incr("llm_early_stops_total")
+                    return self._faq_items(reader.items)
+        finally:
+            await chunks.aclose()
+        return self._faq_items(self._reject(prompt, reader.close()).items)
+
+    def _drive(self, flow: Generator):
+        reply, error = None, None
+        while True:
+            try:
+                request = flow.throw(error) if error else flow.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply, error = None, None
+            try:
+                if request[0] == "items":
+                    reply = self._ask_items(request[1], request[2])
+                elif request[0] == "wait":
+                    reply = request[1].result()
+                else:
+                    reply = self.llm.run(request[1], max_tokens=request[2])
+            except Exception as e:
+                error = e
+
+    async def _adrive(self, flow: Generator):
+        reply, error = None, None
+        while True:
+            try:
+                request = flow.throw(error) if error else flow.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply, error = None, None
+            try:
+                if request[0] == "items":
+                    reply = await self._aask_items(request[1], request[2])
+                elif request[0] == "wait":
+                    reply = await asyncio.wrap_future(request[1])
+                else:
+                    reply = await self.llm.ainvoke(request[1], max_tokens=request[2])
+            except Exception as e:
+                error = e
+
+    # ===================== SINGLE PRODUCT =====================
+
+    def _more_faqs(self, product: dict, have: List[dict], facts: Optional[dict] = None) -> Generator:
+        missing = Config.MIN_QUESTIONS - len(have)
+        prompt = self.prompts.more_faqs(product, missing, [item["question"] for item in have], facts)
+        return (yield ("items", prompt, missing))
+
+    def _complete_faqs(self, product: dict, items: List[dict], span: dict,
+                       failed: bool = False, facts: Optional[dict] = None) -> Generator:
+        """
+        Tops up a short FAQ list with a request for the missing items only;
+        whatever is still missing comes from the deterministic fallback.
+        `failed` tells that an earlier request for these items failed.
+        """
+        if items and len(items) < Config.MIN_QUESTIONS:
+            span["topped_up"] = Config.MIN_QUESTIONS - len(items)
+            METRICS.incr("faq_topups_total")
+            try:
+                more = yield from self._more_faqs(product, items, facts)
+            except Exception:
+                more, failed = [], True
+            items = self._faq_items(items + more)
+
+        result = FAQList(items[: Config.MIN_QUESTIONS])
+        if len(items) < Config.MIN_QUESTIONS:
+            span["fallback"] = 1
+            METRICS.incr("faq_fallbacks_total")
+            result = FAQList(self._faq_items(items + self.fallback_faq(product, facts))[: Config.MIN_QUESTIONS])
+            result.degraded = failed
+        return result
+
+    def _faq_flow(self, product: dict, facts: Optional[dict] = None) -> Generator:
+        prompt = self.prompts.faq(product, Config.MIN_QUESTIONS, facts)
+
+        with METRICS.stage("faq.generate") as span:
+            failed = False
+            try:
+                items = yield ("items", prompt, Config.MIN_QUESTIONS)
+            except Exception:
+                items, failed = [], True
+            return (yield from self._complete_faqs(product, items, span, failed, facts))
+
+    def generate_faq(self, product: dict, facts: Optional[dict] = None):
+        """
+        `facts` (CatalogAnalytics.facts) are added to the prompt and the
+        fallback questions.
+        """
+        if self.reuse is not None:
+            return self._drive(self._reuse_flow([product], [facts]))[0]
+        return self._drive(self._faq_flow(product, facts))
+
+    async def agenerate_faq(self, product: dict, facts: Optional[dict] = None):
+        if self.reuse is not None:
+            return (await self._adrive(self._reuse_flow([product], [facts])))[0]
+        return await self._adrive(self._faq_flow(product, facts))
 
+    # ===================== REUSE =====================
+
+    def _reuse_flow(self, products: List[dict], facts: List[Optional[dict]]) -> Generator:
+        """
+        FAQs of `products`, generated only for those without a
+        near-duplicate (see FAQReuse). Leaders are generated and resolved
+        before this flow waits for anyone else's.
+        """
+        plan = self.reuse.plan(products, facts)
+        results: List[Optional[List[dict]]] = [None] * len(products)
+        for i, items in plan.reused.items():
+            results[i] = FAQList(items)
+
+        todo = [i for i in range(len(products)) if results[i] is None and i not in plan.waits]
+        try:
+            generated = yield from self._generate_flow([products[i] for i in todo], [facts[i] for i in todo])
+            for i, items in zip(todo, generated):
+                results[i] = items
+                if i in plan.leaders:
+                    # Fallback FAQs are retried later; they are not worth copying
+                    self.reuse.resolve(plan.leaders[i], None if items.degraded else items)
+        finally:
+            for entry in plan.leaders.values():
+                self.reuse.resolve(entry, None)
+
+        orphans = []
+        for i, entry in plan.waits.items():
+            faqs = entry.faqs.result() if entry.faqs.done() else (yield ("wait", entry.faqs))
+            if faqs:
+                results[i] = FAQList(self.reuse.adapt(faqs, entry.name, str(products[i].get("product_name") or "")))
+            else:
+                orphans.append(i)
+        if orphans:
+            # Their near-duplicate failed: generate them after all
+            generated = yield from self._generate_flow([products[i] for i in orphans], [facts[i] for i in orphans])
+            for i, items in zip(orphans, generated):
+                results[i] = items
+                if not items.degraded:
+                    self.reuse.add(plan.keys[i], products[i], items)
+
+        skipped = [i for i in range(len(products)) if i not in todo and i not in orphans]
+        if skipped:
+            def requests(positions):
+                return len(self.plan_batches([products[i] for i in positions], [facts[i] for i in positions]))
+
+            tokens = sum(
+                estimate_tokens(self.prompts.product_block(products[i], facts[i])) + self._completion_estimate()
+                for i in skipped
+            )
+            saved = max(0, requests(range(len(products))) - requests(todo) - requests(orphans))
+            self.reuse.record(len(skipped), saved, tokens)
+        return results
+
+    # ===================== BATCHED =====================
+
+    def _learn_item_tokens(self, raw: str, products: int, received: int, complete: bool):
+        """
+        Refines the per-item completion estimate from one batch response.
+        """
+        with self._estimate_lock:
+            if not complete:
+                # Usually a truncated completion: plan later batches with a
+                # larger per-item estimate
+                cut = len(raw) / 4 / products / Config.MIN_QUESTIONS
+                self.item_tokens = max(self.item_tokens, 1.25 * cut)
+            elif received:
+                observed = len(raw) / 4 / received
+                self.item_tokens = 0.8 * self.item_tokens + 0.2 * observed
+
+    def _completion_estimate(self) -> int:
+        # FAQ items plus the key and brackets of the product entry
+        return int(Config.MIN_QUESTIONS * self.item_tokens) + 8
+
+    def plan_batches(self, products: List[dict], facts: Optional[List[Optional[dict]]] = None) -> List[List[int]]:
+        """
+        Splits product positions into batches that respect FAQ_BATCH_SIZE,
+        the completion budget (FAQ_BATCH_MAX_TOKENS) and the context window.
+        """
+        per_product = self._completion_estimate()
+        batches: List[List[int]] = []
+        current: List[int] = []
+        overhead = self.prompts.batch_overhead(Config.MIN_QUESTIONS)
+        prompt_tokens, completion_tokens = overhead, 0
+
+        for i, product in enumerate(products):
+            block = estimate_tokens(self.prompts.product_block(product, facts[i] if facts else None)) + 4
+            full = current and (
+                len(current) >= Config.FAQ_BATCH_SIZE
+                or completion_tokens + per_product > Config.FAQ_BATCH_MAX_TOKENS
+                or prompt_tokens + block + completion_tokens + per_product > Config.LLM_CONTEXT_TOKENS
+            )
+            if full:
+                batches.append(current)
+                current, prompt_tokens, completion_tokens = [], overhead, 0
+            current.append(i)
+            prompt_tokens += block
+            completion_tokens += per_product
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def generate_faq_batch(self, products: List[dict],
+                           facts: Optional[List[Optional[dict]]] = None) -> List[List[dict]]:
+        """
+        FAQs for several products, in input order, with as few requests
+        as the token budgets allow. A batch whose response cannot be read
+        at all is split in half; a failed request is not (it would only
+        multiply requests to a struggling provider), its products get
+        degraded fallback FAQs that checkpointed runs retry; products missing from a readable response
+        are asked for again as a smaller batch, and short FAQ lists are
+        topped up with their missing items only. `facts` are per product,
+        as in generate_faq.
+        """
+        return self._drive(self._batch_flow(products, facts))
+
+    async def agenerate_faq_batch(self, products: List[dict],
+                                  facts: Optional[List[Optional[dict]]] = None) -> List[List[dict]]:
+        return await self._adrive(self._batch_flow(products, facts))
+
+    def _batch_flow(self, products: List[dict], facts: Optional[List[Optional[dict]]] = None) -> Generator:
+        facts = facts or [None] * len(products)
+        if self.reuse is not None:
+            return (yield from self._reuse_flow(products, facts))
+        return (yield from self._generate_flow(products, facts))
+
+    def _generate_flow(self, products: List[dict], facts: List[Optional[dict]]) -> Generator:
+        results: List[Optional[List[dict]]] = [None] * len(products)
+        for batch in self.plan_batches(products, facts):
+            yield from self._run_batch(batch, products, results, facts)
+        return results
+
+    def _run_batch(self, batch: List[int], products: List[dict], results: list,
+                   facts: List[Optional[dict]]) -> Generator:
+        if len(batch) == 1:
+            results[batch[0]] = yield from self._faq_flow(products[batch[0]], facts[batch[0]])
+            return
+
+        keys = [f"p{n + 1}" for n in range(len(batch))]
+        prompt = self.prompts.batch(
+            keys, [products[i] for i in batch], Config.MIN_QUESTIONS, [facts[i] for i in batch]
+        )
+
+        with METRICS.stage("faq.batch", products=len(batch)) as span:
+            try:
+                raw = yield ("text", prompt, Config.FAQ_BATCH_MAX_TOKENS)
+            except Exception:
+                # No answer at all (transport, rate limit): same as a failed
+                # single-product request
+                span["error"] = True
+                for i in batch:
+                    results[i] = yield from self._complete_faqs(products[i], [], span, True, facts[i])
+                return
+            extraction = self._reject(prompt, extract_json(raw, dict), Config.FAQ_BATCH_MAX_TOKENS)
+
+            received = 0
+            if extraction.ok:
+                for key, i in zip(keys, batch):
+                    results[i] = self._faq_items(extraction.value.get(key))
+                    received += len(results[i])
+            if raw:
+                self._learn_item_tokens(raw, len(batch), received, extraction.complete)
+            if not extraction.ok:
+                span["split"] = 1
+                METRICS.incr("faq_batch_splits_total")
+
+        if not extraction.ok:
+            # Nothing readable: retry as two smaller batches
+            middle = len(batch) // 2
+            yield from self._run_batch(batch[:middle], products, results, facts)
+            yield from self._run_batch(batch[middle:], products, results, facts)
+            return
+
+        # Ask again only for what is missing: absent products as a smaller
+        # batch, short FAQ lists for their missing items
+        absent = [i for i in batch if not results[i]]
+        if absent and len(absent) < len(batch):
+            yield from self._run_batch(absent, products, results, facts)
+        else:
+            for i in absent:
+                results[i] = yield from self._faq_flow(products[i], facts[i])
+
+        for i in batch:
+            if len(results[i]) < Config.MIN_QUESTIONS:
+                with METRICS.stage("faq.generate") as span:
+                    results[i] = yield from self._complete_faqs(
+                        products[i], results[i], span, facts=facts[i]
+                    )
+            else:
+                results[i] = FAQList(results[i][: Config.MIN_QUESTIONS])
+
+    def fallback_faq(self, product: dict, facts: Optional[dict] = None) -> List[dict]:
         # -----------------------------
         # High-quality deterministic fallback
         # -----------------------------
         name = product.get("product_name", "this product")
 
+        # Grounded in the catalog when its facts are known
+        value = f"Is {name} value for money?"
+        different = f"What makes {name} different from similar products?"
+        if facts and facts.get("price_band"):
+            value = f"Is {name} value for money as a {facts['price_band']} product?"
+        if facts and facts.get("rare_ingredients"):
+            different = f"What does {facts['rare_ingredients'][0]} add to {name}, compared with similar products?"
+
         return [
             {"category": "Usage", "question": f"How should I use {name}?"},
             {"category": "Usage", "question": f"How often can {name} be applied?"},
@@ -44,12 +425,12 @@ class FAQAgent(BaseAgent):
             {"category": "Benefits", "question": f"What benefits does {name} provide?"},
             {"category": "Benefits", "question": f"When will results be visible with {name}?"},
             {"category": "Pricing", "question": f"What is the price of {name}?"},
-            {"category": "Pricing", "question": f"Is {name} value for money?"},
+            {"category": "Pricing", "question": value},
             {"category": "General", "question": f"Who should use {name}?"},
             {"category": "General", "question": f"Can {name} be used with other skincare products?"},
             {"category": "General", "question": f"Is {name} dermatologist tested?"},
             {"category": "General", "question": f"How should {name} be stored?"},
-            {"category": "General", "question": f"What makes {name} different from similar products?"},
+            {"category": "General", "question": different},
         ]
 
     def render_faq_page(self, product, questions, template_path):
@@ -0,0 +1,268 @@
+# agents/faq_reuse.py
+
+import hashlib
+import random
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from infrastructure.config import Config
+from infrastructure.instrumentation import METRICS
+
+# Fields the FAQ prompt is built from, apart from the name (see PromptBuilder)
+SHINGLE_FIELDS = (
+    ("ing", "key_ingredients"),
+    ("ben", "benefits"),
+)
+TEXT_FIELDS = (
+    ("use", "how_to_use"),
+)
+
+# Words per shingle of free-text fields
+SHINGLE_WORDS = 3
+
+# Mersenne prime for the MinHash permutations (hashes are 61-bit)
+_PRIME = (1 << 61) - 1
+
+_NON_WORD = re.compile(r"[^\w%]+")
+
+
+def normalize(text: Any) -> str:
+    """
+    Lowercase words of `text`, without punctuation or repeated spaces.
+    """
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def shingles(product: Dict[str, Any]) -> frozenset:
+    """
+    Hashed shingles of the product fields an FAQ depends on: every
+    ingredient and benefit as one item, and runs of SHINGLE_WORDS words
+    of the usage text. The product name is left out, so variants that
+    differ only in their name (size, shade) get the same set.
+    """
+    items = set()
+    for prefix, field in SHINGLE_FIELDS:
+        values = product.get(field) or ()
+        if isinstance(values, str):
+            values = (values,)
+        for value in values:
+            value = normalize(value)
+            if value:
+                items.add(f"{prefix}:{value}")
+    for prefix, field in TEXT_FIELDS:
+        words = normalize(product.get(field) or "").split()
+        for start in range(max(1, len(words) - SHINGLE_WORDS + 1)):
+            run = " ".join(words[start:start + SHINGLE_WORDS])
+            if run:
+                items.add(f"{prefix}:{run}")
+    return frozenset(
+        int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big") & _PRIME
+        for item in items
+    )
+
+
+class _Key(NamedTuple):
+    shingles: frozenset
+    bands: Tuple[Tuple[int, ...], ...]
+    # Products in different price bands get different prompts (catalog facts)
+    price_band: Optional[str]
+
+
+class _Entry(NamedTuple):
+    key: _Key
+    name: str
+    # Resolved with the FAQs, or None when the product's generation failed
+    faqs: Future
+
+
+class ReusePlan(NamedTuple):
+    """
+    The products of one FAQ call (see FAQReuse.plan), by position.
+    """
+    keys: List[Optional[_Key]]
+    # FAQs adapted from a product generated earlier
+    reused: Dict[int, List[dict]]
+    # Near-duplicates of a product being generated (possibly in this call)
+    waits: Dict[int, _Entry]
+    # Products to generate, that others may wait for
+    leaders: Dict[int, _Entry]
+
+
+class FAQReuse:
+    """
+    Reuses the FAQs of near-identical products (variants that differ in
+    size or shade only) instead of asking the model again.
+
+    Products are compared on the shingles of the fields their FAQ prompt
+    is built from. MinHash signatures of `permutations` hashes, split into
+    `bands` LSH bands, find candidates without comparing every pair; a
+    candidate is a match when the exact Jaccard similarity of the
+    shingles reaches `threshold` and both have the same price band. The
+    match's FAQs are adapted by replacing its name with the product's.
+
+    A product enters the index as soon as its generation starts, so a
+    variant arriving meanwhile waits for it rather than asking the model
+    too. Products that only generate never wait, so waits cannot cycle.
+
+    The `capacity` most recent products are kept, so memory does not grow
+    with the catalog; variants are usually listed together.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, permutations: Optional[int] = None,
+                 bands: Optional[int] = None, capacity: Optional[int] = None, seed: int = 1):
+        self.threshold = Config.FAQ_REUSE_THRESHOLD if threshold is None else threshold
+        permutations = permutations or Config.FAQ_REUSE_PERMUTATIONS
+        self.bands = max(1, min(bands or Config.FAQ_REUSE_BANDS, permutations))
+        self.rows = permutations // self.bands
+        self.capacity = capacity or Config.FAQ_REUSE_CAPACITY
+
+        rng = random.Random(seed)
+        self._hashes = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(self.bands * self.rows)
+        ]
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+            self._ids: Dict[int, int] = {}
+            self._buckets: Dict[Tuple[int, Tuple[int, ...]], set] = {}
+            self._next = 0
+            self.reused = 0
+            self.requests_saved = 0
+            self.tokens_saved = 0
+
+    # ===================== KEYS =====================
+
+    def key(self, product: Dict[str, Any], facts: Optional[Dict[str, Any]] = None) -> Optional[_Key]:
+        """
+        Reuse key of a product; None when it has no fields to compare.
+        """
+        items = shingles(product)
+        if not items:
+            return None
+        signature = [min((a * x + b) % _PRIME for x in items) for a, b in self._hashes]
+        bands = tuple(
+            tuple(signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)
+        )
+        return _Key(items, bands, (facts or {}).get("price_band"))
+
+    def similarity(self, a: _Key, b: _Key) -> float:
+        if a.price_band != b.price_band:
+            return 0.0
+        return len(a.shingles & b.shingles) / len(a.shingles | b.shingles)
+
+    # ===================== INDEX =====================
+
+    def _lookup(self, key: _Key) -> Optional[_Entry]:
+        # The most similar product at or above the threshold (lock held)
+        candidates = set()
+        for band, rows in enumerate(key.bands):
+            candidates.update(self._buckets.get((band, rows), ()))
+        best, best_score = None, self.threshold
+        for ident in sorted(candidates):
+            entry = self._entries[ident]
+            score = self.similarity(key, entry.key)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _insert(self, entry: _Entry):
+        # Lock held
+        ident, self._next = self._next, self._next + 1
+        self._entries[ident] = entry
+        self._ids[id(entry)] = ident
+        for band, rows in enumerate(entry.key.bands):
+            self._buckets.setdefault((band, rows), set()).add(ident)
+        while len(self._entries) > self.capacity:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, ident: int):
+        # Lock held
+        entry = self._entries.pop(ident)
+        del self._ids[id(entry)]
+        for band, rows in enumerate(entry.key.bands):
+            bucket = self._buckets[(band, rows)]
+            bucket.discard(ident)
+            if not bucket:
+                del self._buckets[(band, rows)]
+
+    def add(self, key: Optional[_Key], product: Dict[str, Any], faqs: List[dict]):
+        """
+        Makes a product's generated FAQs available to its near-duplicates.
+        """
+        if key is None or not faqs:
+            return
+        future: Future = Future()
+        future.set_result([dict(item) for item in faqs])
+        with self._lock:
+            self._insert(_Entry(key, str(product.get("product_name") or ""), future))
+
+    def resolve(self, entry: _Entry, faqs: Optional[List[dict]]):
+        """
+        Completes a leader of `plan` with its FAQs, or with None when they
+        are not worth copying (failed, fallback). Resolving twice is a no-op.
+        """
+        if entry.faqs.done():
+            return
+        if not faqs:
+            with self._lock:
+                ident = self._ids.get(id(entry))
+                if ident is not None:
+                    self._remove(ident)
+            entry.faqs.set_result(None)
+            return
+        entry.faqs.set_result([dict(item) for item in faqs])
+
+    # ===================== REUSE =====================
+
+    @staticmethod
+    def adapt(faqs: List[dict], name: str, new_name: str) -> List[dict]:
+        """
+        FAQ items with every mention of `name` replaced by `new_name`.
+        """
+        if not name or name == new_name:
+            return [dict(item) for item in faqs]
+        pattern = re.compile(re.escape(name), re.IGNORECASE)
+        return [
+            {**item, "question": pattern.sub(lambda _: new_name, item["question"])}
+            for item in faqs
+        ]
+
+    def plan(self, products: Sequence[Dict[str, Any]], facts: Sequence[Optional[Dict[str, Any]]]) -> ReusePlan:
+        """
+        Sorts the products of one FAQ call. Products in none of `reused`,
+        `waits` and `leaders` (nothing to compare) just need the model.
+        Every leader must be resolved, whatever happens to the call.
+        """
+        plan = ReusePlan([self.key(product, product_facts) for product, product_facts in zip(products, facts)], {}, {}, {})
+        with self._lock:
+            for i, key in enumerate(plan.keys):
+                if key is None:
+                    continue
+                name = str(products[i].get("product_name") or "")
+                entry = self._lookup(key)
+                if entry is None:
+                    plan.leaders[i] = _Entry(key, name, Future())
+                    self._insert(plan.leaders[i])
+                elif entry.faqs.done():
+                    plan.reused[i] = self.adapt(entry.faqs.result(), entry.name, name)
+                else:
+                    plan.waits[i] = entry
+        return plan
+
+    def record(self, products: int, requests: int, tokens: int):
+        with self._lock:
+            self.reused += products
+            self.requests_saved += requests
+            self.tokens_saved += tokens
+        METRICS.incr("faq_reused_total", products)
+        METRICS.incr("faq_requests_saved_total", requests)
+        METRICS.incr("faq_tokens_saved_total", tokens)
@@ -1,8 +1,8 @@
 # agents/product_page_agent.py
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from agents.base_agent import BaseAgent, AgentError
-from template_engine.jinja_engine import JinjaEngine
+from template_engine.schema import TemplateValidationError
 
 
 class ProductPageAgent(BaseAgent):
@@ -10,11 +10,8 @@ class ProductPageAgent(BaseAgent):
     Renders a clean product page JSON using Jinja.
     """
 
-    def __init__(self, llm=None):
-        super().__init__(llm)
-        self.engine = JinjaEngine()
-
-    def run(self, product: Dict[str, Any], template_path: str) -> str:
+    def run(self, product: Dict[str, Any], template_path: str,
+            facts: Optional[Dict[str, Any]] = None) -> str:
         try:
             context = {
                 "product_name": product.get("product_name", ""),
@@ -25,10 +22,15 @@ class ProductPageAgent(BaseAgent):
                     "skin_type": product.get("skin_type", []),
                     "side_effects": product.get("side_effects", "")
                 },
-                "pricing": product.get("price", "")
+                "pricing": product.get("price", ""),
+                # Catalog facts (CatalogAnalytics), batch runs only
+                "market_position": facts
             }
 
             return self.engine.render_template_file(template_path, context)
 
+        except TemplateValidationError:
+            # Kept as is, for the batch validation summary
+            raise
         except Exception as e:
             raise AgentError(f"ProductPageAgent error: {e}")
@@ -0,0 +1,308 @@
+# agents/product_record.py
+
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+FIELDS = (
+    "product_name", "concentration", "skin_type", "key_ingredients",
+    "benefits", "how_to_use", "side_effects", "price",
+)
+
+# Fields kept by the comparison cards of a batch run
+COMPARISON_FIELDS = ("product_name", "price", "key_ingredients", "benefits", "skin_type")
+
+_FIELD_SET = frozenset(FIELDS)
+
+# Values one vocabulary may hold before new products start a fresh set.
+# Ids are stored as unsigned 16-bit integers, so this must stay <= 65536.
+MAX_VOCABULARY = 16384
+
+
+class Vocabulary:
+    """
+    Interns the values of one field to dense integer ids.
+
+    Ids are only meaningful inside one process; products sent to another
+    process are rebuilt there (see Product.__reduce__).
+    """
+
+    def __init__(self):
+        self._ids: Dict[Any, int] = {}
+        self._values: List[Any] = []
+        self._lock = threading.Lock()
+
+    def id(self, value: Any) -> int:
+        ident = self._ids.get(value)
+        if ident is None:
+            with self._lock:
+                ident = self._ids.get(value)
+                if ident is None:
+                    ident = len(self._values)
+                    self._values.append(value)
+                    self._ids[value] = ident
+        return ident
+
+    def find(self, value: Any) -> Optional[int]:
+        """
+        The id of a value already interned, without adding it.
+        """
+        return self._ids.get(value)
+
+    def value(self, ident: int) -> Any:
+        return self._values[ident]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class Vocabularies:
+    """
+    The interners of one generation of products. Ids of two products are
+    comparable only when they share a generation.
+
+    A generation lives as long as products built in it: a batch run
+    starts one per catalog (`new_vocabularies`), and a long-running
+    service starts a new one whenever a vocabulary outgrows
+    MAX_VOCABULARY, so the interners never grow without bound.
+    """
+
+    __slots__ = ("ingredients", "benefits", "skin_types")
+
+    def __init__(self):
+        self.ingredients = Vocabulary()
+        self.benefits = Vocabulary()
+        self.skin_types = Vocabulary()
+
+    def full(self) -> bool:
+        return max(len(self.ingredients), len(self.benefits), len(self.skin_types)) >= MAX_VOCABULARY
+
+
+_current = Vocabularies()
+_current_lock = threading.Lock()
+
+
+def _replace(expected: Optional[Vocabularies] = None) -> Vocabularies:
+    global _current
+    with _current_lock:
+        # Another thread may have replaced a full generation already
+        if expected is None or _current is expected:
+            _current = Vocabularies()
+        return _current
+
+
+def new_vocabularies() -> Vocabularies:
+    """
+    Starts a new generation for the products built from now on.
+    """
+    return _replace()
+
+
+def current_vocabularies() -> Vocabularies:
+    """
+    The generation new products join; a full one is replaced first.
+    """
+    vocabularies = _current
+    return _replace(vocabularies) if vocabularies.full() else vocabularies
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _freeze(value: Any) -> Any:
+    # Lists become tuples of interned strings; scalars are kept as given
+    if isinstance(value, (list, tuple)):
+        return tuple(_intern(item) for item in value)
+    return _intern(value)
+
+
+def _items(value: Any) -> Tuple[Any, ...]:
+    # A plain string counts as one item, as in the similarity index
+    if isinstance(value, str):
+        return (value,)
+    return value if isinstance(value, tuple) else ()
+
+
+def _key(item: Any) -> Any:
+    try:
+        hash(item)
+    except TypeError:
+        # Unhashable items (nested lists / objects) are compared by text
+        return repr(item)
+    return item
+
+
+_NO_IDS = array("H")
+
+
+def _ids(vocabulary: Vocabulary, value: Any) -> array:
+    """
+    Sorted, distinct ids of the items of `value` (2 bytes each).
+    """
+    items = _items(value)
+    if not items:
+        return _NO_IDS
+    return array("H", sorted({vocabulary.id(_key(item)) for item in items}))
+
+
+def _known_ids(vocabulary: Vocabulary, value: Any) -> array:
+    """
+    Sorted ids of the items of `value` that `vocabulary` already holds;
+    the others cannot be shared with its products.
+    """
+    ids = (vocabulary.find(_key(item)) for item in _items(value))
+    return array("H", sorted({ident for ident in ids if ident is not None}))
+
+
+def _has(ids: array, ident: Optional[int]) -> bool:
+    i = bisect_left(ids, ident) if ident is not None else len(ids)
+    return i < len(ids) and ids[i] == ident
+
+
+def _thaw(value: Any) -> Any:
+    return list(value) if isinstance(value, tuple) else value
+
+
+class Product(Mapping):
+    """
+    Normalized product (output of ParserAgent.run), built once per record.
+
+    List fields are stored as tuples of interned strings, and ingredients,
+    benefits and skin types also as sorted arrays of 16-bit ids, so
+    comparing two products of one generation (see Vocabularies) is a
+    merge of small integer arrays. The record is
+    immutable and reads like the dict it replaces (`product.get(...)`,
+    `product["price"]`), so agents and templates use it without copying.
+    """
+
+    __slots__ = FIELDS + (
+        "vocabularies", "ingredient_ids", "benefit_ids", "skin_type_ids",
+    )
+
+    def __init__(self, product_name: Any = None, concentration: Any = "", skin_type: Any = (),
+                 key_ingredients: Any = (), benefits: Any = (), how_to_use: Any = "",
+                 side_effects: Any = "", price: Any = "",
+                 vocabularies: Optional[Vocabularies] = None):
+        init = object.__setattr__
+        init(self, "product_name", _freeze(product_name))
+        init(self, "concentration", _freeze(concentration))
+        init(self, "skin_type", _freeze(skin_type))
+        init(self, "key_ingredients", _freeze(key_ingredients))
+        init(self, "benefits", _freeze(benefits))
+        init(self, "how_to_use", _freeze(how_to_use))
+        init(self, "side_effects", _freeze(side_effects))
+        init(self, "price", _freeze(price))
+
+        vocabularies = vocabularies or current_vocabularies()
+        init(self, "vocabularies", vocabularies)
+        for name, vocabulary, field in (
+            ("ingredient", vocabularies.ingredients, "key_ingredients"),
+            ("benefit", vocabularies.benefits, "benefits"),
+            ("skin_type", vocabularies.skin_types, "skin_type"),
+        ):
+            init(self, f"{name}_ids", _ids(vocabulary, getattr(self, field)))
+
+    @classmethod
+    def coerce(cls, product: Mapping) -> "Product":
+        """
+        The product itself, or a record of the fields of a plain mapping
+        (missing list fields are empty, other missing fields None).
+        """
+        if isinstance(product, Product):
+            return product
+        return cls(**{
+            field: product.get(field, () if field in ("skin_type", "key_ingredients", "benefits") else None)
+            for field in FIELDS
+        })
+
+    def card(self) -> "Product":
+        """
+        Record with only the fields comparison pages need.
+        """
+        return Product(**{field: getattr(self, field) for field in COMPARISON_FIELDS},
+                       vocabularies=self.vocabularies)
+
+    def shared_ingredients(self, other: "Product") -> List[Any]:
+        """
+        This product's ingredients that `other` also has, in this product's order.
+        """
+        theirs = self._ingredient_ids_of(other)
+        if not theirs:
+            return []
+        vocabulary = self.vocabularies.ingredients
+        return [item for item in _items(self.key_ingredients) if _has(theirs, vocabulary.find(_key(item)))]
+
+    def has_unique_ingredients(self, other: "Product") -> bool:
+        """
+        Whether this product has an ingredient `other` lacks.
+        """
+        ours, theirs = self.ingredient_ids, self._ingredient_ids_of(other)
+        if len(ours) > len(theirs):
+            return True
+        # Both sorted: walk them together
+        j = 0
+        for ident in ours:
+            while j < len(theirs) and theirs[j] < ident:
+                j += 1
+            if j == len(theirs) or theirs[j] != ident:
+                return True
+        return False
+
+    def _ingredient_ids_of(self, other: "Product") -> array:
+        # `other`'s ingredients in this product's ids
+        if other.vocabularies is self.vocabularies:
+            return other.ingredient_ids
+        return _known_ids(self.vocabularies.ingredients, other.key_ingredients)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Plain dict with lists, as ParserAgent used to return (fingerprints).
+        """
+        return {field: _thaw(getattr(self, field)) for field in FIELDS}
+
+    # ===================== MAPPING =====================
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELD_SET
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    # ===================== IMMUTABILITY =====================
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("Product is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("Product is immutable")
+
+    def __reduce__(self):
+        # Rebuilt on unpickling, so ids come from the receiving process
+        return (Product, tuple(getattr(self, field) for field in FIELDS))
+
+    def __repr__(self) -> str:
+        return f"Product({self.product_name!r})"
+
+
+def as_list(value: Any) -> Any:
+    """
+    Tuple fields as lists, for text that printed the old list values.
+    """
+    return _thaw(value)
@@ -0,0 +1,237 @@
+# agents/prompt_builder.py
+
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from agents.product_record import as_list
+from infrastructure.config import Config
+
+STYLES = ("compact", "verbose")
+
+# Instructions shared by every FAQ request, at the start of the prompt.
+# At ~20 tokens they are far below the ~1024-token minimum of provider-side
+# prompt caching: the point is a short prompt, not a cached one.
+FAQ_PREFIX = "Skincare product FAQs. Reply with JSON only; FAQ keys: category, question.\n\n"
+
+# Product fields sent to the model: (label, field)
+_COMPACT_FIELDS = (
+    ("Ingredients", "key_ingredients"),
+    ("Benefits", "benefits"),
+    ("Usage", "how_to_use"),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token, as in the rate limiter and the fake backend
+    return len(text) // 4
+
+
+def _compact(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_compact(item) for item in value)
+    return " ".join(str(value).split())
+
+
+def _catalog_facts(facts: Dict[str, Any]) -> str:
+    # Grounding from CatalogAnalytics, e.g. "budget price; rare: Bakuchiol"
+    parts = []
+    if facts.get("price_band"):
+        parts.append(f"{facts['price_band']} price")
+    if facts.get("rare_ingredients"):
+        parts.append(f"rare: {_compact(facts['rare_ingredients'])}")
+    return "; ".join(parts)
+
+
+class PromptBuilder:
+    """
+    Builds the LLM prompts of the pipeline.
+
+    `compact` (default) prompts start with the fixed FAQ_PREFIX, followed
+    by the product, followed by the request-specific part. Product fields are written as
+    plain comma-separated text without empty fields, plus a line of
+    catalog facts (price band, rare ingredients) when given. `verbose`
+    builds the original prompts, for comparison (see prompt_report).
+    """
+
+    def __init__(self, style: Optional[str] = None):
+        self.style = (style or Config.PROMPT_STYLE).lower()
+        if self.style not in STYLES:
+            raise ValueError(f"Unknown prompt style: {self.style}")
+
+    @property
+    def compact(self) -> bool:
+        return self.style == "compact"
+
+    def product_block(self, product: Dict[str, Any], facts: Optional[Dict[str, Any]] = None) -> str:
+        if not self.compact:
+            return (
+                f"Product Name: {product.get('product_name')}\n"
+                f"Key Ingredients: {as_list(product.get('key_ingredients', []))}\n"
+                f"Benefits: {as_list(product.get('benefits', []))}\n"
+                f"Usage: {product.get('how_to_use', '')}\n"
+            )
+        # FakeLLM reads the name from the "Product Name:" line
+        lines = [f"Product Name: {_compact(product.get('product_name'))}"]
+        for label, field in _COMPACT_FIELDS:
+            value = product.get(field)
+            if value:
+                lines.append(f"{label}: {_compact(value)}")
+        grounding = _catalog_facts(facts) if facts else ""
+        if grounding:
+            lines.append(f"Catalog: {grounding}")
+        return "\n".join(lines) + "\n"
+
+    # ===================== FAQ =====================
+
+    def faq(self, product: Dict[str, Any], count: int, facts: Optional[Dict[str, Any]] = None) -> str:
+        if not self.compact:
+            return (
+                f"Generate EXACTLY {count} FAQs in JSON.\n"
+                "Return ONLY a JSON array.\n"
+                "Each item must contain: category, question.\n\n"
+                + self.product_block(product)
+            )
+        return FAQ_PREFIX + self.product_block(product, facts) + f"\nJSON array of exactly {count} FAQs."
+
+    def more_faqs(self, product: Dict[str, Any], count: int, asked: Sequence[str],
+                  facts: Optional[Dict[str, Any]] = None) -> str:
+        if not self.compact:
+            listed = "\n".join(f"- {question}" for question in asked)
+            return (
+                f"Generate EXACTLY {count} more FAQs in JSON.\n"
+                "Return ONLY a JSON array.\n"
+                "Each item must contain: category, question.\n"
+                f"Do not repeat these questions:\n{listed}\n\n"
+                + self.product_block(product)
+            )
+        listed = "\n".join(asked)
+        return (
+            FAQ_PREFIX + self.product_block(product, facts)
+            + f"\nJSON array of exactly {count} more FAQs, none of these:\n{listed}"
+        )
+
+    def batch(self, keys: Sequence[str], products: Sequence[Dict[str, Any]], count: int,
+              facts: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> str:
+        facts = facts or [None] * len(products)
+        blocks = "\n".join(
+            f"Product ID: {key}\n" + self.product_block(product, product_facts)
+            for key, product, product_facts in zip(keys, products, facts)
+        )
+        if not self.compact:
+            return (
+                f"Generate EXACTLY {count} FAQs for EACH product below.\n"
+                "Return ONLY a JSON object mapping every Product ID to a JSON array of its FAQs.\n"
+                "Each item must contain: category, question.\n\n"
+                + blocks
+            )
+        return (
+            FAQ_PREFIX
+            + f"JSON object mapping each Product ID to an array of exactly {count} FAQs.\n\n"
+            + blocks
+        )
+
+    def batch_overhead(self, count: int) -> int:
+        """
+        Tokens of a batched prompt apart from its product blocks.
+        """
+        return estimate_tokens(self.batch([], [], count))
+
+    # ===================== PLANNER =====================
+
+    def planner(self, product_ref: str, product: Dict[str, Any]) -> str:
+        """
+        Input of the agentic planner. Compact prompts pass the tools a
+        product id instead of the product JSON, which the planner would
+        otherwise read once and write back in every tool call.
+        """
+        if not self.compact:
+            return "Call all tools to generate all pages.\n\nProduct JSON:\n" + json.dumps(product)
+        return f"Call every tool once with action_input \"{product_ref}\"."
+
+
+# ===================== REPORT =====================
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+def prompt_report(raws: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Estimated prompt tokens per request for both prompt styles over a
+    catalog: single-product FAQ requests, batched FAQ requests of
+    `batch_size` products and the agentic planner input. `prefix` is the
+    part shared by all FAQ requests of a style (cacheable by the provider).
+    """
+    from agents.parser_agent import ParserAgent
+
+    batch_size = max(1, batch_size or Config.FAQ_BATCH_SIZE)
+    parser = ParserAgent()
+    builders = {style: PromptBuilder(style) for style in STYLES}
+    rows = {style: {"faq": 0, "batch": 0, "planner": 0} for style in STYLES}
+    first: Dict[str, str] = {}
+    prefix = {style: None for style in STYLES}
+    products, batches, pending = 0, 0, []
+
+    def flush():
+        nonlocal batches
+        keys = [f"p{n + 1}" for n in range(len(pending))]
+        for style, builder in builders.items():
+            # A batch of one is sent as a single-product request
+            prompt = (
+                builder.batch(keys, pending, Config.MIN_QUESTIONS) if len(pending) > 1
+                else builder.faq(pending[0], Config.MIN_QUESTIONS)
+            )
+            rows[style]["batch"] += estimate_tokens(prompt)
+        batches += 1
+        pending.clear()
+
+    for raw in raws:
+        product = parser.run(raw)
+        products += 1
+        for style, builder in builders.items():
+            prompt = builder.faq(product, Config.MIN_QUESTIONS)
+            rows[style]["faq"] += estimate_tokens(prompt)
+            rows[style]["planner"] += estimate_tokens(builder.planner("product", raw))
+            if style not in first:
+                first[style] = prompt
+            elif prompt != first[style]:
+                shared = _common_prefix(first[style], prompt)
+                prefix[style] = shared if prefix[style] is None else min(prefix[style], shared)
+        pending.append(product)
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+
+    report = {"products": products, "batch_size": batch_size, "styles": {}}
+    for style in STYLES:
+        row = rows[style]
+        report["styles"][style] = {
+            "faq": row["faq"] / products if products else 0.0,
+            "batch": row["batch"] / batches if batches else 0.0,
+            "batch_per_product": row["batch"] / products if products else 0.0,
+            "planner": row["planner"] / products if products else 0.0,
+            "prefix": (prefix[style] or 0) // 4,
+        }
+    return report
+
+
+def print_prompt_report(report: Dict[str, Any]):
+    before, after = report["styles"]["verbose"], report["styles"]["compact"]
+    print(
+        f"\n🧾 Prompt tokens per request over {report['products']} products "
+        f"(estimated, ~4 chars/token): verbose -> compact"
+    )
+    for key, label in (
+        ("faq", "faq (1 product)"),
+        ("batch", f"faq batch ({report['batch_size']})"),
+        ("batch_per_product", "  per product"),
+        ("planner", "planner input"),
+    ):
+        change = after[key] / before[key] - 1 if before[key] else 0.0
+        print(f"   {label:<18} {before[key]:8.1f} -> {after[key]:8.1f}  ({change:+.0%})")
+    print(f"   shared prefix      {before['prefix']:8d} -> {after['prefix']:8d}  tokens (cacheable)")
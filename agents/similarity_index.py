@@ -0,0 +1,98 @@
+# agents/similarity_index.py
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+# Feature namespaces: the same word means different things in different fields
+FEATURE_FIELDS = (
+    ("ing", "key_ingredients"),
+    ("ben", "benefits"),
+    ("skin", "skin_type"),
+)
+
+
+def product_features(product: Dict[str, Any]) -> List[str]:
+    features = set()
+    for prefix, field in FEATURE_FIELDS:
+        values = product.get(field) or []
+        if isinstance(values, str):
+            values = [values]
+        for value in values:
+            value = str(value).strip().lower()
+            if value:
+                features.add(f"{prefix}:{value}")
+    return sorted(features)
+
+
+class SimilarityIndex:
+    """
+    Inverted index over ingredients / benefits / skin types used to pick
+    the most similar competitors for every product in a catalog.
+
+    Scoring is Jaccard similarity of the feature sets. For each product the
+    overlap counts are taken with one np.unique over the posting lists of
+    its features, so only products sharing at least one feature are ever
+    touched (no per-query array over the whole catalog) and there is no
+    Python-level pair loop.
+    """
+
+    def __init__(self, products: Sequence[Dict[str, Any]]):
+        self.size = len(products)
+
+        vocabulary: Dict[str, int] = {}
+        self._features: List[np.ndarray] = []
+        for product in products:
+            ids = [vocabulary.setdefault(f, len(vocabulary)) for f in product_features(product)]
+            self._features.append(np.asarray(ids, dtype=np.int32))
+
+        self.sizes = np.fromiter((len(f) for f in self._features), dtype=np.int32, count=self.size)
+
+        # feature id -> sorted array of product indices
+        if self.size:
+            owners = np.repeat(np.arange(self.size, dtype=np.int32), self.sizes)
+            flat = np.concatenate(self._features) if self.sizes.sum() else np.empty(0, dtype=np.int32)
+        else:
+            owners = flat = np.empty(0, dtype=np.int32)
+        order = np.argsort(flat, kind="stable")
+        bounds = np.searchsorted(flat[order], np.arange(len(vocabulary) + 1))
+        sorted_owners = owners[order]
+        self._postings = [
+            sorted_owners[bounds[f]:bounds[f + 1]] for f in range(len(vocabulary))
+        ]
+
+    def scores(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (candidate indices, Jaccard scores) for one product,
+        excluding the product itself.
+        """
+        features = self._features[index]
+        if not len(features):
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        hits = np.concatenate([self._postings[f] for f in features])
+        candidates, shared = np.unique(hits, return_counts=True)
+        others = candidates != index
+        candidates, shared = candidates[others], shared[others]
+
+        union = self.sizes[index] + self.sizes[candidates] - shared
+        return candidates, shared / union
+
+    def top_k(self, index: int, k: int) -> List[Tuple[int, float]]:
+        """
+        The k most similar products as (index, score), best first.
+        Ties are broken by catalog order so results are deterministic.
+        """
+        candidates, scores = self.scores(index)
+        if not len(candidates) or k <= 0:
+            return []
+
+        if len(candidates) > k:
+            # Threshold at the k-th best score, then sort the (small) rest
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = scores >= kth
+            candidates, scores = candidates[keep], scores[keep]
+
+        order = np.lexsort((candidates, -scores))[:k]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
@@ -0,0 +1,105 @@
+# benchmarks/catalog.py
+
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+SKIN_TYPES = ["Oily", "Dry", "Combination", "Normal", "Sensitive"]
+
+INGREDIENTS = [
+    "Vitamin C", "Hyaluronic Acid", "Niacinamide", "Retinol", "Salicylic Acid",
+    "Glycolic Acid", "Lactic Acid", "Ceramides", "Peptides", "Squalane",
+    "Zinc Oxide", "Titanium Dioxide", "Aloe Vera", "Green Tea Extract",
+    "Centella Asiatica", "Bakuchiol", "Azelaic Acid", "Panthenol",
+    "Vitamin E", "Ferulic Acid", "Alpha Arbutin", "Kojic Acid",
+    "Tranexamic Acid", "Snail Mucin", "Rosehip Oil", "Jojoba Oil",
+    "Shea Butter", "Glycerin", "Allantoin", "Licorice Root Extract",
+]
+
+BENEFITS = [
+    "Brightening", "Fades dark spots", "Hydration", "Anti-ageing",
+    "Reduces acne", "Soothes redness", "Strengthens skin barrier",
+    "Minimises pores", "Evens skin tone", "Sun protection",
+    "Smooths texture", "Controls oil",
+]
+
+FORMATS = ["Serum", "Cream", "Gel", "Toner", "Essence", "Sunscreen", "Cleanser"]
+
+USAGE = [
+    "Apply 2–3 drops in the morning before sunscreen",
+    "Massage a pea-sized amount onto clean skin at night",
+    "Apply evenly 15 minutes before sun exposure",
+    "Use twice daily after cleansing",
+]
+
+# Name suffixes of variants: same formula, another size or pack
+VARIANTS = ["30ml", "50ml", "100ml", "Travel Size", "Refill Pack"]
+
+SIDE_EFFECTS = [
+    "Mild tingling for sensitive skin",
+    "May cause dryness in the first weeks",
+    "Patch test before first use",
+    "None commonly reported",
+]
+
+
+def synthetic_product(index: int, rng: random.Random) -> Dict[str, Any]:
+    """
+    One product shaped like input/product_data.json.
+    """
+    lead = rng.choice(INGREDIENTS)
+    return {
+        "sku": f"BENCH-{index:06d}",
+        "product_name": f"Bench {lead} {rng.choice(FORMATS)} {index}",
+        "concentration": f"{rng.randint(1, 20)}% {lead}",
+        "skin_type": rng.sample(SKIN_TYPES, rng.randint(1, 3)),
+        "key_ingredients": [lead] + rng.sample([i for i in INGREDIENTS if i != lead], rng.randint(1, 4)),
+        "benefits": rng.sample(BENEFITS, rng.randint(2, 3)),
+        "how_to_use": rng.choice(USAGE),
+        "side_effects": rng.choice(SIDE_EFFECTS),
+        "price": f"₹{rng.randrange(199, 2999, 50)}",
+    }
+
+
+def variant_product(base: Dict[str, Any], index: int, rng: random.Random) -> Dict[str, Any]:
+    """
+    A variant of `base`: the same product under another name and SKU.
+    """
+    return {
+        **base,
+        "sku": f"BENCH-{index:06d}",
+        "product_name": f"{base['product_name']} {rng.choice(VARIANTS)}",
+    }
+
+
+def iter_catalog(size: int, seed: int = 42, variant_share: float = 0.0) -> Iterator[Dict[str, Any]]:
+    """
+    Synthetic products; a `variant_share` of them are variants of the
+    product listed before them (see FAQReuse).
+    """
+    rng = random.Random(seed)
+    base = None
+    for index in range(size):
+        if base is not None and variant_share and rng.random() < variant_share:
+            yield variant_product(base, index, rng)
+        else:
+            base = synthetic_product(index, rng)
+            yield base
+
+
+def write_catalog(path: str, size: int, seed: int = 42, variant_share: float = 0.0) -> str:
+    """
+    Writes a deterministic JSONL catalog of `size` products; reuses an
+    existing file of the same size, seed and variant share.
+    """
+    target = Path(path)
+    if target.exists():
+        return str(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for product in iter_catalog(size, seed, variant_share):
+            f.write(json.dumps(product, ensure_ascii=False) + "\n")
+    tmp.replace(target)
+    return str(target)
@@ -0,0 +1,111 @@
+# benchmarks/incremental_check.py
+"""
+Offline check that incremental regeneration stays local: after editing
+one product of a catalog, only pages that involve that product (its own
+pages and comparisons with it) or a product whose shown catalog facts
+changed may be regenerated. Exits non-zero otherwise.
+
+    python -m benchmarks.incremental_check
+    python -m benchmarks.incremental_check --size 500 --edit 17
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Set
+
+# Offline and deterministic; set before the pipeline reads its config
+os.environ.update({
+    "LLM_BACKEND": "fake",
+    "FAKE_LLM_LATENCY": "0",
+    "FAKE_LLM_FAILURE_RATE": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "INCREMENTAL": "true",
+    "CATALOG_ANALYTICS": "true",
+    "CHECKPOINT_ENABLED": "false",
+    "LANGCHAIN_TRACING_V2": "false",
+})
+
+
+def _fingerprints(output_dir: Path) -> Dict[str, str]:
+    data = json.loads((output_dir / "manifest.json").read_text(encoding="utf-8"))
+    return {key: entry["fingerprint"] for key, entry in data["pages"].items()}
+
+
+def _edit_price(raw: Dict, step: int) -> Dict:
+    from agents.catalog_analytics import parse_price
+
+    price = parse_price(raw.get("price"))
+    return {**raw, "price": f"₹{int(price) + step}" if price == price else "₹999"}
+
+
+def _affected(before: str, after: str, raws: List[Dict], edited: int) -> Set[str]:
+    """
+    Ids of the edited product and of every product whose grounding
+    (the catalog facts its pages show) differs between the two catalogs.
+    """
+    from agents.catalog_analytics import CatalogAnalytics
+    from orchestrator.batch_runner import product_id
+
+    old, new = CatalogAnalytics.from_catalog(before), CatalogAnalytics.from_catalog(after)
+    ids = {product_id(raws[edited], edited)}
+    for index, raw in enumerate(raws):
+        if old.grounding(index) != new.grounding(index):
+            ids.add(product_id(raw, index))
+    return ids
+
+
+def run(size: int, edit: int, step: int, seed: int) -> int:
+    from benchmarks.catalog import write_catalog
+    from orchestrator.batch_runner import BatchRunner
+
+    with tempfile.TemporaryDirectory(prefix="incremental-") as tmp:
+        work = Path(tmp)
+        before, after, output = work / "before.jsonl", work / "after.jsonl", work / "out"
+        write_catalog(str(before), size, seed)
+        raws = [json.loads(line) for line in before.read_text(encoding="utf-8").splitlines() if line]
+        edit %= len(raws)
+        edited = list(raws)
+        edited[edit] = _edit_price(raws[edit], step)
+        after.write_text(
+            "".join(json.dumps(raw, ensure_ascii=False) + "\n" for raw in edited), encoding="utf-8"
+        )
+
+        BatchRunner(incremental=True).run(str(before), str(output))
+        first = _fingerprints(output)
+        stats = BatchRunner(incremental=True).run(str(after), str(output))
+        second = _fingerprints(output)
+
+        affected = _affected(str(before), str(after), raws, edit)
+
+    changed = sorted(key for key, fp in second.items() if first.get(key) != fp)
+    unexpected = [key for key in changed if not affected & set(key.split("/")[::2])]
+
+    print(
+        f"\n🔁 Edited product #{edit} of {size}: {stats.regenerated} of "
+        f"{stats.regenerated + stats.reused} pages regenerated, {len(affected)} products affected"
+    )
+    if unexpected:
+        print(f"❌ {len(unexpected)} pages regenerated without a change of their own:")
+        for key in unexpected[:20]:
+            print(f"   {key}")
+        return 1
+    print("✅ Only pages of affected products were regenerated")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check that editing one product stays local")
+    parser.add_argument("--size", type=int, default=200, help="Synthetic catalog size")
+    parser.add_argument("--edit", type=int, default=50, help="Position of the product to edit")
+    parser.add_argument("--step", type=int, default=150, help="Price increase of the edited product")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    return run(args.size, args.edit, args.step, args.seed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline, reproducible pipeline benchmarks.
+
+Every scenario runs in a fresh subprocess with the fake LLM backend
+(LLM_BACKEND=fake), so no GROQ_API_KEY or network is needed and peak
+memory is measured per scenario. Results are compared with a stored
+baseline (benchmarks/baseline.json); the command exits 1 on regressions
+and 2 when a scenario has no baseline.
+
+    python -m benchmarks.run_benchmarks                     # run + compare
+    python -m benchmarks.run_benchmarks --update-baseline   # store new baseline
+    python -m benchmarks.run_benchmarks --scenarios batch:100 direct:1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+MODES = ("direct", "batch", "batch-jsonl", "batch-segment", "batch-staged")
+DEFAULT_SCENARIOS = [
+    "direct:1", "direct:100",
+    "batch:1", "batch:100", "batch:10000",
+    "batch-jsonl:10000",
+    "batch-staged:10000",
+]
+
+# Absolute slack so tiny numbers do not flap on noise
+P95_SLACK_MS = 1.0
+RSS_SLACK_MB = 5.0
+
+
+# ===================== WORKER (subprocess) =====================
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_direct(catalog: str, size: int, work: Path) -> Dict[str, int]:
+    """
+    One direct-mode orchestrator run per product, as a cron wrapper would
+    do for single-product refreshes (minus interpreter startup).
+    """
+    from infrastructure.config import Config
+    from orchestrator.langchain_orchestrator import LangChainOrchestrator
+
+    failed = 0
+    with open(catalog, "r", encoding="utf-8") as f:
+        for line in f:
+            Path(Config.INPUT_PRODUCT_DATA).write_text(line, encoding="utf-8")
+            try:
+                LangChainOrchestrator(mode="direct", incremental=False).run()
+            except Exception:
+                failed += 1
+    return {"products": size - failed, "failed": failed}
+
+
+def _run_batch(catalog: str, work: Path, sink: str, staged: bool = False) -> Dict[str, int]:
+    from orchestrator.batch_runner import BatchRunner
+    from orchestrator.staged_runner import StagedBatchRunner
+
+    runner_cls = StagedBatchRunner if staged else BatchRunner
+    stats = runner_cls(incremental=False, sink=sink).run(catalog, str(work / "out"))
+    return {"products": stats.completed, "failed": stats.failed}
+
+
+def run_worker(spec: Dict[str, Any]) -> Dict[str, Any]:
+    from infrastructure.instrumentation import METRICS
+
+    work = Path(spec["work"])
+    start = time.perf_counter()
+
+    if spec["mode"] == "direct":
+        counts = _run_direct(spec["catalog"], spec["size"], work)
+    elif spec["mode"] == "batch":
+        counts = _run_batch(spec["catalog"], work, "files")
+    elif spec["mode"] == "batch-staged":
+        counts = _run_batch(spec["catalog"], work, "files", staged=True)
+    elif spec["mode"] == "batch-segment":
+        counts = _run_batch(spec["catalog"], work, "segment")
+    else:
+        counts = _run_batch(spec["catalog"], work, "jsonl")
+
+    elapsed = time.perf_counter() - start
+    stages = {
+        stage: {"p50_ms": row["p50_ms"], "p95_ms": row["p95_ms"], "calls": row["calls"]}
+        for stage, row in METRICS.summary().items()
+    }
+    return {
+        **counts,
+        "elapsed_s": round(elapsed, 3),
+        "products_per_s": round(counts["products"] / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": stages,
+    }
+
+
+# ===================== DRIVER =====================
+
+def _scenario_env(work: Path, args) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": str(args.latency),
+        "FAKE_LLM_FAILURE_RATE": str(args.failure_rate),
+        "LLM_CACHE_ENABLED": "false",
+        "INCREMENTAL": "false",
+        "METRICS_ENABLED": "true",
+        "BATCH_CONCURRENCY": str(args.concurrency),
+        "TEMPLATE_BYTECODE_CACHE": str(work / "jinja"),
+        "INPUT_PRODUCT_DATA": str(work / "input.json"),
+        "OUTPUT_FAQ": str(work / "faq.json"),
+        "OUTPUT_PRODUCT": str(work / "product_page.json"),
+        "OUTPUT_COMPARISON": str(work / "comparison_page.json"),
+        "MANIFEST_PATH": str(work / "manifest.json"),
+        "LANGCHAIN_TRACING_V2": "false",
+        "LANGCHAIN_VERBOSE": "false",
+    })
+    return env
+
+
+def run_scenario(name: str, catalog_dir: Path, args) -> Dict[str, Any]:
+    from benchmarks.catalog import write_catalog
+
+    mode, size = name.split(":")
+    size = int(size)
+    if mode not in MODES:
+        raise SystemExit(f"Unknown benchmark mode: {mode}")
+
+    stem = f"catalog-{size}-{args.seed}" + (f"-v{args.variant_share:g}" if args.variant_share else "")
+    catalog = write_catalog(str(catalog_dir / f"{stem}.jsonl"), size, args.seed, args.variant_share)
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        work = Path(tmp)
+        spec = {"mode": mode, "size": size, "catalog": catalog, "work": str(work)}
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", json.dumps(spec)],
+            cwd=str(ROOT), env=_scenario_env(work, args),
+            capture_output=True, text=True,
+        )
+
+    if proc.returncode != 0:
+        raise SystemExit(f"Scenario {name} failed:\n{proc.stderr[-2000:]}")
+    # The worker prints its result as the last stdout line
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+
+        floor = base["products_per_s"] * (1 - tolerance)
+        if current["products_per_s"] < floor:
+            regressions.append(
+                f"{name}: throughput {current['products_per_s']}/s < {floor:.2f}/s "
+                f"(baseline {base['products_per_s']}/s)"
+            )
+
+        ceiling = base["peak_rss_mb"] * (1 + tolerance) + RSS_SLACK_MB
+        if base["peak_rss_mb"] and current["peak_rss_mb"] > ceiling:
+            regressions.append(
+                f"{name}: peak memory {current['peak_rss_mb']}MB > {ceiling:.1f}MB "
+                f"(baseline {base['peak_rss_mb']}MB)"
+            )
+
+        for stage, row in current["stages"].items():
+            base_row = base.get("stages", {}).get(stage)
+            if not base_row:
+                continue
+            limit = base_row["p95_ms"] * (1 + tolerance) + P95_SLACK_MS
+            if row["p95_ms"] > limit:
+                regressions.append(
+                    f"{name}: {stage} p95 {row['p95_ms']}ms > {limit:.1f}ms "
+                    f"(baseline {base_row['p95_ms']}ms)"
+                )
+    return regressions
+
+
+def print_results(results: Dict[str, Any]):
+    print(f"\n{'scenario':<20} {'products/s':>11} {'elapsed':>9} {'peak MB':>8}  stage p95 (ms)")
+    for name, r in results.items():
+        stages = "  ".join(f"{s}={row['p95_ms']:.1f}" for s, row in sorted(r["stages"].items()))
+        print(f"{name:<20} {r['products_per_s']:>11} {r['elapsed_s']:>8}s {r['peak_rss_mb']:>8}  {stages}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--scenarios", nargs="+", default=DEFAULT_SCENARIOS,
+                        help="mode:size pairs, modes: " + ", ".join(MODES))
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake LLM latency per call (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fake LLM calls that fail")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic catalog seed")
+    parser.add_argument("--variant-share", type=float, default=0.0,
+                        help="Share of catalog products that are variants of the one before")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Also write the results JSON here")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.worker:
+        # Keep pipeline chatter off the result line
+        import contextlib
+        import io
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_worker(json.loads(args.worker))
+        print(json.dumps(result))
+        return 0
+
+    catalog_dir = Path(tempfile.gettempdir()) / "kasparro-bench-catalogs"
+    results = {}
+    for name in args.scenarios:
+        print(f"⏱️  {name} ...", flush=True)
+        results[name] = run_scenario(name, catalog_dir, args)
+
+    print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True), encoding="utf-8")
+        print(f"\n📌 Baseline updated: {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"\n❌ No baseline at {baseline_path}; run with --update-baseline to store one.")
+        return 2
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print(f"\n❌ No baseline for: {', '.join(missing)}; run them with --update-baseline first.")
+        return 2
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+
+    print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
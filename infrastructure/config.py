@@ -1,6 +1,5 @@
 from pathlib import Path
 import os
-from dotenv import load_dotenv
 import yaml
 
 # Project root
@@ -11,13 +10,14 @@ YAML_PATH = ROOT / "config.yaml"
 
 # Load .env if exists
 if ENV_PATH.exists():
+    from dotenv import load_dotenv
     load_dotenv(ENV_PATH)
 
-# Load YAML if exists
+# Load YAML if exists (libyaml's loader when available: it is much faster)
 try:
     if YAML_PATH.exists():
         with YAML_PATH.open("r", encoding="utf-8") as f:
-            _cfg = yaml.safe_load(f) or {}
+            _cfg = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
     else:
         _cfg = {}
 except Exception:
@@ -77,6 +77,290 @@ class Config:
         or "outputs/comparison_page.json"
     )
 
+    # ============================
+    # OUTPUT SINK
+    # ============================
+
+    # "files" (one JSON per page), "jsonl" or "jsonl.gz" (one stream per page type),
+    # "segment" (one append-only segment file + index, see page_store.py)
+    OUTPUT_SINK = (
+        os.getenv("OUTPUT_SINK")
+        or _cfg.get("output_sink", {}).get("kind")
+        or "files"
+    ).lower()
+
+    OUTPUT_FLUSH_BYTES = int(
+        os.getenv("OUTPUT_FLUSH_BYTES")
+        or _cfg.get("output_sink", {}).get("flush_bytes")
+        or 1024 * 1024
+    )
+
+    OUTPUT_FSYNC = (
+        os.getenv("OUTPUT_FSYNC")
+        or str(_cfg.get("output_sink", {}).get("fsync", "false"))
+    ).lower() == "true"
+
+    # ============================
+    # TEMPLATE ENGINE
+    # ============================
+
+    # "always" -> check every page context against its template's schema
+    #             (templates/schemas/), or json.loads pages without one
+    # "sample" -> validate a random TEMPLATE_VALIDATION_SAMPLE_RATE share
+    #             (default: a schema check costs 20-50x a json.loads)
+    # "off"    -> trust the templates
+    TEMPLATE_VALIDATION = (
+        os.getenv("TEMPLATE_VALIDATION")
+        or _cfg.get("template_engine", {}).get("validation")
+        or "sample"
+    ).lower()
+
+    TEMPLATE_VALIDATION_SAMPLE_RATE = float(
+        os.getenv("TEMPLATE_VALIDATION_SAMPLE_RATE")
+        or _cfg.get("template_engine", {}).get("sample_rate")
+        or 0.01
+    )
+
+    # Empty string disables the on-disk bytecode cache
+    TEMPLATE_BYTECODE_CACHE = os.getenv(
+        "TEMPLATE_BYTECODE_CACHE",
+        _cfg.get("template_engine", {}).get("bytecode_cache", ".cache/jinja")
+    )
+
+    # ============================
+    # INCREMENTAL REGENERATION
+    # ============================
+
+    INCREMENTAL = (
+        os.getenv("INCREMENTAL")
+        or str(_cfg.get("incremental", {}).get("enabled", "true"))
+    ).lower() == "true"
+
+    MANIFEST_PATH = (
+        os.getenv("MANIFEST_PATH")
+        or _cfg.get("incremental", {}).get("manifest")
+        or "outputs/manifest.json"
+    )
+
+    # ============================
+    # BATCH
+    # ============================
+
+    BATCH_OUTPUT_DIR = (
+        os.getenv("BATCH_OUTPUT_DIR")
+        or _cfg.get("batch", {}).get("output_dir")
+        or "outputs/batch"
+    )
+
+    BATCH_CONCURRENCY = int(
+        os.getenv("BATCH_CONCURRENCY")
+        or _cfg.get("batch", {}).get("concurrency")
+        or 8
+    )
+
+    # Products read ahead of the workers (bounds ingestion memory)
+    INGEST_QUEUE_SIZE = int(
+        os.getenv("INGEST_QUEUE_SIZE")
+        or _cfg.get("batch", {}).get("queue_size")
+        or 256
+    )
+
+    # Number of most similar competitors each product is compared with
+    COMPARISON_TOP_K = int(
+        os.getenv("COMPARISON_TOP_K")
+        or _cfg.get("batch", {}).get("comparison_top_k")
+        or 3
+    )
+
+    # Catalog-wide price / ingredient / skin type facts on batch pages
+    # (one extra pass over the catalog before generation)
+    CATALOG_ANALYTICS = (
+        os.getenv("CATALOG_ANALYTICS")
+        or str(_cfg.get("batch", {}).get("analytics", "true"))
+    ).lower() == "true"
+
+    # Ingredients found in at most this share of the catalog are "rare"
+    RARE_INGREDIENT_SHARE = float(
+        os.getenv("RARE_INGREDIENT_SHARE")
+        or _cfg.get("batch", {}).get("rare_ingredient_share")
+        or 0.05
+    )
+
+    # "threads" = one thread pool for everything, "staged" = async LLM
+    # workers feeding a process pool that renders the pages
+    BATCH_PIPELINE = (
+        os.getenv("BATCH_PIPELINE")
+        or _cfg.get("batch", {}).get("pipeline")
+        or "threads"
+    )
+
+    # Render processes of the staged pipeline (0 = one per CPU core)
+    RENDER_WORKERS = int(
+        os.getenv("RENDER_WORKERS")
+        or _cfg.get("batch", {}).get("render_workers")
+        or 0
+    )
+
+    # ============================
+    # SERVICE
+    # ============================
+
+    SERVICE_HOST = (
+        os.getenv("SERVICE_HOST")
+        or _cfg.get("service", {}).get("host")
+        or "127.0.0.1"
+    )
+
+    SERVICE_PORT = int(
+        os.getenv("SERVICE_PORT")
+        or _cfg.get("service", {}).get("port")
+        or 8787
+    )
+
+    # Persisted pages of the service (same layout as batch runs)
+    SERVICE_OUTPUT_DIR = (
+        os.getenv("SERVICE_OUTPUT_DIR")
+        or _cfg.get("service", {}).get("output_dir")
+        or "outputs/service"
+    )
+
+    # Threads generating pages; the LLM client caps concurrent requests itself
+    SERVICE_WORKERS = int(
+        os.getenv("SERVICE_WORKERS")
+        or _cfg.get("service", {}).get("workers")
+        or 8
+    )
+
+    # Drop directory (inbox/, outbox/, ...); empty = HTTP only
+    SERVICE_DROP_DIR = (
+        os.getenv("SERVICE_DROP_DIR")
+        or _cfg.get("service", {}).get("drop_dir")
+        or ""
+    )
+
+    SERVICE_POLL_INTERVAL = float(
+        os.getenv("SERVICE_POLL_INTERVAL")
+        or _cfg.get("service", {}).get("poll_interval")
+        or 1.0
+    )
+
+    # Seconds between manifest saves (a save rewrites every entry); the
+    # manifest is also saved at shutdown
+    SERVICE_MANIFEST_INTERVAL = float(
+        os.getenv("SERVICE_MANIFEST_INTERVAL")
+        or _cfg.get("service", {}).get("manifest_interval")
+        or 5.0
+    )
+
+    # ============================
+    # CHECKPOINTS
+    # ============================
+
+    # SQLite journal of batch progress; a restarted run resumes from it
+    CHECKPOINT_ENABLED = (
+        os.getenv("CHECKPOINT_ENABLED")
+        or str(_cfg.get("checkpoint", {}).get("enabled", "true"))
+    ).lower() == "true"
+
+    # Empty = <output_dir>/checkpoint.sqlite
+    CHECKPOINT_PATH = (
+        os.getenv("CHECKPOINT_PATH")
+        or _cfg.get("checkpoint", {}).get("path")
+        or ""
+    )
+
+    # Resume the last unfinished run of the same catalog
+    CHECKPOINT_RESUME = (
+        os.getenv("CHECKPOINT_RESUME")
+        or str(_cfg.get("checkpoint", {}).get("resume", "true"))
+    ).lower() == "true"
+
+    # Runs that may attempt a failing product before it is given up
+    RETRY_MAX_ATTEMPTS = int(
+        os.getenv("RETRY_MAX_ATTEMPTS")
+        or _cfg.get("checkpoint", {}).get("max_attempts")
+        or 3
+    )
+
+    # Treat fallback FAQs written during an LLM failure as failed
+    RETRY_DEGRADED = (
+        os.getenv("RETRY_DEGRADED")
+        or str(_cfg.get("checkpoint", {}).get("retry_degraded", "true"))
+    ).lower() == "true"
+
+    # Seconds between progress / ETA lines (0 = off)
+    PROGRESS_INTERVAL = float(
+        os.getenv("PROGRESS_INTERVAL")
+        or _cfg.get("checkpoint", {}).get("progress_interval", 10)
+    )
+
+    # ============================
+    # FAQ BATCHING
+    # ============================
+
+    # Products packed into one FAQ request in batch runs (1 = one request per product)
+    FAQ_BATCH_SIZE = int(
+        os.getenv("FAQ_BATCH_SIZE")
+        or _cfg.get("faq_batch", {}).get("size")
+        or 8
+    )
+
+    # Completion budget of one batched FAQ request; batches are split to fit it
+    FAQ_BATCH_MAX_TOKENS = int(
+        os.getenv("FAQ_BATCH_MAX_TOKENS")
+        or _cfg.get("faq_batch", {}).get("max_tokens")
+        or 4096
+    )
+
+    # ============================
+    # FAQ REUSE
+    # ============================
+
+    # Near-identical products (variants) reuse generated FAQs, see agents/faq_reuse.py
+    FAQ_REUSE = (
+        os.getenv("FAQ_REUSE")
+        or str(_cfg.get("faq_reuse", {}).get("enabled", "true"))
+    ).lower() == "true"
+
+    # Jaccard similarity of the FAQ prompt fields from which FAQs are reused
+    FAQ_REUSE_THRESHOLD = float(
+        os.getenv("FAQ_REUSE_THRESHOLD")
+        or _cfg.get("faq_reuse", {}).get("threshold")
+        or 0.9
+    )
+
+    # MinHash signature length and LSH bands (permutations / bands rows each)
+    FAQ_REUSE_PERMUTATIONS = int(
+        os.getenv("FAQ_REUSE_PERMUTATIONS")
+        or _cfg.get("faq_reuse", {}).get("permutations")
+        or 64
+    )
+
+    FAQ_REUSE_BANDS = int(
+        os.getenv("FAQ_REUSE_BANDS")
+        or _cfg.get("faq_reuse", {}).get("bands")
+        or 16
+    )
+
+    # Generated products kept for reuse (most recent first)
+    FAQ_REUSE_CAPACITY = int(
+        os.getenv("FAQ_REUSE_CAPACITY")
+        or _cfg.get("faq_reuse", {}).get("capacity")
+        or 10000
+    )
+
+    # ============================
+    # ORCHESTRATION
+    # ============================
+
+    # "direct"  -> call the three tools as a fixed pipeline (no planner LLM)
+    # "agentic" -> let the LangChain structured-chat agent decide
+    ORCHESTRATION_MODE = (
+        os.getenv("ORCHESTRATION_MODE")
+        or _cfg.get("orchestration", {}).get("mode")
+        or "direct"
+    ).lower()
+
     # ============================
     # LLM CONFIG
     # ============================
@@ -117,6 +401,240 @@ class Config:
         or 15
     )
 
+    # Stream FAQ completions and stop once MIN_QUESTIONS items have arrived
+    LLM_STREAMING = (
+        os.getenv("LLM_STREAMING")
+        or str(_cfg.get("llm", {}).get("streaming", "true"))
+    ).lower() == "true"
+
+    # Model context window (prompt + completion), used to size FAQ batches
+    LLM_CONTEXT_TOKENS = int(
+        os.getenv("LLM_CONTEXT_TOKENS")
+        or _cfg.get("llm", {}).get("context_tokens")
+        or 8192
+    )
+
+    # "compact" prompts (shared prefix, compact product fields) or the
+    # original "verbose" ones, see agents/prompt_builder.py
+    PROMPT_STYLE = (
+        os.getenv("PROMPT_STYLE")
+        or _cfg.get("llm", {}).get("prompt_style")
+        or "compact"
+    ).lower()
+
+    # "groq" or "fake" (deterministic offline stand-in, see infrastructure/fake_llm.py)
+    LLM_BACKEND = (
+        os.getenv("LLM_BACKEND")
+        or _cfg.get("llm", {}).get("backend")
+        or "groq"
+    ).lower()
+
+    FAKE_LLM_LATENCY = float(
+        os.getenv("FAKE_LLM_LATENCY")
+        or _cfg.get("llm", {}).get("fake_latency")
+        or 0.0
+    )
+
+    FAKE_LLM_FAILURE_RATE = float(
+        os.getenv("FAKE_LLM_FAILURE_RATE")
+        or _cfg.get("llm", {}).get("fake_failure_rate")
+        or 0.0
+    )
+
+    # ============================
+    # MODEL ROUTING
+    # ============================
+
+    # Groq model per task ("" = the backend's default model). Not
+    # QUESTION_MODEL / GENERATION_MODEL: those name Hugging Face models.
+    ORCHESTRATION_MODEL = (
+        os.getenv("ORCHESTRATION_MODEL")
+        or _cfg.get("routing", {}).get("orchestration")
+        or ""
+    )
+
+    FAQ_MODEL = (
+        os.getenv("FAQ_MODEL")
+        or _cfg.get("routing", {}).get("faq")
+        or ""
+    )
+
+    # Backup model for hedged requests ("" = no hedging)
+    HEDGE_MODEL = (
+        os.getenv("HEDGE_MODEL")
+        or _cfg.get("routing", {}).get("hedge_model")
+        or ""
+    )
+
+    # Hedge once a request outlives this latency percentile of its model
+    HEDGE_PERCENTILE = float(
+        os.getenv("HEDGE_PERCENTILE")
+        or _cfg.get("routing", {}).get("hedge_percentile")
+        or 95
+    )
+
+    # Hedge delay (seconds) until HEDGE_MIN_SAMPLES latencies are known
+    HEDGE_DELAY = float(
+        os.getenv("HEDGE_DELAY")
+        or _cfg.get("routing", {}).get("hedge_delay")
+        or 5.0
+    )
+
+    HEDGE_MIN_SAMPLES = int(
+        os.getenv("HEDGE_MIN_SAMPLES")
+        or _cfg.get("routing", {}).get("hedge_min_samples")
+        or 20
+    )
+
+    # Most requests that may be hedged, as a share of all requests
+    HEDGE_BUDGET = float(
+        os.getenv("HEDGE_BUDGET")
+        or _cfg.get("routing", {}).get("hedge_budget")
+        or 0.1
+    )
+
+    # Latencies kept per model for the percentile
+    ROUTING_WINDOW = int(
+        os.getenv("ROUTING_WINDOW")
+        or _cfg.get("routing", {}).get("window")
+        or 500
+    )
+
+    # USD per million (prompt, completion) tokens, for the cost report
+    MODEL_PRICES = {
+        "llama-3.1-8b-instant": (0.05, 0.08),
+        "llama-3.3-70b-versatile": (0.59, 0.79),
+        **{
+            model: tuple(price)
+            for model, price in (_cfg.get("routing", {}).get("prices") or {}).items()
+        },
+    }
+
+    # ============================
+    # GROQ TRANSPORT
+    # ============================
+
+    # Point at a local stub server (see infrastructure/groq_stub_server.py)
+    GROQ_BASE_URL = (
+        os.getenv("GROQ_BASE_URL")
+        or _cfg.get("groq", {}).get("base_url")
+        or None
+    )
+
+    LLM_TIMEOUT = float(
+        os.getenv("LLM_TIMEOUT")
+        or _cfg.get("groq", {}).get("timeout")
+        or 60
+    )
+
+    LLM_MAX_CONNECTIONS = int(
+        os.getenv("LLM_MAX_CONNECTIONS")
+        or _cfg.get("groq", {}).get("max_connections")
+        or 20
+    )
+
+    LLM_MAX_CONCURRENCY = int(
+        os.getenv("LLM_MAX_CONCURRENCY")
+        or _cfg.get("groq", {}).get("max_concurrency")
+        or 8
+    )
+
+    # Budgets per minute; 0 disables the limit
+    LLM_RPM = int(
+        os.getenv("LLM_RPM")
+        or _cfg.get("groq", {}).get("requests_per_minute")
+        or 0
+    )
+
+    LLM_TPM = int(
+        os.getenv("LLM_TPM")
+        or _cfg.get("groq", {}).get("tokens_per_minute")
+        or 0
+    )
+
+    LLM_MAX_RETRIES = int(
+        os.getenv("LLM_MAX_RETRIES")
+        or _cfg.get("groq", {}).get("max_retries")
+        or 5
+    )
+
+    LLM_RETRY_BASE_DELAY = float(
+        os.getenv("LLM_RETRY_BASE_DELAY")
+        or _cfg.get("groq", {}).get("retry_base_delay")
+        or 1.0
+    )
+
+    LLM_RETRY_MAX_DELAY = float(
+        os.getenv("LLM_RETRY_MAX_DELAY")
+        or _cfg.get("groq", {}).get("retry_max_delay")
+        or 30.0
+    )
+
+    # ============================
+    # LLM RESPONSE CACHE
+    # ============================
+
+    LLM_CACHE_ENABLED = (
+        os.getenv("LLM_CACHE_ENABLED")
+        or str(_cfg.get("llm_cache", {}).get("enabled", "true"))
+    ).lower() == "true"
+
+    LLM_CACHE_PATH = (
+        os.getenv("LLM_CACHE_PATH")
+        or _cfg.get("llm_cache", {}).get("path")
+        or ".cache/llm_responses.sqlite"
+    )
+
+    LLM_CACHE_MEMORY_SIZE = int(
+        os.getenv("LLM_CACHE_MEMORY_SIZE")
+        or _cfg.get("llm_cache", {}).get("memory_size")
+        or 1024
+    )
+
+    LLM_CACHE_DISK_SIZE = int(
+        os.getenv("LLM_CACHE_DISK_SIZE")
+        or _cfg.get("llm_cache", {}).get("disk_size")
+        or 100000
+    )
+
+    # Seconds; 0 = entries never expire
+    LLM_CACHE_TTL = float(
+        os.getenv("LLM_CACHE_TTL")
+        or _cfg.get("llm_cache", {}).get("ttl")
+        or 30 * 24 * 3600
+    )
+
+    # ============================
+    # INSTRUMENTATION
+    # ============================
+
+    METRICS_ENABLED = (
+        os.getenv("METRICS_ENABLED")
+        or str(_cfg.get("metrics", {}).get("enabled", "true"))
+    ).lower() == "true"
+
+    # Run report path (.json or .csv); empty = no report
+    METRICS_REPORT = (
+        os.getenv("METRICS_REPORT")
+        or _cfg.get("metrics", {}).get("report")
+        or ""
+    )
+
+    # Prometheus text-format counters path; empty = not written
+    METRICS_PROMETHEUS = (
+        os.getenv("METRICS_PROMETHEUS")
+        or _cfg.get("metrics", {}).get("prometheus")
+        or ""
+    )
+
+    # Most recent span events kept for the run report; stage summaries
+    # are running totals and do not depend on it
+    METRICS_MAX_EVENTS = int(
+        os.getenv("METRICS_MAX_EVENTS")
+        or _cfg.get("metrics", {}).get("max_events")
+        or 10000
+    )
+
     # ============================
     # LOGGING
     # ============================
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import random
+import re
+import time
+from typing import AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from infrastructure.config import Config
+from infrastructure.instrumentation import METRICS
+from infrastructure.lazy_llm import MODEL_NAMES
+
+_NAME = re.compile(r"Product Name:\s*(.+)")
+_ID = re.compile(r"^Product ID:\s*(.+)$", re.MULTILINE)
+
+# Characters per streamed chunk (a few tokens, like a real stream)
+STREAM_CHUNK = 16
+
+CATEGORIES = ("Usage", "Safety", "Ingredients", "Benefits", "Pricing", "General")
+
+
+class FakeLLMError(RuntimeError):
+    pass
+
+
+class FakeLLM(LLM):
+    """
+    Deterministic offline stand-in for GroqLLM (LLM_BACKEND=fake).
+
+    Answers FAQ prompts with a well-formed JSON array built from the
+    product name (a JSON object keyed by product id for batched prompts),
+    cut at `max_tokens` like a real completion, after `latency` seconds. A `failure_rate` share of
+    prompts raises instead; which prompts fail depends only on the prompt
+    and `seed`, so runs are reproducible.
+    """
+
+    model_name: str = MODEL_NAMES["fake"]
+    latency: float = 0.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    max_tokens: int = 1024
+
+    def __init__(self, latency: Optional[float] = None,
+                 failure_rate: Optional[float] = None, seed: int = 0):
+        super().__init__(
+            latency=Config.FAKE_LLM_LATENCY if latency is None else latency,
+            failure_rate=Config.FAKE_LLM_FAILURE_RATE if failure_rate is None else failure_rate,
+            seed=seed,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def run(self, prompt: str, **kwargs) -> str:
+        return self.invoke(prompt, **kwargs)
+
+    def _fails(self, prompt: str) -> bool:
+        return self.failure_rate > 0 and random.Random(f"{self.seed}:{prompt}").random() < self.failure_rate
+
+    def _respond(self, prompt: str, span: dict, max_tokens: int) -> str:
+        span["prompt_tokens"] = len(prompt) // 4
+        if self._fails(prompt):
+            raise FakeLLMError("FakeLLM: injected failure")
+
+        ids = _ID.findall(prompt)
+        if ids:
+            # Batched prompt: one FAQ list per "Product ID:" block
+            blocks = _ID.split(prompt)[2::2]
+            text = json.dumps({
+                pid.strip(): self._faqs(_NAME.search(block))
+                for pid, block in zip(ids, blocks)
+            })
+        else:
+            text = json.dumps(self._faqs(_NAME.search(prompt)))
+
+        # Like a real model, stop at the completion budget
+        text = text[: max_tokens * 4]
+        span["completion_tokens"] = len(text) // 4
+        return text
+
+    @staticmethod
+    def _faqs(match) -> List[dict]:
+        name = match.group(1).strip() if match else "this product"
+        return [
+            {"category": CATEGORIES[i % len(CATEGORIES)], "question": f"Question {i + 1} about {name}?"}
+            for i in range(Config.MIN_QUESTIONS)
+        ]
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        with METRICS.stage("llm", model=self.model_name) as span:
+            if self.latency:
+                time.sleep(self.latency)
+            return self._respond(prompt, span, kwargs.get("max_tokens") or self.max_tokens)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        with METRICS.stage("llm", model=self.model_name) as span:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self._respond(prompt, span, kwargs.get("max_tokens") or self.max_tokens)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs) -> Iterator[GenerationChunk]:
+        # The latency is spread over the chunks, so stopping early saves time
+        with METRICS.stage("llm", model=self.model_name, stream=1) as span:
+            text = self._respond(prompt, span, kwargs.get("max_tokens") or self.max_tokens)
+            chunks = [text[i:i + STREAM_CHUNK] for i in range(0, len(text), STREAM_CHUNK)] or [""]
+            sent, start = 0, time.perf_counter()
+            try:
+                for n, chunk in enumerate(chunks, 1):
+                    # Sleep towards the chunk's due time, not per chunk:
+                    # tiny sleeps overshoot
+                    delay = start + self.latency * n / len(chunks) - time.perf_counter()
+                    if delay > 0.002:
+                        time.sleep(delay)
+                    sent += len(chunk)
+                    yield GenerationChunk(text=chunk)
+            except GeneratorExit:
+                span["early_stop"] = 1
+                span["completion_tokens"] = sent // 4
+                raise
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs) -> AsyncIterator[GenerationChunk]:
+        with METRICS.stage("llm", model=self.model_name, stream=1) as span:
+            text = self._respond(prompt, span, kwargs.get("max_tokens") or self.max_tokens)
+            chunks = [text[i:i + STREAM_CHUNK] for i in range(0, len(text), STREAM_CHUNK)] or [""]
+            sent, start = 0, time.perf_counter()
+            try:
+                for n, chunk in enumerate(chunks, 1):
+                    delay = start + self.latency * n / len(chunks) - time.perf_counter()
+                    if delay > 0.002:
+                        await asyncio.sleep(delay)
+                    sent += len(chunk)
+                    yield GenerationChunk(text=chunk)
+            except GeneratorExit:
+                span["early_stop"] = 1
+                span["completion_tokens"] = sent // 4
+                raise
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class GroqStubServer:
+    """
+    Minimal local stand-in for the Groq chat-completions endpoint.
+
+    Start it and point Config.GROQ_BASE_URL at `server.url` before the first
+    GroqLLM is created to exercise pooling, rate limiting and retries
+    without network access:
+
+        with GroqStubServer(reply="[]", fail_every=3) as server:
+            Config.GROQ_BASE_URL = server.url
+            llm = LLMClient().as_langchain_llm()
+
+    `fail_every=n` answers every n-th request with a 429 to test retries.
+    Streaming requests get the reply as server-sent events, `chunk_size`
+    characters every `chunk_delay` seconds; `streamed_chars` counts what
+    was sent before the client finished or hung up.
+
+    `model_latency` overrides `latency` per requested model, and
+    `slow_every=n` adds `slow_latency` seconds to every n-th request, to
+    give a model a latency tail (see hedged requests in llm_client).
+    """
+
+    def __init__(self, reply: str = "[]", latency: float = 0.0, fail_every: int = 0,
+                 host: str = "127.0.0.1", port: int = 0,
+                 chunk_size: int = 16, chunk_delay: float = 0.0,
+                 model_latency: dict = None, slow_every: int = 0, slow_latency: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.model_latency = dict(model_latency or {})
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.fail_every = fail_every
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.streamed_chars = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: dict = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request (e.g. a cancelled hedge)
+                    pass
+
+            def _stream(self, count: int, model: str, prompt_tokens: int):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                def event(delta: dict, finish=None, usage=None):
+                    chunk = {
+                        "id": f"stub-{count}",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                        "x_groq": {"id": f"stub-{count}", "usage": usage},
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                try:
+                    for start in range(0, len(stub.reply), stub.chunk_size):
+                        piece = stub.reply[start:start + stub.chunk_size]
+                        event({"content": piece})
+                        with stub._lock:
+                            stub.streamed_chars += len(piece)
+                        if stub.chunk_delay:
+                            time.sleep(stub.chunk_delay)
+                    completion_tokens = len(stub.reply) // 4
+                    event({}, "stop", {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    })
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading: stop generating
+                    pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                with stub._lock:
+                    stub.requests += 1
+                    count = stub.requests
+
+                latency = stub.model_latency.get(request.get("model"), stub.latency)
+                if stub.slow_every and count % stub.slow_every == 0:
+                    latency += stub.slow_latency
+                if latency:
+                    time.sleep(latency)
+
+                if stub.fail_every and count % stub.fail_every == 0:
+                    self._send(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "tokens"}},
+                        {"retry-after": "0"},
+                    )
+                    return
+
+                prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+                prompt_tokens = len(prompt) // 4
+                completion_tokens = len(stub.reply) // 4
+
+                if request.get("stream"):
+                    self._stream(count, request.get("model", "stub"), prompt_tokens)
+                    return
+
+                self._send(200, {
+                    "id": f"stub-{count}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": stub.reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+        return Handler
+
+    def start(self) -> "GroqStubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
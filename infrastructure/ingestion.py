@@ -0,0 +1,249 @@
+import csv
+import json
+import queue
+import re
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from infrastructure.config import Config
+from infrastructure.instrumentation import METRICS
+
+CHUNK_SIZE = 64 * 1024
+
+# A single record larger than this is treated as malformed input rather
+# than buffered until EOF
+MAX_RECORD_CHARS = 16 * 1024 * 1024
+
+# CSV cells holding lists: either a JSON array or values separated by | or ;
+LIST_FIELDS = {"skin_type", "key_ingredients", "ingredients", "benefits"}
+
+_DECODER = json.JSONDecoder()
+_LIST_SPLIT = re.compile(r"[|;]")
+
+
+class IngestionError(Exception):
+    pass
+
+
+def detect_format(path: str) -> str:
+    name = path.lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return "json"
+
+
+def _iter_json_values(f, in_array: bool) -> Iterator[Any]:
+    """
+    Incrementally decodes JSON values from a text stream, reading it in
+    chunks. With in_array=True the values are the elements of one
+    top-level array; otherwise they are concatenated / newline-separated
+    values (a single object, or JSONL). Only the current chunk and the
+    value being decoded are kept in memory.
+    """
+    buffer = ""
+    pos = 0
+    eof = False
+    closed = False
+
+    while True:
+        # Skip whitespace and element separators
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if in_array and pos < len(buffer) and buffer[pos] == "]":
+            closed = True
+            break
+
+        if pos >= len(buffer):
+            if eof:
+                break
+            buffer = f.read(CHUNK_SIZE)
+            pos = 0
+            eof = not buffer
+            continue
+
+        try:
+            value, end = _DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof or len(buffer) - pos > MAX_RECORD_CHARS:
+                raise IngestionError(f"Invalid JSON: {e.msg}")
+            # Value spans past the chunk: keep the tail and read more
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        # A number at the very end of the buffer may be cut in half
+        if end == len(buffer) and not eof and not isinstance(value, (dict, list, str)):
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield value
+        pos = end
+        if pos > CHUNK_SIZE:
+            buffer = buffer[pos:]
+            pos = 0
+
+    if in_array and not closed:
+        raise IngestionError("Unterminated JSON array")
+
+
+def _iter_json(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        # Find the first significant character to tell arrays from objects
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        if not head:
+            return
+
+        if head == "[":
+            yield from _iter_json_values(f, in_array=True)
+        else:
+            yield from _iter_json_values(_Prepend(head, f), in_array=False)
+
+
+class _Prepend:
+    """
+    Pushes back the character consumed while sniffing the format.
+    """
+
+    def __init__(self, head: str, f):
+        self.head = head
+        self.f = f
+
+    def read(self, size: int) -> str:
+        if self.head:
+            head, self.head = self.head, ""
+            return head + self.f.read(size - 1)
+        return self.f.read(size)
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise IngestionError(f"Invalid JSON on line {line_no}: {e.msg}")
+
+
+def _csv_value(field: str, value: str) -> Any:
+    if field not in LIST_FIELDS:
+        return value
+    value = (value or "").strip()
+    if value.startswith("["):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            pass
+    return [v.strip() for v in _LIST_SPLIT.split(value) if v.strip()]
+
+
+def _iter_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield {k: _csv_value(k, v) for k, v in row.items() if k}
+
+
+def iter_raw_products(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streams raw product records from JSONL, a JSON array / object or CSV.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == "jsonl":
+        return _iter_jsonl(path)
+    if fmt == "csv":
+        return _iter_csv(path)
+    if fmt == "json":
+        return _iter_json(path)
+    raise IngestionError(f"Unknown catalog format: {fmt}")
+
+
+def count_records(path: str, fmt: Optional[str] = None) -> Optional[int]:
+    """
+    Cheap estimate of the number of records, for progress reporting:
+    non-empty lines of JSONL, data lines of CSV (cells spanning lines
+    count twice). None for JSON, whose size is only known once parsed.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == "json":
+        return None
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return max(0, count - 1) if fmt == "csv" else count
+
+
+_DONE = object()
+
+
+class ProductStream:
+    """
+    Reads and normalizes products on a background thread and hands them
+    over through a bounded queue, so at most `queue_size` products are in
+    memory ahead of the consumers regardless of catalog size.
+
+    Iterating yields (index, raw, product, error): `product` is the output
+    of ParserAgent.run, or None with `error` set when the record was rejected.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None,
+                 queue_size: Optional[int] = None, parser=None):
+        if parser is None:
+            from agents.parser_agent import ParserAgent
+            parser = ParserAgent()
+
+        self.path = path
+        self.fmt = fmt
+        self.parser = parser
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size or Config.INGEST_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._stop = threading.Event()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for index, raw in enumerate(iter_raw_products(self.path, self.fmt)):
+                try:
+                    with METRICS.stage("parse"):
+                        item = (index, raw, self.parser.run(raw), None)
+                except Exception as e:
+                    item = (index, raw, None, e)
+                if not self._put(item):
+                    return
+        except Exception as e:
+            # Unreadable input ends the stream with the error
+            self._put((None, None, None, e))
+        finally:
+            self._put(_DONE)
+
+    def __iter__(self) -> Iterator[Tuple[Optional[int], Any, Optional[Dict[str, Any]], Optional[Exception]]]:
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            self._stop.set()
@@ -0,0 +1,276 @@
+import contextvars
+import csv
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from infrastructure.config import Config
+
+# Product currently being processed by this thread / task
+_PRODUCT: contextvars.ContextVar = contextvars.ContextVar("product_id", default="")
+
+# Numeric span fields summed per stage in the report
+SUMMED_FIELDS = ("prompt_tokens", "completion_tokens", "retries", "cache_hit")
+
+EVENT_COLUMNS = ("stage", "product_id", "wall_ms") + SUMMED_FIELDS
+
+# Wall times kept per stage for p50/p95: exact up to this many calls, a
+# uniform sample of them beyond
+RESERVOIR_SIZE = 4096
+
+
+class _StageStats:
+    """
+    Running totals of one stage, in constant memory.
+    """
+
+    __slots__ = ("calls", "total_ms", "errors", "sums", "sample", "_rng")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.errors = 0
+        self.sums = dict.fromkeys(SUMMED_FIELDS, 0)
+        self.sample: List[float] = []
+        # Seeded, so a rerun of the same workload reports the same sample
+        self._rng = random.Random(0)
+
+    def add(self, event: Dict[str, Any]):
+        self.calls += 1
+        self.total_ms += event["wall_ms"]
+        if event.get("error"):
+            self.errors += 1
+        for field in SUMMED_FIELDS:
+            self.sums[field] += int(event.get(field) or 0)
+
+        # Reservoir sampling (Algorithm R)
+        if len(self.sample) < RESERVOIR_SIZE:
+            self.sample.append(event["wall_ms"])
+        else:
+            slot = self._rng.randrange(self.calls)
+            if slot < RESERVOIR_SIZE:
+                self.sample[slot] = event["wall_ms"]
+
+    def row(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "p50_ms": percentile(self.sample, 50),
+            "p95_ms": percentile(self.sample, 95),
+            "errors": self.errors,
+            **self.sums,
+        }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile, good enough for run summaries.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Metrics:
+    """
+    Per-stage, per-product timing and token accounting for a run.
+
+    Code under measurement opens a span:
+
+        with METRICS.stage("llm", model=name) as span:
+            ...
+            span["prompt_tokens"] = usage.prompt_tokens
+
+    Each closed span becomes one event (stage, product, wall time, extra
+    fields). Events update per-stage running totals (the summary) and the
+    last `max_events` of them are kept for the JSON / CSV run report, so
+    memory stays flat however many pages a run or the service produces.
+    Monotonically increasing counters feed the Prometheus text exposition.
+    Batch runs `reset` at their start.
+    """
+
+    def __init__(self, enabled: bool = True, max_events: int = 10000):
+        self.enabled = enabled
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self.events: deque = deque(maxlen=max_events)
+        self.stages: Dict[str, _StageStats] = {}
+        self.counters: Dict[str, float] = {}
+        self.dropped_events = 0
+        self.started = time.time()
+
+    # ===================== RECORDING =====================
+
+    @contextmanager
+    def product(self, product_id: str) -> Iterator[None]:
+        token = _PRODUCT.set(product_id)
+        try:
+            yield
+        finally:
+            _PRODUCT.reset(token)
+
+    @contextmanager
+    def stage(self, name: str, **fields) -> Iterator[Dict[str, Any]]:
+        span: Dict[str, Any] = dict(fields)
+        if not self.enabled:
+            yield span
+            return
+
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception:
+            span["error"] = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            event = {"stage": name, "product_id": _PRODUCT.get(), "wall_ms": round(elapsed * 1000, 3)}
+            event.update(span)
+            with self._lock:
+                self._add(event)
+                self._incr(f"stage_seconds_total{{stage=\"{name}\"}}", elapsed)
+                self._incr(f"stage_calls_total{{stage=\"{name}\"}}", 1)
+                for field in SUMMED_FIELDS:
+                    if span.get(field):
+                        self._incr(f"{field}_total{{stage=\"{name}\"}}", float(span[field]))
+                if span.get("error"):
+                    self._incr(f"stage_errors_total{{stage=\"{name}\"}}", 1)
+
+    def _add(self, event: Dict[str, Any]):
+        stats = self.stages.get(event["stage"])
+        if stats is None:
+            stats = self.stages[event["stage"]] = _StageStats()
+        stats.add(event)
+        if len(self.events) == self.max_events:
+            self.dropped_events += 1
+        self.events.append(event)
+
+    def _incr(self, key: str, value: float):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def incr(self, name: str, value: float = 1):
+        if self.enabled:
+            with self._lock:
+                self._incr(name, value)
+
+    def reset(self):
+        with self._lock:
+            self.events = deque(maxlen=self.max_events)
+            self.stages = {}
+            self.counters = {}
+            self.dropped_events = 0
+            self.started = time.time()
+
+    def drain(self) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """
+        Hands over (and forgets) what was recorded so far; worker
+        processes ship this back to the parent with each result.
+        """
+        with self._lock:
+            events, counters = list(self.events), self.counters
+            self.events, self.stages, self.counters = deque(maxlen=self.max_events), {}, {}
+        return events, counters
+
+    def merge(self, events: List[Dict[str, Any]], counters: Dict[str, float]):
+        if not self.enabled:
+            return
+        with self._lock:
+            for event in events:
+                self._add(event)
+            for key, value in counters.items():
+                self._incr(key, value)
+
+    # ===================== REPORTING =====================
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {stage: stats.row() for stage, stats in sorted(self.stages.items())}
+
+    def report(self) -> Dict[str, Any]:
+        stages = self.summary()
+        with self._lock:
+            counters, events, dropped = dict(self.counters), list(self.events), self.dropped_events
+        return {
+            "started_at": self.started,
+            "elapsed_s": round(time.time() - self.started, 3),
+            "stages": stages,
+            "counters": counters,
+            # The most recent events; `events_dropped` older ones were not kept
+            "events": events,
+            "events_dropped": dropped,
+        }
+
+    def write_report(self, path: str):
+        """
+        Writes the run report; `.csv` gets one row per event, anything
+        else the full JSON report.
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        if target.suffix.lower() == ".csv":
+            with self._lock:
+                events = list(self.events)
+            with open(target, "w", encoding="utf-8", newline="") as f:
+                columns = list(EVENT_COLUMNS)
+                for event in events:
+                    columns.extend(k for k in event if k not in columns)
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(events)
+        else:
+            target.write_text(json.dumps(self.report(), indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def prometheus_text(self, prefix: str = "kasparro_") -> str:
+        lines = []
+        typed = set()
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for key, value in counters:
+            name = prefix + key.split("{", 1)[0]
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{prefix}{key} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(self.prometheus_text(), encoding="utf-8")
+
+    def print_summary(self):
+        stages = self.summary()
+        if not stages:
+            return
+        print("\n⏱️  Stage breakdown")
+        for stage, row in stages.items():
+            tokens = row["prompt_tokens"] + row["completion_tokens"]
+            extra = f"  tokens={tokens}" if tokens else ""
+            if row["retries"]:
+                extra += f"  retries={row['retries']}"
+            if row["cache_hit"]:
+                extra += f"  cache_hits={row['cache_hit']}"
+            print(
+                f"   {stage:<14} calls={row['calls']:<6} total={row['total_ms']:.0f}ms  "
+                f"p50={row['p50_ms']:.1f}ms  p95={row['p95_ms']:.1f}ms{extra}"
+            )
+
+        # Items recovered from malformed / truncated LLM output (see json_extract)
+        salvaged = self.counters.get("json_items_salvaged_total", 0)
+        dropped = self.counters.get("json_items_dropped_total", 0)
+        if salvaged or dropped:
+            print(
+                f"   json salvage   {salvaged:g} items recovered, {dropped:g} lost "
+                f"({salvaged / (salvaged + dropped):.0%} salvage rate)"
+            )
+
+
+METRICS = Metrics(enabled=Config.METRICS_ENABLED, max_events=Config.METRICS_MAX_EVENTS)
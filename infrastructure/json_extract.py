@@ -0,0 +1,390 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+from infrastructure.instrumentation import METRICS
+
+_FENCE = re.compile(r"```[A-Za-z]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_KEY = re.compile(r"[A-Za-z_][\w\-]*")
+_LITERALS = {"true": True, "false": False, "null": None,
+             "True": True, "False": False, "None": None}
+_WS = " \t\r\n"
+
+# Openers tried before giving up on a response (prose may contain brackets)
+MAX_CANDIDATES = 4
+
+
+class _Incomplete(Exception):
+    """The text ends inside the value."""
+
+
+class _Invalid(Exception):
+    """The text at this position is not a (repairable) JSON value."""
+
+
+class _Parser:
+    """
+    Lenient JSON reader for model output.
+
+    On top of strict JSON it accepts single-quoted strings, Python
+    literals (True/False/None), bare object keys, trailing commas and
+    missing commas. Unreadable array elements are skipped and counted.
+
+    With salvage=True, text that ends mid-value yields the containers
+    read so far instead of failing: complete array items are kept, the
+    item cut off by the end of the text is dropped.
+    """
+
+    def __init__(self, text: str, salvage: bool = False):
+        self.s = text
+        self.n = len(text)
+        self.salvage = salvage
+        self.dropped = 0
+        self.truncated = False
+
+    def skip(self, i: int, seps: str = _WS) -> int:
+        while i < self.n and self.s[i] in seps:
+            i += 1
+        return i
+
+    def _partial(self, value):
+        if not self.salvage:
+            raise _Incomplete
+        self.truncated = True
+        return value, self.n
+
+    def skip_element(self, i: int) -> Optional[int]:
+        """
+        Position of the ',' or closing bracket ending the element at `i`,
+        or None if the text ends first.
+        """
+        depth = 0
+        while i < self.n:
+            c = self.s[i]
+            if c in "\"'":
+                i += 1
+                while i < self.n and self.s[i] != c:
+                    i += 2 if self.s[i] == "\\" else 1
+            elif c in "[{":
+                depth += 1
+            elif c in "]}":
+                if depth == 0:
+                    return i
+                depth -= 1
+            elif c == "," and depth == 0:
+                return i
+            i += 1
+        return None
+
+    def closing(self, i: int) -> Optional[int]:
+        """
+        Position just past the bracket closing the one at `i`, or None if
+        the text ends first.
+        """
+        depth = 0
+        while i < self.n:
+            c = self.s[i]
+            if c in "\"'":
+                i += 1
+                while i < self.n and self.s[i] != c:
+                    i += 2 if self.s[i] == "\\" else 1
+            elif c in "[{":
+                depth += 1
+            elif c in "]}":
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return None
+
+    def value(self, i: int) -> Tuple[Any, int]:
+        i = self.skip(i)
+        if i >= self.n:
+            raise _Incomplete
+        c = self.s[i]
+        if c == "[":
+            return self.array(i + 1)
+        if c == "{":
+            return self.object(i + 1)
+        if c in "\"'":
+            return self.string(i)
+
+        match = _NUMBER.match(self.s, i)
+        if match:
+            # A number at the very end may be cut in half
+            if match.end() == self.n:
+                raise _Incomplete
+            text = match.group()
+            return (float(text) if any(ch in text for ch in ".eE") else int(text)), match.end()
+
+        for word, literal in _LITERALS.items():
+            if self.s.startswith(word, i):
+                return literal, i + len(word)
+            if word.startswith(self.s[i:]):
+                raise _Incomplete
+        raise _Invalid
+
+    def string(self, i: int) -> Tuple[str, int]:
+        quote = self.s[i]
+        j = i + 1
+        while j < self.n and self.s[j] != quote:
+            j += 2 if self.s[j] == "\\" else 1
+        if j >= self.n:
+            raise _Incomplete
+
+        body = self.s[i + 1:j]
+        if quote == "'":
+            # 'It\'s "fine"' -> "It's \"fine\""
+            body = body.replace("\\'", "'").replace('\\"', '"').replace('"', '\\"')
+        try:
+            return json.loads(f'"{body}"', strict=False), j + 1
+        except ValueError:
+            raise _Invalid
+
+    def array(self, i: int) -> Tuple[list, int]:
+        items: list = []
+        while True:
+            i = self.skip(i, _WS + ",")
+            if i >= self.n:
+                return self._partial(items)
+            if self.s[i] == "]":
+                return items, i + 1
+            try:
+                item, i = self.value(i)
+            except _Incomplete:
+                if self.salvage:
+                    self.dropped += 1
+                return self._partial(items)
+            except _Invalid:
+                end = self.skip_element(i)
+                if end is None:
+                    if self.salvage:
+                        self.dropped += 1
+                    return self._partial(items)
+                self.dropped += 1
+                i = end + 1 if self.s[end] == "," else end
+                continue
+            if self.truncated and isinstance(item, dict):
+                # An object cut off by the end of the text is not an item
+                self.dropped += 1
+                return items, i
+            items.append(item)
+
+    def object(self, i: int) -> Tuple[dict, int]:
+        obj: dict = {}
+        while True:
+            i = self.skip(i, _WS + ",")
+            if i >= self.n:
+                return self._partial(obj)
+            if self.s[i] == "}":
+                return obj, i + 1
+
+            if self.s[i] in "\"'":
+                try:
+                    key, i = self.string(i)
+                except _Incomplete:
+                    return self._partial(obj)
+            else:
+                match = _KEY.match(self.s, i)
+                if not match:
+                    raise _Invalid
+                key, i = match.group(), match.end()
+
+            i = self.skip(i)
+            if i >= self.n:
+                return self._partial(obj)
+            if self.s[i] != ":":
+                raise _Invalid
+
+            try:
+                value, i = self.value(i + 1)
+            except _Incomplete:
+                return self._partial(obj)
+            if self.truncated and not isinstance(value, list):
+                return obj, i
+            obj[key] = value
+
+
+class Extraction:
+    """
+    Result of extract_json.
+
+    `complete` is True when the response held well-formed JSON. Otherwise
+    `value` is what could be recovered: `salvaged` array items were kept
+    and `dropped` unreadable or cut-off items were lost.
+    """
+
+    def __init__(self, value: Any = None, complete: bool = False,
+                 salvaged: int = 0, dropped: int = 0):
+        self.value = value
+        self.complete = complete
+        self.salvaged = salvaged
+        self.dropped = dropped
+
+    @property
+    def ok(self) -> bool:
+        return self.value is not None
+
+    @property
+    def items(self) -> list:
+        return self.value if isinstance(self.value, list) else []
+
+    def salvage_rate(self) -> float:
+        seen = self.salvaged + self.dropped
+        return self.salvaged / seen if seen else 1.0
+
+
+def _count_items(value: Any) -> int:
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(v) for v in value.values() if isinstance(v, list))
+    return 0
+
+
+def _coerce(value: Any, expect: type) -> Any:
+    if isinstance(value, expect):
+        return value
+    # {"faqs": [...]} when an array was asked for
+    if expect is list and isinstance(value, dict):
+        lists = [v for v in value.values() if isinstance(v, list)]
+        if len(lists) == 1:
+            return lists[0]
+    return None
+
+
+def _record(result: Extraction) -> Extraction:
+    outcome = "clean" if result.complete else ("salvaged" if result.ok else "failed")
+    METRICS.incr(f"json_extract_total{{outcome=\"{outcome}\"}}")
+    if result.salvaged:
+        METRICS.incr("json_items_salvaged_total", result.salvaged)
+    if result.dropped:
+        METRICS.incr("json_items_dropped_total", result.dropped)
+    return result
+
+
+def extract_json(raw: str, expect: type = list) -> Extraction:
+    """
+    Recovers a JSON array (expect=list) or object (expect=dict) from a
+    model response that may wrap it in prose or code fences, use
+    near-JSON syntax, or be cut off mid-way.
+    """
+    text = _FENCE.sub("", raw or "")
+    best = Extraction()
+    start = -1
+    # End of the last top-level value; openers before it are nested in it
+    outer = 0
+
+    for _ in range(MAX_CANDIDATES):
+        start = min((p for p in (text.find("[", start + 1), text.find("{", start + 1)) if p != -1), default=-1)
+        if start == -1:
+            break
+
+        nested = start < outer
+        if not nested:
+            outer = _Parser(text).closing(start) or len(text)
+
+            # Well-formed JSON: the common, cheap case. A value nested in a
+            # top-level one of the wrong type is never reported as complete.
+            try:
+                value, _ = json.JSONDecoder().raw_decode(text, start)
+                value = _coerce(value, expect)
+                if value is not None:
+                    return _record(Extraction(value, complete=True))
+            except ValueError:
+                pass
+
+        parser = _Parser(text, salvage=True)
+        try:
+            value, _ = parser.value(start)
+        except (_Incomplete, _Invalid):
+            continue
+        value = _coerce(value, expect)
+        if value is None:
+            continue
+
+        candidate = Extraction(value, salvaged=_count_items(value), dropped=parser.dropped)
+        if candidate.salvaged > best.salvaged or not best.ok:
+            best = candidate
+        if candidate.salvaged:
+            break
+
+    return _record(best)
+
+
+class JSONItemStream:
+    """
+    Incremental reader for a JSON array arriving in chunks (a streamed
+    completion). `feed` returns the array items completed by each chunk,
+    so a caller can stop the stream once it has enough; `close` salvages
+    what is left, like extract_json.
+
+    Text before the first '[' (prose, code fences) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.started = False
+        self.done = False
+        self.items: List[Any] = []
+        self.dropped = 0
+
+    def feed(self, chunk: str) -> List[Any]:
+        new: List[Any] = []
+        if self.done:
+            return new
+        self.buffer += chunk
+
+        if not self.started:
+            start = self.buffer.find("[")
+            if start == -1:
+                return new
+            self.buffer = self.buffer[start + 1:]
+            self.started = True
+
+        parser = _Parser(self.buffer)
+        pos = 0
+        while True:
+            i = parser.skip(pos, _WS + ",")
+            if i >= parser.n:
+                break
+            if self.buffer[i] == "]":
+                self.done = True
+                pos = i + 1
+                break
+            try:
+                item, pos = parser.value(i)
+            except _Incomplete:
+                break
+            except _Invalid:
+                end = parser.skip_element(i)
+                if end is None:
+                    break
+                self.dropped += 1
+                pos = end + 1 if self.buffer[end] == "," else end
+                continue
+            new.append(item)
+
+        # Only the unfinished tail is kept
+        self.buffer = self.buffer[pos:]
+        self.items.extend(new)
+        return new
+
+    def close(self) -> Extraction:
+        if self.started and not self.done and self.buffer.strip():
+            parser = _Parser(self.buffer, salvage=True)
+            try:
+                tail, _ = parser.array(0)
+            except _Invalid:
+                tail = []
+            self.items.extend(tail)
+            self.dropped += parser.dropped
+
+        if not self.started:
+            return _record(Extraction())
+        complete = self.done and not self.dropped
+        return _record(Extraction(
+            self.items, complete=complete,
+            salvaged=0 if complete else len(self.items), dropped=self.dropped
+        ))
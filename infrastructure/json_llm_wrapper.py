@@ -1,43 +1,62 @@
 import json
-import re
+
+from infrastructure.json_extract import extract_json
 from infrastructure.llm_client import LLMClient
 
+
+def _item_key(item) -> str:
+    # FAQ-like items are identified by their question, anything else by value
+    if isinstance(item, dict) and isinstance(item.get("question"), str):
+        return item["question"].strip().lower()
+    return json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+
+
 class JSONForcingLLM:
     """
     Wraps LLMClient and forces it to always output valid JSON using:
     1. Strong JSON-structured prompt framing
-    2. Extraction of the JSON substring
-    3. Cleaning heuristics
+    2. Tolerant extraction of the JSON array (see extract_json), which
+       keeps the readable items of fenced, sloppy or truncated output
+    3. A follow-up request for the missing items only
     4. Full fallback if all attempts fail
-    """
-
-    def __init__(self):
-        self.client = LLMClient()
 
-    def generate_json(self, prompt: str, fallback: list):
-        raw = self.client.generate(prompt)
-
-        # Step 1 — Extract JSON array/brackets
-        start = raw.find("[")
-        end = raw.rfind("]")
-
-        if start == -1 or end == -1:
-            return fallback
-
-        candidate = raw[start:end+1]
-
-        # Step 2 — Clean common JSON issues
-        cleaned = candidate.replace("'", "\"")
-        cleaned = re.sub(r",\s*}", "}", cleaned)
-        cleaned = re.sub(r",\s*]", "]", cleaned)
+    Answers that were not well-formed JSON are dropped from the LLM cache.
+    """
 
-        # Step 3 — Try parsing
-        try:
-            data = json.loads(cleaned)
-            if isinstance(data, list):
-                return data
-        except Exception:
-            pass
+    def __init__(self, llm=None):
+        self.llm = llm or LLMClient().as_langchain_llm()
+
+    def _extract(self, prompt: str, raw: str) -> list:
+        extraction = extract_json(raw)
+        forget = getattr(self.llm, "forget", None)
+        if forget is not None and not extraction.complete:
+            forget(prompt)
+        return extraction.items
+
+    def generate_json(self, prompt: str, fallback: list, min_items: int = 0):
+        # Step 1 — The caller's prompt asks for a JSON array only
+        raw = self.llm.run(prompt)
+
+        # Step 2 — Keep every readable item
+        items = self._extract(prompt, raw)
+
+        # Step 3 — Ask only for what is missing
+        if items and len(items) < min_items:
+            followup = (
+                f"{prompt}\n\n"
+                f"You already returned these {len(items)} items:\n"
+                f"{json.dumps(items, ensure_ascii=False)}\n"
+                f"Return ONLY a JSON array with the {min_items - len(items)} missing items."
+            )
+            seen = {_item_key(item) for item in items}
+            for item in self._extract(followup, self.llm.run(followup)):
+                key = _item_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    items.append(item)
+
+        if items and len(items) >= min_items:
+            return items
 
         # Step 4 — Last fallback
         return fallback
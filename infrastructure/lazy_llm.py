@@ -0,0 +1,69 @@
+import threading
+from typing import Optional
+
+from infrastructure.config import Config
+
+# Model of each backend, known without importing the backend (used in
+# page fingerprints before any request is made)
+MODEL_NAMES = {
+    "groq": "llama-3.1-8b-instant",
+    "fake": "fake-llm",
+}
+
+# Tasks that can be routed to their own model
+TASKS = ("faq", "orchestration")
+
+
+def route_model(task: Optional[str] = None, backend: Optional[str] = None) -> str:
+    """
+    Model serving `task` on `backend`: the configured route (FAQ_MODEL,
+    ORCHESTRATION_MODEL) or the backend's default model. The fake
+    backend has a single model.
+    """
+    task = task or "faq"
+    if task not in TASKS:
+        raise ValueError(f"Unknown LLM task: {task}")
+    backend = (backend or Config.LLM_BACKEND).lower()
+    if backend != "groq":
+        return MODEL_NAMES.get(backend, "")
+    routes = {"faq": Config.FAQ_MODEL, "orchestration": Config.ORCHESTRATION_MODEL}
+    return routes[task] or MODEL_NAMES["groq"]
+
+
+class LazyLLM:
+    """
+    Stand-in for the LangChain LLM that builds it on first use.
+
+    Importing the backend (LangChain, the Groq SDK, httpx) dominates the
+    startup of short runs, and a run whose pages are all reused never
+    calls the model. Any attribute other than `model_name` loads the LLM
+    and is forwarded to it; `load()` returns the LLM itself for APIs that
+    need the real object (the agentic executor).
+
+    `task` selects the routed model (see route_model).
+    """
+
+    def __init__(self, backend: Optional[str] = None, task: Optional[str] = None):
+        self.backend = (backend or Config.LLM_BACKEND).lower()
+        self.task = task or "faq"
+        self.model_name = route_model(self.task, self.backend)
+        self._llm = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._llm is not None
+
+    def load(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    from infrastructure.llm_client import LLMClient
+                    self._llm = LLMClient().as_langchain_llm(self.backend, self.task)
+        return self._llm
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes the stand-in does not have itself
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
@@ -1,35 +1,674 @@
+import asyncio
 import os
-from groq import Groq
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from groq import Groq, AsyncGroq, APIConnectionError, APIStatusError
 from langchain_core.language_models.llms import LLM
-from typing import Optional, List
+from langchain_core.outputs import GenerationChunk
 
-class GroqLLM(LLM):
-    client: Groq = None
+from infrastructure.config import Config
+from infrastructure.instrumentation import METRICS, percentile
+from infrastructure.lazy_llm import MODEL_NAMES, route_model
+from infrastructure.llm_cache import cache_key, get_llm_cache
+from infrastructure.rate_limiter import RateLimiter
+
+# First message of every request. It must stay byte-identical across
+# requests: it is the start of the prompt prefix the provider can cache.
+SYSTEM_PROMPT = "You are a helpful AI assistant"
+
+# Status codes worth retrying: rate limits, conflicts, timeouts and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class _ClientPool:
+    """
+    Process-wide Groq clients shared by every GroqLLM instance.
+
+    The sync client wraps one pooled httpx.Client. Async clients are bound
+    to an event loop, so one pooled httpx.AsyncClient is kept per loop.
+    The rate limiter and concurrency caps are shared by both paths.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync: Optional[Groq] = None
+        self._async = weakref.WeakKeyDictionary()
+        self.limiter = RateLimiter(Config.LLM_RPM, Config.LLM_TPM)
+        self.sync_slots = threading.BoundedSemaphore(Config.LLM_MAX_CONCURRENCY)
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=Config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.LLM_MAX_CONNECTIONS,
+        )
+
+    def sync_client(self, api_key: str) -> Groq:
+        with self._lock:
+            if self._sync is None:
+                self._sync = Groq(
+                    api_key=api_key,
+                    base_url=Config.GROQ_BASE_URL,
+                    max_retries=0,  # retries are handled by GroqLLM
+                    timeout=Config.LLM_TIMEOUT,
+                    http_client=httpx.Client(limits=self._limits(), timeout=Config.LLM_TIMEOUT),
+                )
+            return self._sync
+
+    def async_client(self, api_key: str):
+        """
+        Returns (client, semaphore) for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async:
+                client = AsyncGroq(
+                    api_key=api_key,
+                    base_url=Config.GROQ_BASE_URL,
+                    max_retries=0,
+                    timeout=Config.LLM_TIMEOUT,
+                    http_client=httpx.AsyncClient(limits=self._limits(), timeout=Config.LLM_TIMEOUT),
+                )
+                self._async[loop] = (client, asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY))
+            return self._async[loop]
+
+    def hedge_pool(self) -> ThreadPoolExecutor:
+        """
+        Threads running hedged sync requests (the primary and its backup).
+        A losing request cannot be interrupted and finishes in the
+        background, so there is room for two per concurrency slot.
+        """
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=2 * Config.LLM_MAX_CONCURRENCY, thread_name_prefix="llm-hedge"
+                )
+            return self._hedge_pool
+
+
+_POOL = _ClientPool()
+
+
+class ModelRouter:
+    """
+    Per-model latency and cost of the requests of this process, and the
+    hedging policy built on them.
+
+    A completion request to the routed model that has not answered after
+    the model's HEDGE_PERCENTILE latency (HEDGE_DELAY until
+    HEDGE_MIN_SAMPLES latencies are known) is sent again to HEDGE_MODEL,
+    and the first answer wins. The delay follows the observed latencies,
+    so only the tail is hedged; HEDGE_BUDGET caps the share of requests
+    hedged, so a slow provider cannot double the traffic.
+    """
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.hedges = 0
+
+    def _stats(self, model: str) -> Dict[str, Any]:
+        stats = self._models.get(model)
+        if stats is None:
+            stats = self._models[model] = {
+                "latencies": deque(maxlen=Config.ROUTING_WINDOW),
+                "calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cost_usd": 0.0, "hedged": 0, "hedge_wins": 0, "cancelled": 0,
+            }
+        return stats
+
+    @staticmethod
+    def cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = Config.MODEL_PRICES.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+    def observe(self, model: str, seconds: float, prompt_tokens: int = 0,
+                completion_tokens: int = 0, error: bool = False, cancelled: bool = False):
+        """
+        Records one request. Failed and cancelled requests (lost hedges)
+        only count, and cost: their latency says nothing about the model's
+        answers, and a cancelled one would drag the hedge delay down.
+        """
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            stats = self._stats(model)
+            stats["calls"] += 1
+            if error:
+                stats["errors"] += 1
+            elif cancelled:
+                stats["cancelled"] += 1
+            else:
+                stats["latencies"].append(seconds)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["cost_usd"] += cost
+        METRICS.incr(f"llm_requests_total{{model=\"{model}\"}}")
+        if cost:
+            METRICS.incr(f"llm_cost_usd_total{{model=\"{model}\"}}", cost)
+
+    def hedge_delay(self, model: str) -> float:
+        """
+        Seconds to wait for `model` before hedging a request, and counts
+        the request against the hedge budget.
+        """
+        with self._lock:
+            self.requests += 1
+            latencies = list(self._stats(model)["latencies"])
+        if len(latencies) < Config.HEDGE_MIN_SAMPLES:
+            return Config.HEDGE_DELAY
+        return percentile(latencies, Config.HEDGE_PERCENTILE)
+
+    def claim_hedge(self, model: str) -> bool:
+        """
+        Whether a slow request to `model` may be hedged (within budget).
+        """
+        with self._lock:
+            if self.hedges + 1 > Config.HEDGE_BUDGET * self.requests:
+                return False
+            self.hedges += 1
+            self._stats(model)["hedged"] += 1
+        METRICS.incr("llm_hedged_total")
+        return True
+
+    def hedge_won(self, model: str):
+        with self._lock:
+            self._stats(model)["hedge_wins"] += 1
+        METRICS.incr("llm_hedge_wins_total")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            models = {model: dict(stats) for model, stats in self._models.items()}
+        summary = {}
+        for model, stats in sorted(models.items()):
+            latencies = [seconds * 1000 for seconds in stats.pop("latencies")]
+            stats["p50_ms"] = percentile(latencies, 50)
+            stats["p95_ms"] = percentile(latencies, 95)
+            summary[model] = stats
+        return summary
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print("\n🔀 Models")
+        for model, row in summary.items():
+            extra = f"  errors={row['errors']}" if row["errors"] else ""
+            if row["hedged"]:
+                extra += f"  hedged={row['hedged']}"
+            if row["hedge_wins"]:
+                extra += f"  hedge_wins={row['hedge_wins']}"
+            if row["cancelled"]:
+                extra += f"  cancelled={row['cancelled']}"
+            print(
+                f"   {model:<26} calls={row['calls']:<6} p50={row['p50_ms']:.0f}ms  "
+                f"p95={row['p95_ms']:.0f}ms  tokens={row['prompt_tokens'] + row['completion_tokens']}  "
+                f"cost=${row['cost_usd']:.4f}{extra}"
+            )
+
+
+ROUTER = ModelRouter()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    # Covers APITimeoutError as well
+    return isinstance(error, APIConnectionError)
+
+
+def _backoff(attempt: int, error: Exception) -> float:
+    """
+    Exponential backoff with full jitter; honours Retry-After on 429/503.
+    """
+    cap = min(Config.LLM_RETRY_MAX_DELAY, Config.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+    delay = random.uniform(0, cap)
+
+    if isinstance(error, APIStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+
+    return delay
+
+
+class GroqLLM(LLM):
+    client: Any = None
+    api_key: str = ""
+    model_name: str = MODEL_NAMES["groq"]   # ✅ LIVE GROQ MODEL
+    temperature: float = Config.TEMPERATURE
+    max_tokens: int = 1024
+
+    def __init__(self, model_name: Optional[str] = None):
         super().__init__()
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError("❌ GROQ_API_KEY not set")
-        self.client = Groq(api_key=api_key)
+        self.api_key = api_key
+        self.client = _POOL.sync_client(api_key)
+        if model_name:
+            self.model_name = model_name
 
     @property
     def _llm_type(self) -> str:
         return "groq"
 
-    def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        response = self.client.chat.completions.create(
-            model="llama-3.1-8b-instant",   # ✅ LIVE GROQ MODEL
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant"},
+    def run(self, prompt: str, **kwargs) -> str:
+        """
+        Plain prompt -> completion call used by the agents.
+        `max_tokens=` overrides the completion budget for this call.
+        """
+        return self.invoke(prompt, **kwargs)
+
+    def _request(self, prompt: str, max_tokens: int, model: Optional[str] = None,
+                 stop: Optional[List[str]] = None) -> dict:
+        request = {
+            "model": model or self.model_name,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.3,
-            max_tokens=1024
-        )
-        return response.choices[0].message.content
+            "temperature": self.temperature,
+            "max_tokens": max_tokens,
+        }
+        if stop:
+            request["stop"] = list(stop)
+        return request
+
+    @staticmethod
+    def _token_budget(prompt: str, max_tokens: int) -> int:
+        # ~4 characters per token, plus the worst-case completion
+        return len(prompt) // 4 + max_tokens
+
+    @staticmethod
+    def _used_tokens(response, fallback: int, span: dict) -> int:
+        usage = getattr(response, "usage", None)
+        span["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+        span["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+        return getattr(usage, "total_tokens", None) or fallback
+
+    def _cache_key(self, prompt: str, max_tokens: int, partial: bool = False,
+                   model: Optional[str] = None, stop: Optional[List[str]] = None) -> str:
+        # Keyed on everything sent to the model (system message, stop, ...)
+        request = self._request(prompt, max_tokens, model, stop)
+        # A stream cut short by its reader is only reused by streaming calls
+        if partial:
+            request["stream_partial"] = True
+        return cache_key(request)
+
+    def forget(self, prompt: str, max_tokens: Optional[int] = None,
+               stop: Optional[List[str]] = None):
+        """
+        Drops the cached answers to a request whose caller could not use
+        them (truncated or unparseable text), so a rerun asks the model
+        again instead of replaying the same answer for the cache TTL.
+        """
+        cache = get_llm_cache()
+        if cache is None:
+            return
+        max_tokens = max_tokens or self.max_tokens
+        for model in {self.model_name, Config.HEDGE_MODEL or self.model_name}:
+            for partial in (False, True):
+                cache.delete(self._cache_key(prompt, max_tokens, partial, model, stop))
+
+    def _cached(self, cache, prompt: str, max_tokens: int, span: dict,
+                stop: Optional[List[str]] = None) -> Optional[str]:
+        """
+        The cached answer of the routed model or, failing that, of the
+        hedge model: hedge wins are cached under the model that wrote them.
+        """
+        models = [self.model_name]
+        if Config.HEDGE_MODEL and Config.HEDGE_MODEL != self.model_name:
+            models.append(Config.HEDGE_MODEL)
+        for model in models:
+            cached = cache.get(self._cache_key(prompt, max_tokens, model=model, stop=stop))
+            if cached is not None:
+                span["cache_hit"] = 1
+                if model != self.model_name:
+                    span["model"] = model
+                return cached
+        return None
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        max_tokens = kwargs.get("max_tokens") or self.max_tokens
+        with METRICS.stage("llm", model=self.model_name) as span:
+            cache = get_llm_cache()
+            if cache is not None:
+                cached = self._cached(cache, prompt, max_tokens, span, stop)
+                if cached is not None:
+                    return cached
+
+            text, model = self._complete(prompt, span, max_tokens, stop)
+            if cache is not None:
+                # A hedge win is cached under the model that wrote it
+                cache.put(self._cache_key(prompt, max_tokens, model=model, stop=stop), text)
+            return text
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        max_tokens = kwargs.get("max_tokens") or self.max_tokens
+        with METRICS.stage("llm", model=self.model_name) as span:
+            cache = get_llm_cache()
+            if cache is not None:
+                cached = self._cached(cache, prompt, max_tokens, span, stop)
+                if cached is not None:
+                    return cached
+
+            text, model = await self._acomplete(prompt, span, max_tokens, stop)
+            if cache is not None:
+                cache.put(self._cache_key(prompt, max_tokens, model=model, stop=stop), text)
+            return text
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs) -> Iterator[GenerationChunk]:
+        """
+        Streams the completion as it is generated (`llm.stream(prompt)`).
+        A reader that stops iterating closes the connection, which stops
+        the generation and the billing of further tokens.
+        """
+        max_tokens = kwargs.get("max_tokens") or self.max_tokens
+        with METRICS.stage("llm", model=self.model_name, stream=1) as span:
+            cache = get_llm_cache()
+            key = self._cache_key(prompt, max_tokens, stop=stop)
+            if cache is not None:
+                cached = cache.get(key) or cache.get(self._cache_key(prompt, max_tokens, True, stop=stop))
+                if cached is not None:
+                    span["cache_hit"] = 1
+                    yield GenerationChunk(text=cached)
+                    return
+
+            parts: List[str] = []
+            try:
+                for text in self._stream_complete(prompt, span, max_tokens, stop):
+                    parts.append(text)
+                    if run_manager:
+                        run_manager.on_llm_new_token(text)
+                    yield GenerationChunk(text=text)
+            except GeneratorExit:
+                span["early_stop"] = 1
+                if cache is not None and parts:
+                    cache.put(self._cache_key(prompt, max_tokens, True, stop=stop), "".join(parts))
+                raise
+
+            if cache is not None:
+                cache.put(key, "".join(parts))
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs) -> AsyncIterator[GenerationChunk]:
+        """
+        Async counterpart of _stream, on the per-loop AsyncGroq client.
+        """
+        max_tokens = kwargs.get("max_tokens") or self.max_tokens
+        with METRICS.stage("llm", model=self.model_name, stream=1) as span:
+            cache = get_llm_cache()
+            key = self._cache_key(prompt, max_tokens, stop=stop)
+            if cache is not None:
+                cached = cache.get(key) or cache.get(self._cache_key(prompt, max_tokens, True, stop=stop))
+                if cached is not None:
+                    span["cache_hit"] = 1
+                    yield GenerationChunk(text=cached)
+                    return
+
+            parts: List[str] = []
+            try:
+                async for text in self._astream_complete(prompt, span, max_tokens, stop):
+                    parts.append(text)
+                    if run_manager:
+                        await run_manager.on_llm_new_token(text)
+                    yield GenerationChunk(text=text)
+            except GeneratorExit:
+                span["early_stop"] = 1
+                if cache is not None and parts:
+                    cache.put(self._cache_key(prompt, max_tokens, True, stop=stop), "".join(parts))
+                raise
+
+            if cache is not None:
+                cache.put(key, "".join(parts))
+
+    # ===================== TRANSPORT =====================
+
+    def _complete(self, prompt: str, span: dict, max_tokens: int,
+                  stop: Optional[List[str]] = None) -> Tuple[str, str]:
+        """
+        One completion, hedged with Config.HEDGE_MODEL when it is slow
+        (see ModelRouter). Returns the text and the model that wrote it.
+        """
+        backup = Config.HEDGE_MODEL
+        if not backup:
+            return self._attempt(prompt, span, max_tokens, self.model_name, stop), self.model_name
+
+        pool = _POOL.hedge_pool()
+        spans = {}
+        primary = pool.submit(self._attempt, prompt, spans.setdefault(0, {}), max_tokens, self.model_name, stop)
+        done, _ = wait([primary], timeout=ROUTER.hedge_delay(self.model_name))
+        if done or not ROUTER.claim_hedge(self.model_name):
+            try:
+                return primary.result(), self.model_name
+            finally:
+                span.update(spans[0])
+
+        second = pool.submit(self._attempt, prompt, spans.setdefault(1, {}), max_tokens, backup, stop)
+        futures = {primary: 0, second: 1}
+        pending, error = set(futures), None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return self._hedged(span, spans[futures[future]], backup if futures[future] else None,
+                                        future.result())
+                error = error or future.exception()
+        span.update(spans[0])
+        raise error
+
+    async def _acomplete(self, prompt: str, span: dict, max_tokens: int,
+                         stop: Optional[List[str]] = None) -> Tuple[str, str]:
+        backup = Config.HEDGE_MODEL
+        if not backup:
+            return await self._aattempt(prompt, span, max_tokens, self.model_name, stop), self.model_name
+
+        spans = {}
+        primary = asyncio.ensure_future(self._aattempt(prompt, spans.setdefault(0, {}), max_tokens, self.model_name, stop))
+        tasks = {primary: 0}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=ROUTER.hedge_delay(self.model_name))
+            if done or not ROUTER.claim_hedge(self.model_name):
+                try:
+                    return await primary, self.model_name
+                finally:
+                    span.update(spans[0])
+
+            second = asyncio.ensure_future(self._aattempt(prompt, spans.setdefault(1, {}), max_tokens, backup, stop))
+            tasks[second] = 1
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return self._hedged(span, spans[tasks[task]], backup if tasks[task] else None,
+                                            task.result())
+                    error = error or task.exception()
+            span.update(spans[0])
+            raise error
+        finally:
+            # Unlike a sync request, the losing one can be stopped
+            for task in tasks:
+                task.cancel()
+
+    def _hedged(self, span: dict, winner: dict, backup: Optional[str], text: str) -> Tuple[str, str]:
+        span.update(winner)
+        span["hedged"] = 1
+        if backup:
+            span["model"] = backup
+            ROUTER.hedge_won(backup)
+            return text, backup
+        return text, self.model_name
+
+    def _attempt(self, prompt: str, span: dict, max_tokens: int, model: str,
+                 stop: Optional[List[str]] = None) -> str:
+        budget = self._token_budget(prompt, max_tokens)
+        start = time.perf_counter()
+
+        for attempt in range(Config.LLM_MAX_RETRIES + 1):
+            reserved = _POOL.limiter.acquire(budget)
+            try:
+                with _POOL.sync_slots:
+                    response = self.client.chat.completions.create(**self._request(prompt, max_tokens, model, stop))
+            except Exception as e:
+                # A failed request is charged as a request, not in tokens
+                _POOL.limiter.settle(reserved, 0)
+                if attempt >= Config.LLM_MAX_RETRIES or not _is_retryable(e):
+                    ROUTER.observe(model, time.perf_counter() - start, error=True)
+                    raise
+                span["retries"] = attempt + 1
+                time.sleep(_backoff(attempt, e))
+                continue
+
+            _POOL.limiter.settle(reserved, self._used_tokens(response, budget, span))
+            ROUTER.observe(model, time.perf_counter() - start, span["prompt_tokens"], span["completion_tokens"])
+            return response.choices[0].message.content
+
+    async def _aattempt(self, prompt: str, span: dict, max_tokens: int, model: str,
+                        stop: Optional[List[str]] = None) -> str:
+        client, slots = _POOL.async_client(self.api_key)
+        budget = self._token_budget(prompt, max_tokens)
+        start = time.perf_counter()
+
+        for attempt in range(Config.LLM_MAX_RETRIES + 1):
+            reserved = await _POOL.limiter.aacquire(budget)
+            try:
+                async with slots:
+                    response = await client.chat.completions.create(**self._request(prompt, max_tokens, model, stop))
+            except asyncio.CancelledError:
+                # Lost a hedge: the prompt was sent and is billed, but how long
+                # the answer would have taken is unknown
+                _POOL.limiter.settle(reserved, len(prompt) // 4)
+                ROUTER.observe(model, time.perf_counter() - start, len(prompt) // 4, cancelled=True)
+                raise
+            except Exception as e:
+                # A failed request is charged as a request, not in tokens
+                _POOL.limiter.settle(reserved, 0)
+                if attempt >= Config.LLM_MAX_RETRIES or not _is_retryable(e):
+                    ROUTER.observe(model, time.perf_counter() - start, error=True)
+                    raise
+                span["retries"] = attempt + 1
+                await asyncio.sleep(_backoff(attempt, e))
+                continue
+
+            _POOL.limiter.settle(reserved, self._used_tokens(response, budget, span))
+            ROUTER.observe(model, time.perf_counter() - start, span["prompt_tokens"], span["completion_tokens"])
+            return response.choices[0].message.content
+
+
+    def _open_stream(self, prompt: str, span: dict, max_tokens: int, budget: int,
+                     stop: Optional[List[str]] = None):
+        for attempt in range(Config.LLM_MAX_RETRIES + 1):
+            reserved = _POOL.limiter.acquire(budget)
+            _POOL.sync_slots.acquire()
+            try:
+                return self.client.chat.completions.create(
+                    **self._request(prompt, max_tokens, stop=stop), stream=True), reserved
+            except Exception as e:
+                _POOL.sync_slots.release()
+                _POOL.limiter.settle(reserved, 0)
+                if attempt >= Config.LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                span["retries"] = attempt + 1
+                time.sleep(_backoff(attempt, e))
+
+    def _stream_complete(self, prompt: str, span: dict, max_tokens: int,
+                         stop: Optional[List[str]] = None) -> Iterator[str]:
+        # Streams are not hedged: the reader has already consumed the first chunks
+        budget = self._token_budget(prompt, max_tokens)
+        start = time.perf_counter()
+        # Holds a concurrency slot until the stream is finished or closed
+        stream, reserved = self._open_stream(prompt, span, max_tokens, budget, stop)
+        chars, used = 0, 0
+        try:
+            for chunk in stream:
+                # Usage arrives with the final chunk only
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None:
+                    span["prompt_tokens"] = usage.prompt_tokens or 0
+                    span["completion_tokens"] = usage.completion_tokens or 0
+                    used = usage.total_tokens or 0
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = chunk.choices[0].delta.content
+                    chars += len(text)
+                    yield text
+        finally:
+            stream.close()
+            _POOL.sync_slots.release()
+            if not used:
+                # Stopped early: estimate what was generated
+                span["prompt_tokens"] = len(prompt) // 4
+                span["completion_tokens"] = chars // 4
+                used = span["prompt_tokens"] + span["completion_tokens"]
+            _POOL.limiter.settle(reserved, used)
+            ROUTER.observe(self.model_name, time.perf_counter() - start,
+                           span["prompt_tokens"], span["completion_tokens"])
+
+
+    async def _aopen_stream(self, client, slots, prompt: str, span: dict, max_tokens: int, budget: int,
+                            stop: Optional[List[str]] = None):
+        for attempt in range(Config.LLM_MAX_RETRIES + 1):
+            reserved = await _POOL.limiter.aacquire(budget)
+            await slots.acquire()
+            try:
+                return await client.chat.completions.create(
+                    **self._request(prompt, max_tokens, stop=stop), stream=True), reserved
+            except Exception as e:
+                slots.release()
+                _POOL.limiter.settle(reserved, 0)
+                if attempt >= Config.LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                span["retries"] = attempt + 1
+                await asyncio.sleep(_backoff(attempt, e))
+
+    async def _astream_complete(self, prompt: str, span: dict, max_tokens: int,
+                                stop: Optional[List[str]] = None) -> AsyncIterator[str]:
+        client, slots = _POOL.async_client(self.api_key)
+        budget = self._token_budget(prompt, max_tokens)
+        start = time.perf_counter()
+        stream, reserved = await self._aopen_stream(client, slots, prompt, span, max_tokens, budget, stop)
+        chars, used = 0, 0
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None:
+                    span["prompt_tokens"] = usage.prompt_tokens or 0
+                    span["completion_tokens"] = usage.completion_tokens or 0
+                    used = usage.total_tokens or 0
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = chunk.choices[0].delta.content
+                    chars += len(text)
+                    yield text
+        finally:
+            await stream.close()
+            slots.release()
+            if not used:
+                span["prompt_tokens"] = len(prompt) // 4
+                span["completion_tokens"] = chars // 4
+                used = span["prompt_tokens"] + span["completion_tokens"]
+            _POOL.limiter.settle(reserved, used)
+            ROUTER.observe(self.model_name, time.perf_counter() - start,
+                           span["prompt_tokens"], span["completion_tokens"])
 
 
 class LLMClient:
-    def as_langchain_llm(self):
-        return GroqLLM()
+    def as_langchain_llm(self, backend: Optional[str] = None, task: Optional[str] = None):
+        """
+        LLM of `backend` serving `task` ("faq", "orchestration"), on the
+        model routed to it (see lazy_llm.route_model).
+        """
+        if (backend or Config.LLM_BACKEND) == "fake":
+            from infrastructure.fake_llm import FakeLLM
+            return FakeLLM()
+        return GroqLLM(route_model(task, "groq"))
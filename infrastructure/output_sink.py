@@ -0,0 +1,232 @@
+import gzip
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, IO, Optional
+
+from infrastructure.config import Config
+
+
+def atomic_write_text(path: str, content: str, fsync: bool = False):
+    """
+    Writes to a temp file in the same folder and renames it over `path`,
+    so readers only ever see the old or the new file, never half of it.
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, target)
+
+
+def compact_json(content: str) -> str:
+    """
+    Collapses a rendered (multi-line) JSON page onto one line for JSONL.
+    Valid JSON never has a raw newline inside a string, so stripping each
+    line only removes layout whitespace.
+    """
+    return "".join(line.strip() for line in content.splitlines())
+
+
+class OutputSink(ABC):
+    """
+    Destination for rendered pages.
+
+    `persistent` sinks keep every page individually across runs, which is
+    what incremental regeneration needs to reuse unchanged pages.
+
+    A run ends with `close()` when it succeeded and `abort()` when it did
+    not; sinks that publish their output on close discard it on abort.
+    """
+
+    persistent = True
+
+    @abstractmethod
+    def write(self, product_id: str, page: str, content: str, variant: str = "") -> str:
+        """
+        Stores one page and returns where it went.
+        """
+
+    @abstractmethod
+    def location(self, product_id: str, page: str, variant: str = "") -> str:
+        """
+        Where `write` puts (or put) the page.
+        """
+
+    def exists(self, location: str) -> bool:
+        """
+        Whether the page written to `location` is still there.
+        """
+        return Path(location).exists()
+
+    def delete(self, location: str):
+        """
+        Removes a page that is no longer generated. Sinks that rewrite
+        their output on every run have nothing to remove.
+        """
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def abort(self):
+        # Pages written one by one are kept, so a resumed run reuses them
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class FileSink(OutputSink):
+    """
+    One JSON file per page: <root>/<product_id>/<page>[-<variant>].json,
+    or fixed paths per page type (single-product runs).
+    Every file is written atomically.
+    """
+
+    def __init__(self, root: str = "", paths: Optional[Dict[str, str]] = None,
+                 fsync: Optional[bool] = None):
+        self.root = Path(root)
+        self.paths = paths or {}
+        self.fsync = Config.OUTPUT_FSYNC if fsync is None else fsync
+
+    def location(self, product_id: str, page: str, variant: str = "") -> str:
+        if page in self.paths:
+            return self.paths[page]
+        name = f"{page}-{variant}" if variant else page
+        return str(self.root / product_id / f"{name}.json")
+
+    def write(self, product_id: str, page: str, content: str, variant: str = "") -> str:
+        path = self.location(product_id, page, variant)
+        atomic_write_text(path, content, self.fsync)
+        return path
+
+    def delete(self, location: str):
+        Path(location).unlink(missing_ok=True)
+
+
+class JsonlSink(OutputSink):
+    """
+    One JSONL stream per page type (<root>/<page>.jsonl[.gz]), one record
+    per line: {"product_id": ..., "page": ..., "variant": ..., "content": {...}}.
+
+    Records are buffered in memory and written out every `flush_bytes`.
+    The stream is assembled in a temp file and renamed into place on
+    close(), with a single fsync. A failed run calls abort(), which
+    deletes the temp files, so the previous complete stream stays in
+    place and a crash never publishes a truncated one.
+
+    Streams are rewritten on every run, so pages cannot be reused
+    individually: `persistent` is False.
+    """
+
+    persistent = False
+
+    def __init__(self, root: str, compress: bool = False, flush_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.compress = compress
+        self.flush_bytes = flush_bytes or Config.OUTPUT_FLUSH_BYTES
+        self.suffix = ".jsonl.gz" if compress else ".jsonl"
+
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, list] = {}
+        self._buffered = 0
+        self._files: Dict[str, IO] = {}
+
+    def location(self, product_id: str, page: str, variant: str = "") -> str:
+        return str(self.root / f"{page}{self.suffix}")
+
+    def _tmp_path(self, page: str) -> Path:
+        return self.root / f".{page}{self.suffix}.tmp"
+
+    def _open(self, page: str) -> IO:
+        handle = self._files.get(page)
+        if handle is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self._tmp_path(page)
+            if self.compress:
+                handle = gzip.open(tmp, "wt", encoding="utf-8")
+            else:
+                handle = open(tmp, "w", encoding="utf-8")
+            self._files[page] = handle
+        return handle
+
+    def write(self, product_id: str, page: str, content: str, variant: str = "") -> str:
+        record = (
+            '{"product_id": ' + json.dumps(product_id, ensure_ascii=False)
+            + ', "page": ' + json.dumps(page)
+            + ', "variant": ' + json.dumps(variant, ensure_ascii=False)
+            + ', "content": ' + compact_json(content) + "}\n"
+        )
+        with self._lock:
+            self._buffers.setdefault(page, []).append(record)
+            self._buffered += len(record)
+            if self._buffered >= self.flush_bytes:
+                self._flush_locked()
+        return self.location(product_id, page, variant)
+
+    def _flush_locked(self):
+        for page, records in self._buffers.items():
+            if records:
+                self._open(page).write("".join(records))
+        self._buffers = {}
+        self._buffered = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            for page, handle in self._files.items():
+                handle.flush()
+                if self.compress:
+                    handle.close()
+                    with open(self._tmp_path(page), "rb") as f:
+                        os.fsync(f.fileno())
+                else:
+                    os.fsync(handle.fileno())
+                    handle.close()
+                os.replace(self._tmp_path(page), self.location("", page))
+            self._files = {}
+
+    def abort(self):
+        with self._lock:
+            self._buffers = {}
+            self._buffered = 0
+            for page, handle in self._files.items():
+                handle.close()
+                self._tmp_path(page).unlink(missing_ok=True)
+            self._files = {}
+
+
+SINKS = ("files", "jsonl", "jsonl.gz", "segment")
+
+
+def make_sink(kind: Optional[str], root: str) -> OutputSink:
+    kind = (kind or Config.OUTPUT_SINK).lower()
+    if kind == "files":
+        return FileSink(root)
+    if kind == "jsonl":
+        return JsonlSink(root)
+    if kind == "jsonl.gz":
+        return JsonlSink(root, compress=True)
+    if kind == "segment":
+        from infrastructure.page_store import SegmentSink
+        return SegmentSink(root)
+    raise ValueError(f"Unknown output sink: {kind}")
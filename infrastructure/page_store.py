@@ -0,0 +1,507 @@
+# infrastructure/page_store.py
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks
+    fcntl = None
+
+from infrastructure.config import Config
+from infrastructure.output_sink import OutputSink, compact_json
+
+# Layout of an output directory written by SegmentSink:
+#
+#   pages.seg  header, then one record per written page, append-only:
+#              content length (u32), key length (u16), CRC-32 of key and
+#              content (u32), key, content (compact UTF-8 JSON)
+#   pages.idx  header, then (key hash, record offset) pairs sorted by hash,
+#              for the latest record of every key
+#   pages.lock held (flock) by the writer: a SegmentSink or `compact`
+#
+# A key is "<product_id>\0<page>\0<variant>". The index covers the segment
+# up to the size in its header; records after that (a run still writing,
+# or one that crashed before writing the index) are found by scanning.
+SEGMENT_FILE = "pages.seg"
+INDEX_FILE = "pages.idx"
+LOCK_FILE = "pages.lock"
+
+_SEGMENT_HEADER = struct.Struct("<4sHH8s")        # magic, version, reserved, segment id
+_INDEX_HEADER = struct.Struct("<4sHH8sQQ")        # magic, version, reserved, segment id, covered, count
+_RECORD = struct.Struct("<IHI")                   # content length, key length, crc
+_ENTRY = struct.Struct("<QQ")                     # key hash, record offset
+
+_SEGMENT_MAGIC = b"PGSG"
+_INDEX_MAGIC = b"PGIX"
+_VERSION = 1
+
+PageKey = Tuple[str, str, str]
+
+
+def page_key(product_id: str, page: str, variant: str = "") -> bytes:
+    return f"{product_id}\0{page}\0{variant}".encode("utf-8")
+
+
+def _split_key(key: bytes) -> PageKey:
+    product_id, page, variant = key.decode("utf-8").split("\0")
+    return product_id, page, variant
+
+
+def _hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def _records(buf, start: int) -> Iterator[Tuple[int, bytes, int]]:
+    """
+    (offset, key, end) of the records in `buf` from `start`, up to the
+    first incomplete or corrupt one.
+    """
+    offset, size = start, len(buf)
+    while offset + _RECORD.size <= size:
+        length, key_length, crc = _RECORD.unpack_from(buf, offset)
+        body = offset + _RECORD.size
+        end = body + key_length + length
+        if end > size or zlib.crc32(buf[body:end]) != crc:
+            return
+        yield offset, bytes(buf[body:body + key_length]), end
+        offset = end
+
+
+def _key_at(buf, offset: int) -> bytes:
+    _, key_length, _ = _RECORD.unpack_from(buf, offset)
+    body = offset + _RECORD.size
+    return bytes(buf[body:body + key_length])
+
+
+def _content_at(buf, offset: int) -> memoryview:
+    length, key_length, _ = _RECORD.unpack_from(buf, offset)
+    body = offset + _RECORD.size + key_length
+    return memoryview(buf)[body:body + length]
+
+
+def _map(path: Path) -> Tuple[mmap.mmap, int]:
+    # (read-only map of the whole file, inode)
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), os.fstat(f.fileno()).st_ino
+
+
+def _load_index(path: Path, segment_id: bytes, segment_size: int) -> Optional[Tuple[mmap.mmap, int, int]]:
+    """
+    (mapped index, covered segment bytes, entries), or None when the index
+    is missing or belongs to another segment (compacted meanwhile).
+    """
+    try:
+        index, _ = _map(path)
+    except (OSError, ValueError):
+        return None
+    if len(index) >= _INDEX_HEADER.size:
+        magic, version, _, index_segment, covered, count = _INDEX_HEADER.unpack_from(index, 0)
+        if (magic == _INDEX_MAGIC and version == _VERSION and index_segment == segment_id
+                and covered <= segment_size and len(index) == _INDEX_HEADER.size + count * _ENTRY.size):
+            return index, covered, count
+    index.close()
+    return None
+
+
+def _lock(root: Path, wait: bool = True):
+    """
+    Takes the writer lock of an output directory; returns the open lock
+    file (closing it releases the lock). Without `wait`, raises
+    BlockingIOError when another writer holds it.
+    """
+    f = open(root / LOCK_FILE, "a+b")
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except OSError:
+            f.close()
+            raise
+    return f
+
+
+def _release(mapping):
+    try:
+        mapping.close()
+    except BufferError:
+        # Views handed out by `get` are still alive; the mapping goes
+        # away with the last of them.
+        pass
+
+
+def _write_index(path: Path, segment_id: bytes, covered: int, offsets: Dict[bytes, int]):
+    entries = sorted((_hash(key), offset) for key, offset in offsets.items())
+    payload = b"".join([
+        _INDEX_HEADER.pack(_INDEX_MAGIC, _VERSION, 0, segment_id, covered, len(entries)),
+        *(_ENTRY.pack(key_hash, offset) for key_hash, offset in entries),
+    ])
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+class SegmentSink(OutputSink):
+    """
+    All pages of a run appended to one segment file (`pages.seg`), plus an
+    index of where each page is (`pages.idx`, written on flush / close).
+
+    Pages are stored as compact JSON; rewriting a page appends a new record
+    and the index points at the latest one. Each write goes to the file
+    before returning, so a crash loses no recorded page: the next run (and
+    every reader) scans the records the index does not cover, and a torn
+    last record is cut off. Superseded records stay in the segment until
+    `compact` rewrites it; the sink holds the directory's writer lock from
+    its first write until close, so the two never run at once.
+
+    Pages are kept individually across runs, so incremental reuse and
+    resume work as with files. Read them back with PageStore.
+    """
+
+    persistent = True
+
+    def __init__(self, root: str, fsync: Optional[bool] = None):
+        self.root = Path(root)
+        self.path = self.root / SEGMENT_FILE
+        self.index_path = self.root / INDEX_FILE
+        self.fsync = Config.OUTPUT_FSYNC if fsync is None else fsync
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer_lock = None
+        self._offsets: Dict[bytes, int] = {}
+        self._size = 0
+        self._segment_id = b""
+        self._dirty = False
+
+    def _open(self):
+        # Lock held
+        if self._file is not None:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Waits for a compaction in progress
+        self._writer_lock = _lock(self.root)
+        if self.path.exists() and self.path.stat().st_size >= _SEGMENT_HEADER.size:
+            self._load()
+        else:
+            self._segment_id = os.urandom(8)
+            with open(self.path, "wb") as f:
+                f.write(_SEGMENT_HEADER.pack(_SEGMENT_MAGIC, _VERSION, 0, self._segment_id))
+            self._size = _SEGMENT_HEADER.size
+        self._file = open(self.path, "ab")
+
+    def _load(self):
+        segment, _ = _map(self.path)
+        try:
+            magic, version, _, self._segment_id = _SEGMENT_HEADER.unpack_from(segment, 0)
+            if magic != _SEGMENT_MAGIC or version != _VERSION:
+                raise ValueError(f"{self.path} is not a page segment")
+
+            covered = _SEGMENT_HEADER.size
+            loaded = _load_index(self.index_path, self._segment_id, len(segment))
+            if loaded is not None:
+                index, covered, count = loaded
+                for n in range(count):
+                    _, offset = _ENTRY.unpack_from(index, _INDEX_HEADER.size + n * _ENTRY.size)
+                    self._offsets[_key_at(segment, offset)] = offset
+                index.close()
+
+            end = covered
+            for offset, key, end in _records(segment, covered):
+                self._offsets[key] = offset
+            self._dirty = end > covered
+            size = len(segment)
+        finally:
+            segment.close()
+
+        if end < size:
+            # A record torn by a crash
+            os.truncate(self.path, end)
+        self._size = end
+
+    def location(self, product_id: str, page: str, variant: str = "") -> str:
+        ref = f"{product_id}/{page}/{variant}" if variant else f"{product_id}/{page}"
+        return f"{self.path}#{ref}"
+
+    def _key(self, location: str) -> Optional[bytes]:
+        path, _, ref = location.partition("#")
+        if path != str(self.path) or not ref:
+            return None
+        product_id, page, variant = (ref.split("/", 2) + [""])[:3]
+        return page_key(product_id, page, variant)
+
+    def exists(self, location: str) -> bool:
+        key = self._key(location)
+        if key is None:
+            return False
+        with self._lock:
+            self._open()
+            return key in self._offsets
+
+    def delete(self, location: str):
+        # Left out of the next index; compaction drops the record
+        key = self._key(location)
+        if key is None:
+            return
+        with self._lock:
+            self._open()
+            if self._offsets.pop(key, None) is not None:
+                self._dirty = True
+
+    def write(self, product_id: str, page: str, content: str, variant: str = "") -> str:
+        key = page_key(product_id, page, variant)
+        data = compact_json(content).encode("utf-8")
+        record = _RECORD.pack(len(data), len(key), zlib.crc32(data, zlib.crc32(key))) + key + data
+        with self._lock:
+            self._open()
+            self._file.write(record)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._offsets[key] = self._size
+            self._size += len(record)
+            self._dirty = True
+        return self.location(product_id, page, variant)
+
+    def flush(self):
+        with self._lock:
+            if self._file is None or not self._dirty:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            _write_index(self.index_path, self._segment_id, self._size, self._offsets)
+            self._dirty = False
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._writer_lock is not None:
+                self._writer_lock.close()
+                self._writer_lock = None
+
+
+class PageStore:
+    """
+    Read-only access to the pages of a SegmentSink output directory.
+
+    The segment and its index are memory-mapped, so opening the store
+    parses nothing and a lookup is a binary search over the mapped index.
+    `get` returns the page's JSON bytes as a memoryview into the mapped
+    segment, without copying: hand it to a socket or file write as is.
+
+        with PageStore("outputs/batch") as store:
+            body = store.get("glowboost-vitamin-c-serum", "faq")
+
+    Views stay valid after `refresh` and compaction (they keep the old
+    mapping alive); release them before `close`.
+
+    `refresh` picks up pages appended since the store was opened, and
+    reopens it after a compaction replaced the segment.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.path = self.root / SEGMENT_FILE
+        self.index_path = self.root / INDEX_FILE
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        segment, self._inode = _map(self.path)
+        magic, version, _, segment_id = _SEGMENT_HEADER.unpack_from(segment, 0)
+        if magic != _SEGMENT_MAGIC or version != _VERSION:
+            segment.close()
+            raise ValueError(f"{self.path} is not a page segment")
+        self._segment = segment
+        self._segment_id = segment_id
+
+        self._index, self._count, covered = None, 0, _SEGMENT_HEADER.size
+        loaded = _load_index(self.index_path, segment_id, len(segment))
+        if loaded is not None:
+            self._index, covered, self._count = loaded
+
+        # Latest records past the index, by key
+        self._tail: Dict[bytes, int] = {}
+        self._scanned = covered
+        self._scan()
+
+    def _scan(self) -> int:
+        added = 0
+        for offset, key, end in _records(self._segment, self._scanned):
+            added += 1
+            self._tail[key] = offset
+            self._scanned = end
+        return added
+
+    def refresh(self) -> int:
+        """
+        Maps pages written since the last open or refresh. Returns the
+        number of pages written meanwhile (all of them after a compaction).
+        """
+        with self._lock:
+            try:
+                segment, inode = _map(self.path)
+            except (OSError, ValueError):
+                return 0
+            if inode != self._inode:
+                segment.close()
+                old = (self._segment, self._index)
+                self._open()
+                for mapping in old:
+                    if mapping is not None:
+                        _release(mapping)
+                return len(self)
+            if len(segment) <= len(self._segment):
+                segment.close()
+                return 0
+            # Appended in place: known offsets stay valid
+            _release(self._segment)
+            self._segment = segment
+            return self._scan()
+
+    # ===================== LOOKUP =====================
+
+    def _indexed(self, key: bytes) -> Optional[int]:
+        if self._index is None:
+            return None
+        index, segment, key_hash = self._index, self._segment, _hash(key)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _ENTRY.unpack_from(index, _INDEX_HEADER.size + mid * _ENTRY.size)[0] < key_hash:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Equal hashes are adjacent; the stored key settles collisions
+        while lo < self._count:
+            entry_hash, offset = _ENTRY.unpack_from(index, _INDEX_HEADER.size + lo * _ENTRY.size)
+            if entry_hash != key_hash:
+                break
+            if _key_at(segment, offset) == key:
+                return offset
+            lo += 1
+        return None
+
+    def _offset(self, key: bytes) -> Optional[int]:
+        offset = self._tail.get(key)
+        return offset if offset is not None else self._indexed(key)
+
+    def get(self, product_id: str, page: str, variant: str = "") -> Optional[memoryview]:
+        """
+        The page's JSON (UTF-8) as a view into the segment, or None.
+        """
+        key = page_key(product_id, page, variant)
+        with self._lock:
+            segment, offset = self._segment, self._offset(key)
+        return None if offset is None else _content_at(segment, offset)
+
+    def load(self, product_id: str, page: str, variant: str = "") -> Any:
+        """
+        The parsed page, or None.
+        """
+        view = self.get(product_id, page, variant)
+        if view is None:
+            return None
+        with view:
+            return json.loads(bytes(view))
+
+    def __contains__(self, key: PageKey) -> bool:
+        with self._lock:
+            return self._offset(page_key(*key)) is not None
+
+    def _entries(self) -> Iterator[Tuple[bytes, int]]:
+        # (key, offset) of every page, latest record only
+        tail = self._tail
+        for n in range(self._count if self._index is not None else 0):
+            _, offset = _ENTRY.unpack_from(self._index, _INDEX_HEADER.size + n * _ENTRY.size)
+            key = _key_at(self._segment, offset)
+            if key not in tail:
+                yield key, offset
+        yield from tail.items()
+
+    def keys(self) -> Iterator[PageKey]:
+        """
+        (product_id, page, variant) of every stored page.
+        """
+        for key, _ in self._entries():
+            yield _split_key(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._entries())
+
+    def stats(self) -> Dict[str, int]:
+        live = sum(
+            _RECORD.size + len(key) + _RECORD.unpack_from(self._segment, offset)[0]
+            for key, offset in self._entries()
+        )
+        return {
+            "pages": len(self),
+            "segment_bytes": len(self._segment),
+            "live_bytes": _SEGMENT_HEADER.size + live,
+        }
+
+    def close(self):
+        for mapping in (self._segment, self._index):
+            if mapping is not None:
+                _release(mapping)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def compact(root: str) -> Dict[str, int]:
+    """
+    Rewrites the segment of `root` with only the latest record of every
+    page, grouped by product, and a fresh index. Raises BlockingIOError
+    while a batch is writing to `root` (it holds the writer lock); open
+    PageStores pick the new segment up on `refresh`.
+    """
+    root_path = Path(root)
+    path, index_path = root_path / SEGMENT_FILE, root_path / INDEX_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"No page segment in {root}")
+    try:
+        writer_lock = _lock(root_path, wait=False)
+    except BlockingIOError:
+        raise BlockingIOError(f"{root} is being written by a batch run") from None
+    with writer_lock:
+        return _compact(path, index_path)
+
+
+def _compact(path: Path, index_path: Path) -> Dict[str, int]:
+    segment_id = os.urandom(8)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+    with PageStore(str(path.parent)) as store:
+        before = len(store._segment)
+        offsets: Dict[bytes, int] = {}
+        with open(tmp, "wb") as f:
+            f.write(_SEGMENT_HEADER.pack(_SEGMENT_MAGIC, _VERSION, 0, segment_id))
+            size = _SEGMENT_HEADER.size
+            for key, offset in sorted(store._entries()):
+                length, key_length, _ = _RECORD.unpack_from(store._segment, offset)
+                end = offset + _RECORD.size + key_length + length
+                f.write(store._segment[offset:end])
+                offsets[key] = size
+                size += end - offset
+            f.flush()
+            os.fsync(f.fileno())
+
+    # A reader that sees the new segment with the old index notices the
+    # segment id mismatch and scans instead.
+    os.replace(tmp, path)
+    _write_index(index_path, segment_id, size, offsets)
+    return {"pages": len(offsets), "before_bytes": before, "after_bytes": size}
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+from typing import Tuple
+
+
+class _Bucket:
+    """
+    Token bucket refilled continuously at `per_minute / 60` units per second.
+    The level may go negative: callers reserve first and then wait off the debt,
+    which keeps the limiter fair under contention.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def reserve(self, amount: float, now: float) -> Tuple[float, float]:
+        """
+        Returns the wait before the reservation is covered and the amount
+        actually deducted (at most one minute's worth).
+        """
+        if not self.enabled:
+            return 0.0, 0.0
+
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+        taken = min(amount, self.capacity)
+        self.level -= taken
+
+        return (0.0 if self.level >= 0 else -self.level / self.rate), taken
+
+    def adjust(self, amount: float):
+        if self.enabled:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget shared by all LLM calls.
+    A limit of 0 disables that budget.
+
+    Usable from threads (`acquire`) and coroutines (`aacquire`).
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self._lock = threading.Lock()
+        self._requests = _Bucket(rpm)
+        self._tokens = _Bucket(tpm)
+
+    def _reserve(self, tokens: int) -> Tuple[float, float]:
+        with self._lock:
+            now = time.monotonic()
+            request_wait, _ = self._requests.reserve(1, now)
+            token_wait, reserved = self._tokens.reserve(tokens, now)
+            return max(request_wait, token_wait), reserved
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Waits for the budget; returns the tokens reserved, to pass to settle.
+        """
+        wait, reserved = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return reserved
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        wait, reserved = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return reserved
+
+    def settle(self, reserved: float, actual: int):
+        """
+        Corrects the token budget once the real usage is known:
+        over-estimates are refunded, under-estimates are charged.
+        `reserved` is what acquire returned, which is less than the
+        request's estimate when that exceeds the per-minute limit.
+        """
+        with self._lock:
+            self._tokens.adjust(reserved - actual)
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# One line of `python -X importtime` output:
+#   import time: self [us] | cumulative | imported package
+_PREFIX = "import time:"
+
+# Rows shown per table
+TOP = 12
+
+
+def parse_importtime(lines: List[str]) -> List[Tuple[str, int, int, int]]:
+    """
+    (module, depth, self_us, cumulative_us) per import, in output order.
+    Depth 0 is an import made directly by the program rather than by
+    another module.
+    """
+    rows = []
+    for line in lines:
+        if not line.startswith(_PREFIX):
+            continue
+        try:
+            own, cumulative, name = line[len(_PREFIX):].split("|", 2)
+            own_us, cumulative_us = int(own), int(cumulative)
+        except ValueError:
+            # The header line
+            continue
+        stripped = name.rstrip().lstrip(" ")
+        depth = (len(name.rstrip()) - len(stripped) - 1) // 2
+        rows.append((stripped, depth, own_us, cumulative_us))
+    return rows
+
+
+def summarize(rows: List[Tuple[str, int, int, int]]) -> Dict[str, object]:
+    total_us = sum(cumulative for _, depth, _, cumulative in rows if depth == 0)
+
+    by_package: Dict[str, int] = {}
+    for name, _, own, _ in rows:
+        package = name.split(".", 1)[0]
+        by_package[package] = by_package.get(package, 0) + own
+
+    direct = sorted(
+        ((name, cumulative) for name, depth, _, cumulative in rows if depth == 0),
+        key=lambda row: row[1], reverse=True
+    )
+    packages = sorted(by_package.items(), key=lambda row: row[1], reverse=True)
+    return {
+        "modules": len(rows),
+        "total_ms": total_us / 1000,
+        "packages": [(name, us / 1000) for name, us in packages],
+        "direct": [(name, us / 1000) for name, us in direct],
+    }
+
+
+def print_report(summary: Dict[str, object], wall: Optional[float] = None):
+    print(f"\n🐢 Startup profile: {summary['modules']} modules imported in {summary['total_ms']:.0f}ms", end="")
+    print(f" (whole command {wall:.2f}s)" if wall is not None else "")
+
+    print("   by package (own import time):")
+    for name, ms in summary["packages"][:TOP]:
+        print(f"     {name:<40} {ms:8.1f}ms")
+
+    print("   slowest direct imports (including what they import):")
+    for name, ms in summary["direct"][:TOP]:
+        print(f"     {name:<40} {ms:8.1f}ms")
+
+
+def profile_command(script: str, argv: List[str]) -> int:
+    """
+    Runs `script argv` again under `python -X importtime` and prints
+    where its import time went. The command's own output is passed
+    through; it runs for real, so lazily imported stages are included.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", script, *argv],
+        stderr=subprocess.PIPE, text=True, env=dict(os.environ)
+    )
+    wall = time.perf_counter() - start
+
+    lines = proc.stderr.splitlines()
+    for line in lines:
+        if not line.startswith(_PREFIX):
+            print(line, file=sys.stderr)
+
+    print_report(summarize(parse_importtime(lines)), wall)
+    return proc.returncode
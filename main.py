@@ -1,14 +1,211 @@
 import os
+import sys
+import argparse
 os.environ["LANGCHAIN_VERBOSE"] = "true"
 os.environ["LANGCHAIN_TRACING_V2"] = "false"
 os.environ["LANGCHAIN_API_KEY"] = ""
 from orchestrator.langchain_orchestrator import LangChainOrchestrator
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Kasparro content generation pipeline")
+    parser.add_argument(
+        "--mode", choices=LangChainOrchestrator.MODES,
+        help="direct = fixed tool pipeline (default), agentic = LLM tool-calling agent"
+    )
+    parser.add_argument(
+        "--batch", metavar="PATH",
+        help="Run over a catalog (JSON array or JSONL) instead of a single product"
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="Run as a service: HTTP API (and optional drop directory) with warm state"
+    )
+    parser.add_argument("--host", help="Service bind address")
+    parser.add_argument("--port", type=int, help="Service port")
+    parser.add_argument(
+        "--drop-dir", metavar="DIR",
+        help="Service drop directory: catalogs put in DIR/inbox are generated"
+    )
+    parser.add_argument(
+        "--output-dir", metavar="DIR",
+        help="Root folder for per-product batch (or service) outputs"
+    )
+    parser.add_argument(
+        "--concurrency", type=int,
+        help="Maximum number of products processed in parallel"
+    )
+    parser.add_argument(
+        "--sink", choices=("files", "jsonl", "jsonl.gz", "segment"),
+        help="Batch output layout: one file per page, one JSONL stream per page type, "
+             "or one indexed segment file"
+    )
+    parser.add_argument(
+        "--faq-batch-size", type=int,
+        help="Products per batched FAQ request (1 = one request per product)"
+    )
+    parser.add_argument(
+        "--pipeline", choices=("threads", "staged"),
+        help="Batch pipeline: one thread pool, or async LLM workers feeding a render process pool"
+    )
+    parser.add_argument(
+        "--render-workers", type=int,
+        help="Render processes of the staged pipeline (default: one per CPU core)"
+    )
+    parser.add_argument(
+        "--fresh", action="store_true",
+        help="Start a new batch run instead of resuming the last unfinished one"
+    )
+    parser.add_argument(
+        "--max-attempts", type=int,
+        help="Runs that may attempt a failing product before it is skipped"
+    )
+    parser.add_argument(
+        "--report", metavar="PATH",
+        help="Write a per-stage run report (.json or .csv)"
+    )
+    parser.add_argument(
+        "--prometheus", metavar="PATH",
+        help="Write Prometheus text-format counters"
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Ignore the manifest and regenerate every page"
+    )
+    parser.add_argument(
+        "--prompt-report", metavar="PATH",
+        help="Estimate prompt tokens per request over a catalog, verbose vs compact prompts"
+    )
+    parser.add_argument(
+        "--compact-store", metavar="DIR",
+        help="Rewrite the segment store of a --sink segment output dir without superseded pages"
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="Run the command under -X importtime and report where import time goes"
+    )
+    return parser.parse_args(argv)
+
+
+def run_batch(args):
+    from infrastructure.config import Config
+    from orchestrator.batch_runner import BatchRunner
+    from orchestrator.checkpoint import RetryPolicy
+
+    print("🚀 Starting batch catalog run")
+
+    options = dict(
+        concurrency=args.concurrency,
+        incremental=False if args.full else None,
+        sink=args.sink,
+        faq_batch_size=args.faq_batch_size,
+        resume=False if args.fresh else None,
+        retry=RetryPolicy(max_attempts=args.max_attempts)
+    )
+    if (args.pipeline or Config.BATCH_PIPELINE) == "staged":
+        from orchestrator.staged_runner import StagedBatchRunner
+        runner = StagedBatchRunner(render_workers=args.render_workers, **options)
+    else:
+        runner = BatchRunner(**options)
+    stats = runner.run(args.batch, args.output_dir)
+    stats.print_summary()
+    print_cache_stats()
+    if stats.input_error:
+        print(f"❌ Batch aborted: {args.batch} could not be read to the end")
+        sys.exit(1)
+
+
+def run_prompt_report(args):
+    from agents.prompt_builder import print_prompt_report, prompt_report
+    from infrastructure.ingestion import iter_raw_products
+
+    report = prompt_report(iter_raw_products(args.prompt_report), args.faq_batch_size)
+    print_prompt_report(report)
+
+
+def run_compact(args):
+    from infrastructure.page_store import compact
+
+    try:
+        result = compact(args.compact_store)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot compact {args.compact_store}: {e}")
+        sys.exit(1)
+    print(
+        f"🗜️  Compacted {args.compact_store}: {result['pages']} pages, "
+        f"{result['before_bytes'] / 1e6:.1f} MB -> {result['after_bytes'] / 1e6:.1f} MB"
+    )
+
+
+def print_cache_stats():
+    from infrastructure.llm_cache import get_llm_cache
+
+    cache = get_llm_cache()
+    if cache is None:
+        return
+    s = cache.stats
+    print(
+        f"   llm cache:  {s['memory_hits']} memory hits, {s['disk_hits']} disk hits, "
+        f"{s['misses']} misses ({cache.hit_rate():.0%} hit rate)"
+    )
+
+
+def write_reports(args):
+    from infrastructure.config import Config
+    from infrastructure.instrumentation import METRICS
+
+    METRICS.print_summary()
+    # Only runs that made model requests have loaded the client
+    llm_client = sys.modules.get("infrastructure.llm_client")
+    if llm_client is not None:
+        llm_client.ROUTER.print_summary()
+
+    report = args.report or Config.METRICS_REPORT
+    if report:
+        METRICS.write_report(report)
+        print(f"📝 Run report: {report}")
+
+    prometheus = args.prometheus or Config.METRICS_PROMETHEUS
+    if prometheus:
+        METRICS.write_prometheus(prometheus)
+        print(f"📝 Prometheus counters: {prometheus}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.profile_startup:
+        from infrastructure.startup_profile import profile_command
+
+        argv = [a for a in (sys.argv[1:] if argv is None else argv) if a != "--profile-startup"]
+        sys.exit(profile_command(os.path.abspath(__file__), argv))
+
+    if args.prompt_report:
+        run_prompt_report(args)
+        return
+
+    if args.compact_store:
+        run_compact(args)
+        return
+
+    if args.serve:
+        from orchestrator.service import serve
+
+        print("🚀 Starting generation service")
+        serve(args.host, args.port, args.drop_dir, args.output_dir)
+        return
+
+    if args.batch:
+        run_batch(args)
+        write_reports(args)
+        return
+
     print("🚀 Starting LangChain Agentic Pipeline")
 
-    orch = LangChainOrchestrator()
+    orch = LangChainOrchestrator(
+        mode=args.mode,
+        incremental=False if args.full else None
+    )
     result = orch.run()
 
     print("\n==============================")
@@ -18,6 +215,8 @@ def main():
     print("FINAL AGENT RESPONSE:\n")
     print(result)
 
+    write_reports(args)
+
 
 if __name__ == "__main__":
     main()
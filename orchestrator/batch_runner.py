@@ -0,0 +1,570 @@
+# orchestrator/batch_runner.py
+
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from infrastructure.config import Config
+from agents.parser_agent import ParserAgent
+from agents.product_record import Product, new_vocabularies
+from agents.faq_page_agent import FAQAgent
+from agents.faq_reuse import FAQReuse
+from agents.product_page_agent import ProductPageAgent
+from agents.comparison_page_agent import ComparisonPageAgent
+from infrastructure.ingestion import IngestionError, ProductStream, count_records
+from infrastructure.instrumentation import METRICS, percentile
+from infrastructure.lazy_llm import LazyLLM
+from infrastructure.output_sink import OutputSink, make_sink
+from orchestrator.checkpoint import CheckpointJournal, DegradedOutput, RetryPolicy, RunProgress
+from orchestrator.manifest import RunManifest, page_fingerprint, product_fingerprint
+from template_engine.schema import TemplateValidationError
+
+
+PAGE_TYPES = ("faq", "product", "comparison")
+
+
+def product_id(raw: Dict[str, Any], index: Union[int, str]) -> str:
+    """
+    Stable id used for per-product output folders.
+    Prefers an explicit SKU/id, falls back to a slug of the name, then
+    to `product-<index>`.
+    """
+    explicit = raw.get("sku") or raw.get("product_id") or raw.get("id")
+    name = explicit or raw.get("product_name") or raw.get("name") or f"product-{index}"
+    slug = re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
+    return slug or f"product-{index}"
+
+
+class BatchStats:
+    """
+    Collects per-page latencies and computes throughput numbers.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {page: [] for page in PAGE_TYPES}
+        self.completed = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        self.reused = 0
+        self.regenerated = 0
+        self.pruned = 0
+        self.faq_reused = 0
+        self.requests_saved = 0
+        self.tokens_saved = 0
+        # Why the catalog could not be read to the end, if it could not
+        self.input_error: Optional[str] = None
+        # (template, JSON path) -> failed contexts
+        self.validation_failures: Counter = Counter()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "products": self.completed,
+            "failed": self.failed,
+            "input_error": self.input_error,
+            "elapsed_s": round(self.elapsed, 3),
+            "products_per_s": round(self.completed / self.elapsed, 2) if self.elapsed else 0.0,
+            "pages_reused": self.reused,
+            "pages_regenerated": self.regenerated,
+            "pages_removed": self.pruned,
+            "faq_reused": self.faq_reused,
+            "faq_requests_saved": self.requests_saved,
+            "faq_tokens_saved": self.tokens_saved,
+            "validation_failures": {
+                f"{template} {path}": count
+                for (template, path), count in self.validation_failures.most_common()
+            },
+            "latency_ms": {
+                page: {
+                    "p50": round(percentile(values, 50) * 1000, 1),
+                    "p95": round(percentile(values, 95) * 1000, 1),
+                }
+                for page, values in self.latencies.items()
+            },
+        }
+
+    def print_summary(self):
+        s = self.summary()
+        print("\n📊 Batch throughput")
+        print(f"   products:   {s['products']} ok, {s['failed']} failed in {s['elapsed_s']}s")
+        if s["input_error"]:
+            print(f"   input:      aborted, products after the error were not read ({s['input_error']})")
+        print(f"   throughput: {s['products_per_s']} products/s")
+        print(f"   pages:      {s['pages_regenerated']} regenerated, {s['pages_reused']} reused")
+        if s["pages_removed"]:
+            print(f"   removed:    {s['pages_removed']} stale comparison pages")
+        if s["faq_reused"]:
+            print(
+                f"   faq reuse:  {s['faq_reused']} near-duplicate products, "
+                f"{s['faq_requests_saved']} LLM requests and ~{s['faq_tokens_saved']} tokens saved"
+            )
+        if s["validation_failures"]:
+            print("   invalid:    page contexts that failed their schema, by field")
+            for where, count in s["validation_failures"].items():
+                print(f"      {count:>5}  {where}")
+        for page, lat in s["latency_ms"].items():
+            print(f"   {page:<11} p50={lat['p50']}ms  p95={lat['p95']}ms")
+
+
+class BatchRunner:
+    """
+    Runs the FAQ / product / comparison agents over a whole catalog
+    with a bounded thread pool. The LLM calls are network-bound, so
+    threads are enough to overlap them.
+
+    Products are streamed from disk (see ProductStream) and submitted with
+    a bounded number of jobs in flight, so memory does not grow with the
+    catalog; only a compact comparison card per product is retained.
+
+    With FAQ_BATCH_SIZE > 1, products are processed in groups whose FAQs
+    are generated with batched requests (see FAQAgent.generate_faq_batch).
+
+    Once the catalog has been read, each product is compared with its
+    `top_k` most similar products (see SimilarityIndex); a catalog of one
+    product falls back to comparing the product with itself.
+
+    Progress is checkpointed in a CheckpointJournal: a run that is
+    restarted after a crash resumes where it stopped, and products that
+    failed are attempted again according to the RetryPolicy.
+
+    With `faq_reuse` (FAQ_REUSE), variants of an already generated product
+    get its FAQs instead of a model request (see FAQReuse).
+    """
+
+    def __init__(self, llm=None, concurrency: Optional[int] = None,
+                 incremental: Optional[bool] = None, top_k: Optional[int] = None,
+                 sink: Optional[str] = None, faq_batch_size: Optional[int] = None,
+                 resume: Optional[bool] = None, retry: Optional[RetryPolicy] = None,
+                 analytics: Optional[bool] = None, faq_reuse: Optional[bool] = None):
+        if llm is None:
+            llm = LazyLLM(task="faq")
+
+        self.llm = llm
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+        self.incremental = Config.INCREMENTAL if incremental is None else incremental
+        self.top_k = Config.COMPARISON_TOP_K if top_k is None else top_k
+        self.faq_batch_size = faq_batch_size or Config.FAQ_BATCH_SIZE
+        self.sink_kind = sink or Config.OUTPUT_SINK
+        self.resume = Config.CHECKPOINT_RESUME if resume is None else resume
+        self.retry = retry or RetryPolicy()
+        self.use_analytics = Config.CATALOG_ANALYTICS if analytics is None else analytics
+        self.analytics = None
+        self.manifest: Optional[RunManifest] = None
+        self.sink: Optional[OutputSink] = None
+        self.journal: Optional[CheckpointJournal] = None
+        self.progress: Optional[RunProgress] = None
+
+        self.parser = ParserAgent()
+        use_reuse = Config.FAQ_REUSE if faq_reuse is None else faq_reuse
+        self.faq_agent = FAQAgent(self.llm, reuse=FAQReuse() if use_reuse else None)
+        self.product_agent = ProductPageAgent(self.llm)
+        self.compare_agent = ComparisonPageAgent(self.llm)
+
+        # Pages built from the product alone; only the FAQ depends on the model
+        model = getattr(self.llm, "model_name", "") or type(self.llm).__name__
+        self.pages = {
+            "faq": (Config.TEMPLATE_FAQ, model, self._render_faq),
+            "product": (Config.TEMPLATE_PRODUCT, "", self._render_product),
+        }
+
+        # Catalog state for the current run, indexed by stream position
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._cards: List[Product] = []
+        self._fingerprints: List[str] = []
+        self._index = None
+        # Product id -> input position, for CatalogAnalytics lookups
+        self._rows: Dict[str, int] = {}
+
+    # ===================== PER PRODUCT =====================
+
+    def _timed(self, timings: Dict[str, List[float]], page: str, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.setdefault(page, []).append(time.perf_counter() - start)
+        return result
+
+    def _render_faq(self, product: Product, faqs: Optional[List[dict]] = None,
+                    facts: Optional[Dict[str, Any]] = None) -> str:
+        if faqs is None:
+            faqs = self.faq_agent.generate_faq(product, facts)
+        return self.faq_agent.render_faq_page(product, faqs, Config.TEMPLATE_FAQ)
+
+    def _render_product(self, product: Product, facts: Optional[Dict[str, Any]] = None) -> str:
+        return self.product_agent.run(product, Config.TEMPLATE_PRODUCT, facts)
+
+    def _render_comparison(self, product: Product, rival: Product, facts: Optional[Dict[str, Any]] = None,
+                           rival_facts: Optional[Dict[str, Any]] = None) -> str:
+        return self.compare_agent.run(product, rival, Config.TEMPLATE_COMPARISON, facts, rival_facts)
+
+    def _facts(self, pid: str) -> Optional[Dict[str, Any]]:
+        """
+        Catalog facts shown on a product's pages (CatalogAnalytics.grounding),
+        or None when analytics are off.
+        """
+        if self.analytics is None:
+            return None
+        return self.analytics.grounding(self._rows[pid])
+
+    def _fingerprint(self, pid: str, product: Product) -> str:
+        """
+        Product fingerprint recorded in the manifest. Batch runs and the
+        service both use it, so they read each other's manifests.
+        """
+        # Pages also show catalog facts, so they are part of the fingerprint
+        return product_fingerprint(product, self._facts(pid))
+
+    def _rivals(self, index: int) -> List[int]:
+        if self._index is None:
+            return [index]
+        return [j for j, _ in self._index.top_k(index, self.top_k)] or [index]
+
+    def _emit(self, timings, pid: str, page: str, variant: str, fingerprint: str, render, *args,
+              record: bool = True):
+        key = RunManifest.key(pid, f"{page}/{variant}" if variant else page)
+        if self.manifest.check(key, fingerprint, self.sink.location(pid, page, variant)):
+            return
+        rendered = self._timed(timings, page, render, *args)
+        with METRICS.stage("write", page=page):
+            location = self.sink.write(pid, page, rendered, variant)
+        if record:
+            self.manifest.record(key, fingerprint, location)
+
+    def _degraded(self, pid: str, faqs: Optional[List[dict]]) -> bool:
+        """
+        True when `faqs` fell back after a failed model request and the
+        product has attempts left: the page is written but not recorded,
+        so the next run generates it again.
+        """
+        return (
+            getattr(faqs, "degraded", False) and self.retry.retry_degraded
+            and self.journal is not None and self.journal.may_retry(pid)
+        )
+
+    def process(self, pid: str, product: Product, product_fp: str,
+                faqs: Optional[List[dict]] = None) -> Dict[str, List[float]]:
+        """
+        Generates the single-product pages, skipping those whose inputs
+        (product fields, template, model) match the manifest.
+        `faqs` are used instead of a per-product FAQ request when given.
+        Returns the timings of the pages actually generated; raises
+        DegradedOutput when fallback FAQs were written and should be retried.
+        """
+        timings: Dict[str, List[float]] = {}
+        degraded = self._degraded(pid, faqs)
+        facts = self._facts(pid)
+        with METRICS.product(pid):
+            for page, (template, model, render) in self.pages.items():
+                args = (product, faqs, facts) if page == "faq" else (product, facts)
+                self._emit(
+                    timings, pid, page, "",
+                    page_fingerprint(product_fp, template, model),
+                    render, *args,
+                    record=not (degraded and page == "faq")
+                )
+        if degraded:
+            raise DegradedOutput("FAQ request failed, fallback FAQs written")
+        return timings
+
+    def process_group(self, group: List[Tuple[str, Product, str]]) -> List[Tuple[str, Any]]:
+        """
+        Like `process` for several products, with the FAQs of every stale
+        FAQ page generated in batched requests.
+        Returns (product id, timings or the exception it failed with) pairs.
+        """
+        template, model, _ = self.pages["faq"]
+        stale = [
+            (pid, product) for pid, product, product_fp in group
+            if not self.manifest.is_current(
+                RunManifest.key(pid, "faq"),
+                page_fingerprint(product_fp, template, model),
+                self.sink.location(pid, "faq")
+            )
+        ]
+
+        faqs: Dict[str, List[dict]] = {}
+        share = 0.0
+        if stale:
+            start = time.perf_counter()
+            generated = self.faq_agent.generate_faq_batch(
+                [product for _, product in stale], [self._facts(pid) for pid, _ in stale]
+            )
+            share = (time.perf_counter() - start) / len(stale)
+            faqs = {pid: items for (pid, _), items in zip(stale, generated)}
+
+        outcomes = []
+        for pid, product, product_fp in group:
+            try:
+                timings = self.process(pid, product, product_fp, faqs.get(pid))
+            except Exception as e:
+                outcomes.append((pid, e))
+                continue
+            # Charge each product its share of the batched FAQ requests
+            if pid in faqs and timings.get("faq"):
+                timings["faq"][-1] += share
+            outcomes.append((pid, timings))
+        return outcomes
+
+    def process_comparisons(self, index: int) -> Dict[str, List[float]]:
+        """
+        Generates the comparison pages of one product against its rivals.
+        """
+        pid, card, product_fp = self._ids[index], self._cards[index], self._fingerprints[index]
+        timings: Dict[str, List[float]] = {}
+        facts = self._facts(pid)
+        with METRICS.product(pid):
+            for rival in self._rivals(index):
+                rid = self._ids[rival]
+                self._emit(
+                    timings, pid, "comparison", rid,
+                    page_fingerprint(product_fp + self._fingerprints[rival], Config.TEMPLATE_COMPARISON),
+                    self._render_comparison, card, self._cards[rival], facts, self._facts(rid)
+                )
+        return timings
+
+    # ===================== RUN =====================
+
+    def _record(self, pid: str, outcome, stats: BatchStats, completes: bool):
+        if isinstance(outcome, Exception):
+            attempt = ""
+            if self.journal is not None:
+                attempts = self.journal.product_failed(pid, outcome)
+                attempt = f" (attempt {attempts}/{self.retry.max_attempts})"
+            with self._lock:
+                stats.failed += 1
+                if completes:
+                    self.progress.update(failed=True)
+                if isinstance(outcome, TemplateValidationError):
+                    for path in sorted({path for path, _ in outcome.errors}):
+                        stats.validation_failures[(outcome.template, path)] += 1
+            if isinstance(outcome, TemplateValidationError):
+                METRICS.incr(f"template_validation_failures_total{{template=\"{outcome.template}\"}}")
+            print(f"❌ {pid}: {outcome}{attempt}")
+            return
+
+        if completes and self.journal is not None:
+            self.journal.product_done(pid)
+        with self._lock:
+            if completes:
+                stats.completed += 1
+                self.progress.update(generated=bool(outcome))
+            for page, values in outcome.items():
+                stats.latencies[page].extend(values)
+
+    def _collect(self, future, pid: str, stats: BatchStats, completes: bool):
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = e
+        self._record(pid, outcome, stats, completes)
+
+    def _collect_group(self, future, pids: List[str], stats: BatchStats):
+        try:
+            outcomes = future.result()
+        except Exception as e:
+            outcomes = [(pid, e) for pid in pids]
+        for pid, outcome in outcomes:
+            self._record(pid, outcome, stats, True)
+
+    def _reject(self, index: Optional[int], error: Exception, stats: BatchStats):
+        # index None: the input itself is unreadable and the stream ends here
+        with self._lock:
+            stats.failed += 1
+            if index is None:
+                stats.input_error = str(error)
+        where = "input" if index is None else f"product #{index}"
+        print(f"❌ {where}: {error}")
+
+    def _register(self, index: int, raw: Dict[str, Any], product: Product,
+                  seen: Dict[str, int]) -> Tuple[str, str]:
+        """
+        Assigns the product its output id and keeps its comparison card.
+        Returns (product id, product fingerprint).
+        """
+        # Disambiguate duplicate ids so products never overwrite each other
+        # (an id made up here may itself be a later product's id: a, a, a-2)
+        pid = base = product_id(raw, index)
+        while pid in seen:
+            seen[base] += 1
+            pid = f"{base}-{seen[base]}"
+        seen[pid] = 1
+
+        self._rows[pid] = index
+        product_fp = self._fingerprint(pid, product)
+        self._ids.append(pid)
+        self._cards.append(product.card())
+        self._fingerprints.append(product_fp)
+        return pid, product_fp
+
+    def _given_up(self, pid: str, stats: BatchStats) -> bool:
+        """
+        Skips a product that failed in as many runs as the RetryPolicy allows.
+        """
+        if self.journal is None or not self.journal.exhausted(pid):
+            return False
+        with self._lock:
+            stats.failed += 1
+            self.progress.update(failed=True)
+        print(f"⏭️  {pid}: failed in {self.journal.attempts(pid)} runs, skipped")
+        return True
+
+    def _submit(self, pool, slots, collect, fn, *args):
+        # Blocks once enough jobs are queued: backpressure on the reader
+        slots.acquire()
+        future = pool.submit(fn, *args)
+
+        def done(f):
+            slots.release()
+            collect(f)
+
+        future.add_done_callback(done)
+
+    def _submit_group(self, pool, slots, stats: BatchStats, group):
+        pids = [pid for pid, _, _ in group]
+        self._submit(pool, slots, partial(self._collect_group, pids=pids, stats=stats),
+                     self.process_group, group)
+
+    def _start_run(self, input_path: str, output_dir: Optional[str]):
+        root = Path(output_dir or Config.BATCH_OUTPUT_DIR)
+        self.sink = make_sink(self.sink_kind, str(root))
+        # Interned ids of a catalog's products live as long as its run
+        new_vocabularies()
+        METRICS.reset()
+
+        self.analytics = None
+        if self.use_analytics:
+            # numpy is only needed by batch runs
+            from agents.catalog_analytics import CatalogAnalytics
+            try:
+                self.analytics = CatalogAnalytics.from_catalog(input_path, self.parser)
+                self.analytics.print_summary()
+            except (OSError, IngestionError):
+                # Reported by the run itself when it reaches the error
+                pass
+
+        try:
+            total = self.analytics.size if self.analytics is not None else count_records(input_path)
+        except OSError:
+            total = None
+        self.progress = RunProgress(total)
+
+        self.journal = None
+        if Config.CHECKPOINT_ENABLED:
+            self.journal = CheckpointJournal(Config.CHECKPOINT_PATH or str(root / "checkpoint.sqlite"), self.retry)
+            # Stream sinks rewrite whole files, so there is nothing to resume
+            self.journal.start(input_path, resume=self.resume and self.sink.persistent, total=total)
+
+        # Stream sinks rewrite whole files, so unchanged pages cannot be kept
+        self.manifest = RunManifest(
+            str(root / "manifest.json"),
+            reuse=self.incremental and self.sink.persistent,
+            journal=self.journal,
+            exists=self.sink.exists
+        )
+        if self.journal is not None and self.journal.resumed:
+            print(
+                f"♻️  Resuming run #{self.journal.run_id}: {len(self.manifest.resumed)} pages done, "
+                f"{self.journal.retryable()} failed products to retry"
+            )
+        self._ids, self._cards, self._fingerprints = [], [], []
+        self._index = None
+        self._rows = {}
+        if self.faq_agent.reuse is not None:
+            self.faq_agent.reuse.clear()
+
+    def _build_index(self):
+        if len(self._cards) > 1 and self.top_k > 0:
+            # numpy is only needed once the catalog has been read
+            from agents.similarity_index import SimilarityIndex
+            self._index = SimilarityIndex(self._cards)
+        print(
+            f"🔎 Comparing {len(self._ids)} products, "
+            f"comparisons/product={self.top_k if self._index else 1}"
+        )
+
+    def _close_sink(self, stats: BatchStats):
+        # Neither does one that could not read the whole catalog
+        if stats.input_error:
+            self.sink.abort()
+            return
+        # Comparisons with products that are no longer a rival
+        for output in self.manifest.prune("comparison", self._rows):
+            self.sink.delete(output)
+            stats.pruned += 1
+        self.sink.close()
+
+    def _finish_run(self, stats: BatchStats, start: float) -> BatchStats:
+        stats.elapsed = time.perf_counter() - start
+        stats.reused = self.manifest.reused
+        stats.regenerated = self.manifest.regenerated
+        if self.faq_agent.reuse is not None:
+            stats.faq_reused = self.faq_agent.reuse.reused
+            stats.requests_saved = self.faq_agent.reuse.requests_saved
+            stats.tokens_saved = self.faq_agent.reuse.tokens_saved
+
+        if self.journal is not None:
+            left = self.journal.retryable()
+            if stats.input_error:
+                # Resumed once the input is fixed
+                print("🧾 The catalog could not be read to the end; this run resumes when started again")
+            elif left:
+                print(f"🧾 {left} failed products are retried when this run is started again")
+            else:
+                self.journal.finish()
+            self.journal.close()
+        return stats
+
+    def run(self, input_path: str, output_dir: Optional[str] = None) -> BatchStats:
+        stats = BatchStats()
+        start = time.perf_counter()
+        self._start_run(input_path, output_dir)
+        seen: Dict[str, int] = {}
+
+        # A couple of queued jobs per worker keeps the pool busy
+        slots = threading.BoundedSemaphore(self.concurrency * 2)
+
+        group: List[Tuple[str, Product, str]] = []
+
+        print(
+            f"🚀 Batch: streaming {input_path}, concurrency={self.concurrency}, "
+            f"faq_batch={self.faq_batch_size}"
+        )
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for index, raw, product, error in ProductStream(input_path, parser=self.parser):
+                    if error is not None:
+                        self._reject(index, error, stats)
+                        continue
+                    pid, product_fp = self._register(index, raw, product, seen)
+                    if self._given_up(pid, stats):
+                        continue
+
+                    # Groups of one make a single-product FAQ request
+                    group.append((pid, product, product_fp))
+                    if len(group) >= self.faq_batch_size:
+                        self._submit_group(pool, slots, stats, group)
+                        group = []
+
+                if group:
+                    self._submit_group(pool, slots, stats, group)
+
+                self._build_index()
+
+                for index, pid in enumerate(self._ids):
+                    self._submit(pool, slots, partial(self._collect, pid=pid, stats=stats, completes=False),
+                                 self.process_comparisons, index)
+        except BaseException:
+            # A failed run never replaces what the last good one published
+            self.sink.abort()
+            raise
+        else:
+            self._close_sink(stats)
+        finally:
+            self.manifest.save()
+
+        return self._finish_run(stats, start)
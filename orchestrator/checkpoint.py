@@ -0,0 +1,274 @@
+# orchestrator/checkpoint.py
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from infrastructure.config import Config
+
+
+class DegradedOutput(Exception):
+    """
+    The product's pages were written, but with fallback content because a
+    model request failed; a resumed run generates them again.
+    """
+
+
+class RetryPolicy:
+    """
+    How often a product is attempted before the run gives up on it.
+
+    Every run (first or resumed) that fails a product counts one attempt.
+    A product that raised in `max_attempts` runs is skipped by later
+    resumes; one whose FAQs fell back (DegradedOutput) keeps its fallback
+    pages on the last attempt. With retry_degraded=False fallback pages
+    are always accepted.
+    """
+
+    def __init__(self, max_attempts: Optional[int] = None, retry_degraded: Optional[bool] = None):
+        self.max_attempts = max(1, max_attempts or Config.RETRY_MAX_ATTEMPTS)
+        self.retry_degraded = Config.RETRY_DEGRADED if retry_degraded is None else retry_degraded
+
+    def exhausted(self, attempts: int) -> bool:
+        return attempts >= self.max_attempts
+
+
+class CheckpointJournal:
+    """
+    Durable progress of batch runs in a SQLite file (one per output dir).
+
+    Every finished page is committed as soon as it is written, and every
+    failed product with its attempt count, so a run that crashes or is
+    stopped loses nothing it completed. Starting a run on the same input
+    resumes the last unfinished one: its finished pages are skipped (see
+    RunManifest) and only its failed products are attempted again.
+
+        runs      (id, input, started_at, finished_at, total)
+        pages     (run_id, key, fingerprint, output)
+        failures  (run_id, product_id, attempts, error)
+    """
+
+    def __init__(self, path: str, policy: Optional[RetryPolicy] = None):
+        self.path = path
+        self.policy = policy or RetryPolicy()
+        self.run_id: Optional[int] = None
+        self.resumed = False
+        self._lock = threading.Lock()
+        # Failed attempts per product, and the products failed in this run
+        self._attempts: Dict[str, int] = {}
+        self._failed_now: set = set()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes; only an OS crash can lose
+        # the last commits
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " id INTEGER PRIMARY KEY,"
+            " input TEXT NOT NULL,"
+            " started_at REAL NOT NULL,"
+            " finished_at REAL,"
+            " total INTEGER);"
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " run_id INTEGER NOT NULL,"
+            " key TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " output TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, key));"
+            "CREATE TABLE IF NOT EXISTS failures ("
+            " run_id INTEGER NOT NULL,"
+            " product_id TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " error TEXT,"
+            " PRIMARY KEY (run_id, product_id));"
+        )
+        self._db.commit()
+
+    # ===================== RUNS =====================
+
+    def start(self, input_path: str, resume: bool = True, total: Optional[int] = None) -> bool:
+        """
+        Resumes the last unfinished run of `input_path`, or starts a new
+        one. Returns True when a run was resumed.
+        """
+        with self._lock:
+            row = None
+            if resume:
+                row = self._db.execute(
+                    "SELECT id FROM runs WHERE input = ? AND finished_at IS NULL"
+                    " ORDER BY id DESC LIMIT 1", (str(input_path),)
+                ).fetchone()
+
+            if row:
+                self.run_id, self.resumed = row[0], True
+                self._db.execute("UPDATE runs SET total = COALESCE(?, total) WHERE id = ?", (total, self.run_id))
+            else:
+                cursor = self._db.execute(
+                    "INSERT INTO runs (input, started_at, total) VALUES (?, ?, ?)",
+                    (str(input_path), time.time(), total)
+                )
+                self.run_id, self.resumed = cursor.lastrowid, False
+            self._db.commit()
+
+            self._attempts = dict(self._db.execute(
+                "SELECT product_id, attempts FROM failures WHERE run_id = ?", (self.run_id,)
+            ).fetchall())
+            self._failed_now = set()
+        return self.resumed
+
+    def retryable(self) -> int:
+        """
+        Failed products that a resumed run would attempt again.
+        """
+        with self._lock:
+            return sum(1 for n in self._attempts.values() if not self.policy.exhausted(n))
+
+    def finish(self):
+        """
+        Marks the run finished; the next run on the same input starts over.
+        Runs are only finished once no failed product is left to retry.
+        """
+        with self._lock:
+            self._db.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), self.run_id))
+            # Finished pages live on in the manifest
+            self._db.execute("DELETE FROM pages WHERE run_id = ?", (self.run_id,))
+            self._db.commit()
+
+    # ===================== PAGES =====================
+
+    def pages(self) -> Dict[str, Tuple[str, str]]:
+        """
+        Pages finished so far in this run: key -> (fingerprint, output).
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, fingerprint, output FROM pages WHERE run_id = ?", (self.run_id,)
+            ).fetchall()
+        return {key: (fingerprint, output) for key, fingerprint, output in rows}
+
+    def page_done(self, key: str, fingerprint: str, output: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (run_id, key, fingerprint, output) VALUES (?, ?, ?, ?)",
+                (self.run_id, key, fingerprint, str(output))
+            )
+            self._db.commit()
+
+    # ===================== PRODUCTS =====================
+
+    def attempts(self, product_id: str) -> int:
+        with self._lock:
+            return self._attempts.get(product_id, 0)
+
+    def exhausted(self, product_id: str) -> bool:
+        """
+        True when the product failed in as many runs as the policy allows.
+        """
+        return self.policy.exhausted(self.attempts(product_id))
+
+    def may_retry(self, product_id: str) -> bool:
+        """
+        Whether a failure now leaves the product another attempt later.
+        """
+        return not self.policy.exhausted(self.attempts(product_id) + 1)
+
+    def product_failed(self, product_id: str, error: Exception) -> int:
+        """
+        Counts one failed attempt (at most one per run). Returns the total.
+        """
+        with self._lock:
+            if product_id in self._failed_now:
+                return self._attempts[product_id]
+            self._failed_now.add(product_id)
+            attempts = self._attempts.get(product_id, 0) + 1
+            self._attempts[product_id] = attempts
+            self._db.execute(
+                "INSERT OR REPLACE INTO failures (run_id, product_id, attempts, error) VALUES (?, ?, ?, ?)",
+                (self.run_id, product_id, attempts, str(error)[:500])
+            )
+            self._db.commit()
+        return attempts
+
+    def product_done(self, product_id: str):
+        with self._lock:
+            if product_id not in self._attempts or product_id in self._failed_now:
+                return
+            del self._attempts[product_id]
+            self._db.execute(
+                "DELETE FROM failures WHERE run_id = ? AND product_id = ?", (self.run_id, product_id)
+            )
+            self._db.commit()
+
+    def failures(self) -> List[Tuple[str, int, str]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT product_id, attempts, error FROM failures WHERE run_id = ? ORDER BY product_id",
+                (self.run_id,)
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class RunProgress:
+    """
+    Prints products done / failed, throughput and ETA every `interval`
+    seconds. The ETA is based on products that actually generated pages,
+    so the quick pass over pages finished before a resume does not skew it.
+    """
+
+    def __init__(self, total: Optional[int] = None, interval: Optional[float] = None):
+        self.total = total
+        self.interval = Config.PROGRESS_INTERVAL if interval is None else interval
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.done = 0
+        self.failed = 0
+        self.generated = 0
+
+    def update(self, failed: bool = False, generated: bool = True):
+        """
+        Counts one product; callers serialize calls.
+        """
+        if failed:
+            self.failed += 1
+        else:
+            self.done += 1
+            self.generated += int(generated)
+
+        now = time.perf_counter()
+        if self.interval and now - self._last >= self.interval:
+            self._last = now
+            print(self.line(now))
+
+    def line(self, now: Optional[float] = None) -> str:
+        elapsed = (now or time.perf_counter()) - self.started
+        seen = self.done + self.failed
+        rate = self.generated / elapsed if elapsed else 0.0
+        text = f"⏳ {seen}"
+        if self.total:
+            text += f"/{self.total} products ({seen / self.total:.0%})"
+        else:
+            text += " products"
+        text += f", {self.failed} failed, {rate:.1f}/s"
+        if self.total and rate:
+            text += f", ETA {_duration(max(0, self.total - seen) / rate)}"
+        return text
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
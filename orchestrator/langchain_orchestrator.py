@@ -1,25 +1,50 @@
 import json
-from langchain_core.tools import Tool
-from langchain.agents import create_structured_chat_agent
-from langchain.agents.agent import AgentExecutor
-from langchain_core.prompts import ChatPromptTemplate
 
-from infrastructure.llm_client import LLMClient
 from infrastructure.config import Config
 from agents.faq_page_agent import FAQAgent
 from agents.product_page_agent import ProductPageAgent
 from agents.comparison_page_agent import ComparisonPageAgent
+from agents.prompt_builder import PromptBuilder
+from infrastructure.instrumentation import METRICS
+from infrastructure.lazy_llm import LazyLLM
+from infrastructure.output_sink import FileSink
+from orchestrator.batch_runner import product_id
+from orchestrator.manifest import RunManifest, page_fingerprint, product_fingerprint
 
 
 class LangChainOrchestrator:
-    def __init__(self):
-        print("🚀 Using Groq LLM")
-        self.llm = LLMClient().as_langchain_llm()
+    MODES = ("direct", "agentic")
 
-        self.faq_agent = FAQAgent(self.llm)
+    def __init__(self, mode: str = None, incremental: bool = None):
+        self.mode = (mode or Config.ORCHESTRATION_MODE).lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown orchestration mode: {self.mode}")
+
+        print(f"🚀 Using Groq LLM ({self.mode} mode)")
+        # Built on the first model request; LangChain is imported only then.
+        # Pages use the FAQ route; the agentic planner has its own.
+        self.llm = LazyLLM(task="faq")
+        self.planner_llm = LazyLLM(task="orchestration")
+
+        self.prompts = PromptBuilder()
+        self.faq_agent = FAQAgent(self.llm, self.prompts)
         self.product_agent = ProductPageAgent(self.llm)
         self.compare_agent = ComparisonPageAgent(self.llm)
 
+        # Skips pages whose product, template and model are unchanged
+        self.manifest = RunManifest(
+            Config.MANIFEST_PATH,
+            reuse=Config.INCREMENTAL if incremental is None else incremental
+        )
+        self.model_version = getattr(self.llm, "model_name", "")
+
+        # Fixed output paths, written atomically
+        self.sink = FileSink(paths={
+            "faq": Config.OUTPUT_FAQ,
+            "product": Config.OUTPUT_PRODUCT,
+            "comparison": Config.OUTPUT_COMPARISON,
+        })
+
         # 🧠 TOOL MEMORY — prevents infinite loops
         self.tool_state = {
             "faq": False,
@@ -27,26 +52,46 @@ class LangChainOrchestrator:
             "comparison": False
         }
 
+        # Product of the current run; compact planner prompts refer to it by id
+        self.product = None
+
         # ===================== TOOLS =====================
-        self.tools = [
-            Tool(
-                name="generate_faq",
-                func=self._faq_tool,
-                description="Generate FAQ page. Input must be product JSON string"
+        # name -> (function, description)
+        tool_input = "the product id" if self.prompts.compact else "product JSON string"
+        self.tool_specs = {
+            "generate_faq": (
+                self._faq_tool,
+                f"Generate FAQ page. Input must be {tool_input}"
             ),
-            Tool(
-                name="generate_product_page",
-                func=self._product_tool,
-                description="Generate product page. Input must be product JSON string"
+            "generate_product_page": (
+                self._product_tool,
+                f"Generate product page. Input must be {tool_input}"
             ),
-            Tool(
-                name="generate_comparison",
-                func=self._comparison_tool,
-                description="Generate comparison page. Input must be product JSON string"
+            "generate_comparison": (
+                self._comparison_tool,
+                f"Generate comparison page. Input must be {tool_input}"
             )
+        }
+
+        # The planner agent (and LangChain's agent stack) is only needed in agentic mode
+        self.tools = []
+        self.executor = None
+        if self.mode == "agentic":
+            self.executor = self._build_executor()
+
+    # ===================== AGENT =====================
+
+    def _build_executor(self):
+        from langchain_core.tools import Tool
+        from langchain.agents import create_structured_chat_agent
+        from langchain.agents.agent import AgentExecutor
+        from langchain_core.prompts import ChatPromptTemplate
+
+        self.tools = [
+            Tool(name=name, func=func, description=description)
+            for name, (func, description) in self.tool_specs.items()
         ]
 
-        # ===================== PROMPT =====================
         self.prompt = ChatPromptTemplate.from_messages([
             ("system",
              "You are a tool calling AI.\n\n"
@@ -69,12 +114,12 @@ class LangChainOrchestrator:
         ])
 
         self.agent = create_structured_chat_agent(
-            llm=self.llm,
+            llm=self.planner_llm.load(),
             tools=self.tools,
             prompt=self.prompt
         )
 
-        self.executor = AgentExecutor(
+        return AgentExecutor(
             agent=self.agent,
             tools=self.tools,
             verbose=True,
@@ -84,71 +129,120 @@ class LangChainOrchestrator:
 
     # ===================== TOOLS =====================
 
-    def _faq_tool(self, product_json: str):
+    def _tool_product(self, product_input: str) -> dict:
+        """
+        The product a tool call refers to: the product JSON itself, or an
+        id standing for the run's product.
+        """
+        text = product_input.strip()
+        if text.startswith("{"):
+            return json.loads(text)
+        return self.product
+
+    def _emit(self, page: str, product: dict, template: str, render, model: str = ""):
+        pid = product_id(product, 0)
+        key = RunManifest.key(pid, page)
+        fingerprint = page_fingerprint(product_fingerprint(product), template, model)
+        output = self.sink.location(pid, page)
+
+        if self.manifest.check(key, fingerprint, output):
+            print(f"♻️  {page}: inputs unchanged, reusing {output}")
+            return
+
+        with METRICS.product(pid):
+            rendered = render()
+            with METRICS.stage("write", page=page):
+                self.sink.write(pid, page, rendered)
+
+        self.manifest.record(key, fingerprint, output)
+        self.manifest.save()
+
+    def _faq_tool(self, product_input: str):
         if self.tool_state["faq"]:
             return "FAQ_ALREADY_DONE"
 
         print("🟢 TOOL: FAQ")
-        product = json.loads(product_json)
-        faqs = self.faq_agent.generate_faq(product)
-        rendered = self.faq_agent.render_faq_page(product, faqs, Config.TEMPLATE_FAQ)
-        with open(Config.OUTPUT_FAQ, "w", encoding="utf-8") as f:
-           f.write(rendered)
+        product = self._tool_product(product_input)
+
+        def render():
+            faqs = self.faq_agent.generate_faq(product)
+            return self.faq_agent.render_faq_page(product, faqs, Config.TEMPLATE_FAQ)
 
+        self._emit("faq", product, Config.TEMPLATE_FAQ, render, self.model_version)
 
         self.tool_state["faq"] = True
         return "FAQ_DONE"
 
-    def _product_tool(self, product_json: str):
+    def _product_tool(self, product_input: str):
         if self.tool_state["product"]:
             return "PRODUCT_ALREADY_DONE"
 
         print("🟢 TOOL: PRODUCT")
-        product = json.loads(product_json)
-        rendered = self.product_agent.run(product, Config.TEMPLATE_PRODUCT)
-        with open(Config.OUTPUT_PRODUCT, "w", encoding="utf-8") as f:
-           f.write(rendered)
-
+        product = self._tool_product(product_input)
+        self._emit(
+            "product", product, Config.TEMPLATE_PRODUCT,
+            lambda: self.product_agent.run(product, Config.TEMPLATE_PRODUCT)
+        )
 
         self.tool_state["product"] = True
         return "PRODUCT_DONE"
 
-    def _comparison_tool(self, product_json: str):
+    def _comparison_tool(self, product_input: str):
         if self.tool_state["comparison"]:
             return "COMPARE_ALREADY_DONE"
 
         print("🟢 TOOL: COMPARISON")
-        product = json.loads(product_json)
-        rendered = self.compare_agent.run(product, product, Config.TEMPLATE_COMPARISON)
-        with open(Config.OUTPUT_COMPARISON, "w", encoding="utf-8") as f:
-           f.write(rendered)
-
+        product = self._tool_product(product_input)
+        self._emit(
+            "comparison", product, Config.TEMPLATE_COMPARISON,
+            lambda: self.compare_agent.run(product, product, Config.TEMPLATE_COMPARISON)
+        )
 
         self.tool_state["comparison"] = True
         return "COMPARE_DONE"
 
     # ===================== RUN =====================
 
+    def _run_direct(self, product: dict):
+        """
+        Planner-free execution: the three pages are independent, so the
+        DAG is just a fixed sequence of tool calls. No LLM round-trips are
+        spent on routing; the only LLM call left is the FAQ generation.
+        """
+        ref = product_id(product, 0)
+        return {name: func(ref) for name, (func, _) in self.tool_specs.items()}
+
+    def _run_agentic(self, product: dict):
+        prompt = self.prompts.planner(product_id(product, 0), product)
+
+        # Includes the planner's own LLM round-trips and the tool calls
+        with METRICS.stage("planner"):
+            result = self.executor.invoke({
+                "input": prompt,
+                "agent_scratchpad": ""
+            })
+        
+        if all(self.tool_state.values()):
+           print("\n🛑 All tools executed — stopping agent.\n")
+
+        return result
+
     def run(self):
         product = json.load(open(Config.INPUT_PRODUCT_DATA, "r", encoding="utf-8"))
+        self.product = product
 
-        prompt = (
-            "Call all tools to generate all pages.\n\n"
-            "Product JSON:\n"
-            + json.dumps(product)
-        )
+        if self.mode == "agentic":
+            result = self._run_agentic(product)
+        else:
+            result = self._run_direct(product)
 
-        result = self.executor.invoke({
-            "input": prompt,
-            "agent_scratchpad": ""
-        })
-        
-        if all(self.tool_state.values()):
-           print("\n🛑 All tools executed — stopping agent.\n")
+        pages = self.manifest.summary()
+        print(f"📄 Pages: {pages['regenerated']} regenerated, {pages['reused']} reused")
 
         return {
             "faq": Config.OUTPUT_FAQ,
             "product": Config.OUTPUT_PRODUCT,
             "comparison": Config.OUTPUT_COMPARISON,
+            "pages": pages,
             "agent_result": result
         }
@@ -0,0 +1,147 @@
+# orchestrator/manifest.py
+
+import hashlib
+import json
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Container, Dict, List, Optional
+
+from agents.product_record import Product
+from infrastructure.output_sink import atomic_write_text
+
+
+def _digest(payload: Any) -> str:
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def product_fingerprint(product: Dict[str, Any], facts: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Fingerprint of a normalized product (output of ParserAgent.run) and,
+    when its pages show them, its catalog facts.
+    """
+    payload = product.as_dict() if isinstance(product, Product) else product
+    return _digest([payload, facts] if facts is not None else payload)
+
+
+@lru_cache(maxsize=None)
+def template_fingerprint(template_path: str) -> str:
+    return hashlib.sha256(Path(template_path).read_bytes()).hexdigest()
+
+
+def page_fingerprint(product_fp: str, template_path: str, model: str = "") -> str:
+    """
+    A page is reusable only if the product, its template and the model
+    that produced it are all unchanged. Pages that do not call the LLM
+    pass an empty model.
+    """
+    return _digest([product_fp, template_fingerprint(template_path), model])
+
+
+class RunManifest:
+    """
+    Records which inputs produced each generated page so reruns can skip
+    pages whose inputs have not changed.
+
+    With reuse=False every page is regenerated, but the manifest is still
+    written so the next incremental run can pick it up.
+
+    With a `journal` (CheckpointJournal), every recorded page is also
+    committed to it right away, and pages already finished by the run
+    being resumed count as current even with reuse=False.
+
+    `exists` tells whether a recorded output is still there (default: the
+    file exists); see OutputSink.exists.
+
+    Stored as JSON:
+        {"version": 1, "pages": {"<product_id>/<page>": {"fingerprint": ..., "output": ...}}}
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, reuse: bool = True, journal=None,
+                 exists: Optional[Callable[[str], bool]] = None):
+        self.path = Path(path)
+        self.reuse = reuse
+        self.journal = journal
+        self.exists = exists or (lambda output: Path(output).exists())
+        self._lock = threading.Lock()
+        self.pages: Dict[str, Dict[str, str]] = {}
+        self.reused = 0
+        self.regenerated = 0
+        # Keys checked by this run: the pages it (still) generates
+        self._checked: set = set()
+
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == self.VERSION:
+                    self.pages = data.get("pages", {})
+            except (OSError, ValueError):
+                # A corrupt manifest only costs a full rebuild
+                self.pages = {}
+
+        # Pages finished by the interrupted run: newer than the manifest
+        self.resumed: Dict[str, str] = {}
+        if journal is not None:
+            for key, (fingerprint, output) in journal.pages().items():
+                self.pages[key] = {"fingerprint": fingerprint, "output": output}
+                self.resumed[key] = fingerprint
+
+    @staticmethod
+    def key(product_id: str, page: str) -> str:
+        return f"{product_id}/{page}"
+
+    def is_current(self, key: str, fingerprint: str, output: Optional[str] = None) -> bool:
+        if not self.reuse and self.resumed.get(key) != fingerprint:
+            return False
+        entry = self.pages.get(key)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        return output is None or self.exists(output)
+
+    def check(self, key: str, fingerprint: str, output: Optional[str] = None) -> bool:
+        """
+        Like is_current, but also counts the page as reused / regenerated.
+        """
+        current = self.is_current(key, fingerprint, output)
+        with self._lock:
+            self._checked.add(key)
+            if current:
+                self.reused += 1
+            else:
+                self.regenerated += 1
+        return current
+
+    def record(self, key: str, fingerprint: str, output: str):
+        with self._lock:
+            self.pages[key] = {"fingerprint": fingerprint, "output": str(output)}
+        if self.journal is not None:
+            self.journal.page_done(key, fingerprint, output)
+
+    def prune(self, page: str, product_ids: Container[str]) -> List[str]:
+        """
+        Drops the entries of the `page` pages (every variant) of
+        `product_ids` that this run did not check, e.g. comparisons with
+        products that are no longer a rival. Returns their outputs, for
+        the sink to remove.
+        """
+        with self._lock:
+            stale = []
+            for key in self.pages:
+                product_id, _, rest = key.partition("/")
+                if rest.split("/")[0] == page and key not in self._checked and product_id in product_ids:
+                    stale.append(key)
+            return [self.pages.pop(key)["output"] for key in stale]
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps(
+                {"version": self.VERSION, "pages": self.pages},
+                indent=2, sort_keys=True, ensure_ascii=False
+            )
+        atomic_write_text(str(self.path), payload)
+
+    def summary(self) -> Dict[str, int]:
+        return {"reused": self.reused, "regenerated": self.regenerated}
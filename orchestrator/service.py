@@ -0,0 +1,447 @@
+# orchestrator/service.py
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from infrastructure.config import Config
+from infrastructure.ingestion import iter_raw_products
+from infrastructure.instrumentation import METRICS
+from infrastructure.output_sink import FileSink, atomic_write_text
+from orchestrator.batch_runner import BatchRunner, product_id
+from orchestrator.manifest import RunManifest, page_fingerprint
+
+# Largest request body accepted over HTTP
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class Coalescer:
+    """
+    Hands out one Future per key while work on that key is in flight.
+
+    The first caller to `claim` a key owns it and must `resolve` it; later
+    callers get the same Future and simply wait, so identical requests
+    arriving together are served by one generation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def resolve(self, key: str, result: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            future = self._inflight.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+class GenerationService(BatchRunner):
+    """
+    Long-running page generation with warm state.
+
+    The LLM client, its response cache, the template engine and the
+    agents are built once. Products then arrive over HTTP (`make_server`)
+    or through a drop directory (`DropDirWatcher`); see `serve`.
+    Pages are persisted like a batch run, under `<output_dir>/<product_id>/`,
+    and unchanged pages are reused through the manifest.
+
+    Products are coalesced by id and fingerprint: an identical product that
+    is already being generated, in the same request or another one, is
+    not generated again. A product whose id and name give no usable slug
+    is named after its fingerprint, and a product reusing an id already taken by another
+    product of the same request gets a fingerprint suffix, so no two
+    products of a request share a folder. The products of one request
+    share batched FAQ requests (FAQ_BATCH_SIZE). Each product is compared
+    with itself, as in single-product runs.
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, workers: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        root = Path(output_dir or Config.SERVICE_OUTPUT_DIR)
+        self.sink = FileSink(str(root))
+        self.manifest = RunManifest(str(root / "manifest.json"), reuse=self.incremental)
+        self.workers = workers or Config.SERVICE_WORKERS
+        self.coalescer = Coalescer()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generate")
+        self._save_lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self.started = time.time()
+        self.counts = {"requests": 0, "products": 0, "coalesced": 0, "failed": 0}
+
+    def warm(self):
+        """
+        Loads everything the first request would otherwise pay for.
+        """
+        from infrastructure.llm_cache import get_llm_cache
+        from template_engine.jinja_engine import get_engine
+
+        if hasattr(self.llm, "load"):
+            self.llm.load()
+        get_engine()
+        get_llm_cache()
+
+    # ===================== GENERATION =====================
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] += value
+        METRICS.incr(f"service_{name}_total", value)
+
+    def locations(self, pid: str) -> Dict[str, str]:
+        return {
+            page: self.sink.location(pid, page, variant)
+            for page, variant in (("faq", ""), ("product", ""), ("comparison", pid))
+        }
+
+    def _pages(self, pid: str, timings: Dict[str, List[float]]) -> Dict[str, Any]:
+        # Reused pages come from disk, so every answer has all pages
+        pages = {}
+        for page, location in self.locations(pid).items():
+            with open(location, "r", encoding="utf-8") as f:
+                pages[page] = json.load(f)
+        return {"product_id": pid, "pages": pages, "regenerated": sorted(timings)}
+
+    def _generate(self, group: List[Tuple[str, Dict[str, Any], str, str]]):
+        """
+        Generates the pages of products this request owns and resolves
+        their coalescing keys.
+        """
+        try:
+            outcomes = dict(self.process_group([(pid, product, fp) for pid, product, fp, _ in group]))
+        except Exception as e:
+            outcomes = {pid: e for pid, _, _, _ in group}
+
+        for pid, product, fp, key in group:
+            outcome = outcomes.get(pid)
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                card = product.card()
+                with METRICS.product(pid):
+                    self._emit(
+                        outcome, pid, "comparison", pid,
+                        page_fingerprint(fp + fp, Config.TEMPLATE_COMPARISON),
+                        self._render_comparison, card, card
+                    )
+                self.coalescer.resolve(key, self._pages(pid, outcome))
+            except Exception as e:
+                self.coalescer.resolve(key, error=e)
+
+    def _identify(self, raw: Dict[str, Any], product, taken: Dict[str, str]) -> Tuple[str, str]:
+        """
+        (product id, fingerprint) of a product of one request. `taken`
+        maps the ids already used in the request to their fingerprints.
+        """
+        # Without a catalog there are no facts, so the id does not matter here
+        fp = self._fingerprint("", product)
+        # A position in a request means nothing across requests
+        pid = product_id(raw, fp[:12])
+        if taken.setdefault(pid, fp) != fp:
+            pid = f"{pid}-{fp[:8]}"
+            taken.setdefault(pid, fp)
+        return pid, fp
+
+    def submit(self, raws: List[Dict[str, Any]]) -> List[Tuple[Optional[Future], Optional[Exception], bool]]:
+        """
+        Starts generating `raws`. Returns one (future, input error,
+        coalesced) triple per product, in order.
+        """
+        self._count("requests")
+        claims, owned = [], []
+        taken: Dict[str, str] = {}
+        for index, raw in enumerate(raws):
+            try:
+                if not isinstance(raw, dict):
+                    raise ValueError("product must be a JSON object")
+                product = self.parser.run(raw)
+            except Exception as e:
+                claims.append((None, e, False))
+                continue
+            pid, fp = self._identify(raw, product, taken)
+            key = f"{pid}:{fp}"
+            future, owner = self.coalescer.claim(key)
+            claims.append((future, None, not owner))
+            if owner:
+                owned.append((pid, product, fp, key))
+            else:
+                self._count("coalesced")
+
+        for start in range(0, len(owned), self.faq_batch_size):
+            self._pool.submit(self._generate, owned[start:start + self.faq_batch_size])
+        return claims
+
+    def generate(self, raws: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Generates (or reuses) the pages of `raws` and waits for them.
+        One result per product: its pages, or an `error`.
+        """
+        results = []
+        for future, error, coalesced in self.submit(raws):
+            if future is not None:
+                try:
+                    result = dict(future.result())
+                    result["coalesced"] = coalesced
+                    results.append(result)
+                    self._count("products")
+                    continue
+                except Exception as e:
+                    error = e
+            self._count("failed")
+            results.append({"error": str(error)})
+
+        self.save(force=False)
+        return results
+
+    def save(self, force: bool = True):
+        """
+        Writes the manifest. Unless forced, at most once per
+        SERVICE_MANIFEST_INTERVAL and never while another save runs: a
+        save rewrites every entry, so it is not paid per request.
+        """
+        if not self._save_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if force or now - self._saved_at >= Config.SERVICE_MANIFEST_INTERVAL:
+                self._saved_at = now
+                self.manifest.save()
+        finally:
+            self._save_lock.release()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started, 1),
+            "llm_loaded": getattr(self.llm, "loaded", True),
+            **counts,
+            "faq_reused": self.faq_agent.reuse.reused if self.faq_agent.reuse is not None else 0,
+            "models": self._models(),
+        }
+
+    @staticmethod
+    def _models() -> Dict[str, Any]:
+        # Latency and cost per model, once the client has been loaded
+        llm_client = sys.modules.get("infrastructure.llm_client")
+        return llm_client.ROUTER.summary() if llm_client is not None else {}
+
+    def close(self):
+        self._pool.shutdown()
+        self.save()
+        self.sink.close()
+
+    # ===================== HTTP =====================
+
+    def make_server(self, host: Optional[str] = None, port: Optional[int] = None) -> ThreadingHTTPServer:
+        """
+        HTTP API:
+            POST /generate   product object, array, or {"products": [...]}
+            GET  /health     counters and uptime
+            GET  /metrics    Prometheus text
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, status: int, payload: Any):
+                self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._json(200, service.status())
+                elif self.path == "/metrics":
+                    self._send(200, METRICS.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4")
+                else:
+                    self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path.split("?", 1)[0] != "/generate":
+                    self._json(404, {"error": "not found"})
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    self._json(413, {"error": "request too large"})
+                    return
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"null")
+                except ValueError as e:
+                    self._json(400, {"error": f"invalid JSON: {e}"})
+                    return
+
+                if isinstance(payload, dict) and isinstance(payload.get("products"), list):
+                    raws, single = payload["products"], False
+                elif isinstance(payload, list):
+                    raws, single = payload, False
+                elif isinstance(payload, dict):
+                    raws, single = [payload], True
+                else:
+                    self._json(400, {"error": "expected a product object or a list of products"})
+                    return
+
+                results = service.generate(raws)
+                if single:
+                    self._json(200 if "error" not in results[0] else 422, results[0])
+                else:
+                    self._json(200, {"results": results})
+
+        return ThreadingHTTPServer((host or Config.SERVICE_HOST, port or Config.SERVICE_PORT), Handler)
+
+
+class DropDirWatcher:
+    """
+    File queue for the service: catalogs (JSON, JSONL or CSV) dropped
+    into `<drop_dir>/inbox` are claimed by renaming them into
+    `processing/`. Each product's pages are persisted, and a summary goes
+    to `outbox/<name>.<time>-<id>.result.json`, unique so that inputs of
+    the same name never overwrite each other's results. The input then
+    moves to `done/`, or to `failed/` when it could not be read.
+
+    Writers should create files under another name (a leading '.' or a
+    `.tmp` suffix) and rename them into the inbox when complete.
+    """
+
+    def __init__(self, service: GenerationService, drop_dir: Optional[str] = None,
+                 interval: Optional[float] = None):
+        self.service = service
+        self.root = Path(drop_dir or Config.SERVICE_DROP_DIR)
+        self.interval = interval or Config.SERVICE_POLL_INTERVAL
+        self.dirs = {name: self.root / name for name in ("inbox", "processing", "outbox", "done", "failed")}
+        for path in self.dirs.values():
+            path.mkdir(parents=True, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _claim(self) -> List[Path]:
+        claimed = []
+        for path in sorted(self.dirs["inbox"].iterdir()):
+            if path.name.startswith(".") or path.suffix == ".tmp" or not path.is_file():
+                continue
+            target = self.dirs["processing"] / path.name
+            try:
+                os.replace(path, target)
+            except OSError:
+                # Claimed by another watcher
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        # Page contents stay in their files; the summary points at them
+        if "error" in result:
+            return result
+        return {
+            "product_id": result["product_id"],
+            "regenerated": result["regenerated"],
+            "coalesced": result["coalesced"],
+            "outputs": self.service.locations(result["product_id"]),
+        }
+
+    def process_file(self, path: Path):
+        summary: Dict[str, Any] = {"input": path.name}
+        try:
+            raws = list(iter_raw_products(str(path)))
+        except Exception as e:
+            summary["error"] = str(e)
+            destination = "failed"
+        else:
+            summary["results"] = [self._result(r) for r in self.service.generate(raws)]
+            destination = "done"
+
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        atomic_write_text(
+            str(self.dirs["outbox"] / f"{path.name}.{stamp}-{uuid.uuid4().hex[:8]}.result.json"),
+            json.dumps(summary, indent=2, ensure_ascii=False)
+        )
+        os.replace(path, self.dirs[destination] / path.name)
+        print(f"📥 {path.name}: {len(summary.get('results', []))} products → {destination}")
+
+    def poll(self) -> int:
+        """
+        Processes everything in the inbox once. Returns the number of files.
+        """
+        files = self._claim()
+        for path in files:
+            self.process_file(path)
+        return len(files)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ drop dir: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        # Files left in processing/ by a crash are picked up again
+        for path in sorted(self.dirs["processing"].iterdir()):
+            os.replace(path, self.dirs["inbox"] / path.name)
+        self._thread = threading.Thread(target=self._loop, name="drop-dir", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, drop_dir: Optional[str] = None,
+          output_dir: Optional[str] = None):
+    """
+    Runs the service until interrupted (Ctrl+C or SIGTERM).
+    """
+    service = GenerationService(output_dir=output_dir)
+    start = time.perf_counter()
+    service.warm()
+    print(f"🔥 Warmed up in {time.perf_counter() - start:.2f}s")
+
+    server = service.make_server(host, port)
+    watcher = None
+    if drop_dir or Config.SERVICE_DROP_DIR:
+        watcher = DropDirWatcher(service, drop_dir)
+        watcher.start()
+        print(f"📂 Watching {watcher.dirs['inbox']}")
+
+    # SIGTERM stops the server like Ctrl+C does
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+
+    host, port = server.server_address[:2]
+    print(f"🌐 Serving on http://{host}:{port} (POST /generate, GET /health, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if watcher is not None:
+            watcher.stop()
+        service.close()
+        print("👋 Service stopped")
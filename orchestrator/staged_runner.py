@@ -0,0 +1,266 @@
+# orchestrator/staged_runner.py
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agents.product_record import Product
+from infrastructure.config import Config
+from infrastructure.ingestion import ProductStream
+from infrastructure.instrumentation import METRICS
+from orchestrator.batch_runner import BatchRunner, BatchStats
+from orchestrator.checkpoint import DegradedOutput
+from orchestrator.manifest import RunManifest, page_fingerprint
+
+# (page, variant, render args) sent to a render process; product and
+# comparison args end with the catalog facts of the product (and rival)
+RenderJob = Tuple[str, str, tuple]
+
+
+# ===================== RENDER PROCESSES =====================
+
+_AGENTS: Dict[str, Any] = {}
+
+
+def _init_render_worker():
+    """
+    Runs once per render process: builds the agents and precompiles their
+    shared template engine, so jobs never pay for template loading.
+    """
+    from agents.faq_page_agent import FAQAgent
+    from agents.product_page_agent import ProductPageAgent
+    from agents.comparison_page_agent import ComparisonPageAgent
+    from template_engine.jinja_engine import get_engine
+
+    get_engine()
+    _AGENTS.update(faq=FAQAgent(), product=ProductPageAgent(), comparison=ComparisonPageAgent())
+    METRICS.drain()
+
+
+def _warm(_: int) -> int:
+    return os.getpid()
+
+
+def _render(pid: str, jobs: List[RenderJob]):
+    """
+    Renders and validates the pages of one product.
+    Returns the pages, their render timings and the metrics recorded here.
+    """
+    pages, timings = [], {}
+    with METRICS.product(pid):
+        for page, variant, args in jobs:
+            start = time.perf_counter()
+            if page == "faq":
+                content = _AGENTS["faq"].render_faq_page(*args, Config.TEMPLATE_FAQ)
+            elif page == "product":
+                product, facts = args
+                content = _AGENTS["product"].run(product, Config.TEMPLATE_PRODUCT, facts)
+            else:
+                product, rival, facts, rival_facts = args
+                content = _AGENTS["comparison"].run(
+                    product, rival, Config.TEMPLATE_COMPARISON, facts, rival_facts
+                )
+            timings.setdefault(page, []).append(time.perf_counter() - start)
+            pages.append(content)
+    return pages, timings, METRICS.drain()
+
+
+# ===================== PIPELINE =====================
+
+class StagedBatchRunner(BatchRunner):
+    """
+    BatchRunner that separates network-bound and CPU-bound work:
+
+        ingest thread -> async LLM workers -> render processes -> writer
+
+    `concurrency` coroutines on one event loop make the FAQ requests;
+    rendering and JSON validation run in a pool of `render_workers`
+    processes, each with its own precompiled template engine. Bounded
+    queues between the stages apply backpressure, so a slow stage holds
+    back the ones before it instead of buffering the catalog.
+    """
+
+    def __init__(self, *args, render_workers: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.render_workers = render_workers or Config.RENDER_WORKERS or os.cpu_count() or 1
+
+    # ===================== STAGES =====================
+
+    async def _products(self, input_path: str):
+        # ProductStream blocks on its queue: read it off the event loop
+        loop = asyncio.get_running_loop()
+        stream = iter(ProductStream(input_path, parser=self.parser))
+        done = object()
+        while True:
+            item = await loop.run_in_executor(None, next, stream, done)
+            if item is done:
+                return
+            yield item
+
+    def _stale(self, pid: str, page: str, variant: str, fingerprint: str) -> bool:
+        key = RunManifest.key(pid, f"{page}/{variant}" if variant else page)
+        return not self.manifest.check(key, fingerprint, self.sink.location(pid, page, variant))
+
+    async def _llm_worker(self, queue: asyncio.Queue, stats: BatchStats):
+        template, model, _ = self.pages["faq"]
+        while True:
+            group = await queue.get()
+            if group is None:
+                return
+
+            stale = [
+                (pid, product) for pid, product, product_fp in group
+                if not self.manifest.is_current(
+                    RunManifest.key(pid, "faq"),
+                    page_fingerprint(product_fp, template, model),
+                    self.sink.location(pid, "faq")
+                )
+            ]
+            faqs: Dict[str, List[dict]] = {}
+            share = 0.0
+            if stale:
+                try:
+                    start = time.perf_counter()
+                    generated = await self.faq_agent.agenerate_faq_batch(
+                        [p for _, p in stale], [self._facts(pid) for pid, _ in stale]
+                    )
+                    share = (time.perf_counter() - start) / len(stale)
+                    faqs = {pid: items for (pid, _), items in zip(stale, generated)}
+                except Exception as e:
+                    for pid, _, _ in group:
+                        self._record(pid, e, stats, True)
+                    continue
+
+            for pid, product, product_fp in group:
+                degraded = self._degraded(pid, faqs.get(pid))
+                facts = self._facts(pid)
+                jobs = []
+                for page, (template_path, page_model, _) in self.pages.items():
+                    fingerprint = page_fingerprint(product_fp, template_path, page_model)
+                    if self._stale(pid, page, "", fingerprint):
+                        args = (product, faqs[pid]) if page == "faq" else (product, facts)
+                        # Degraded pages are written but not recorded
+                        jobs.append((page, "", args, None if degraded and page == "faq" else fingerprint))
+                await self._dispatch(pid, jobs, stats, True, share if pid in faqs else 0.0, degraded)
+
+    async def _dispatch(self, pid: str, jobs: list, stats: BatchStats, completes: bool,
+                        llm_seconds: float = 0.0, degraded: bool = False):
+        if not jobs:
+            self._record(pid, {}, stats, completes)
+            return
+
+        # Backpressure: wait for a free render slot
+        await self._render_slots.acquire()
+        future = self._pool.submit(_render, pid, [(page, variant, args) for page, variant, args, _ in jobs])
+        task = asyncio.create_task(self._finish(
+            pid, jobs, asyncio.wrap_future(future), stats, completes, llm_seconds, degraded
+        ))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _finish(self, pid: str, jobs: list, future, stats: BatchStats,
+                      completes: bool, llm_seconds: float, degraded: bool):
+        try:
+            pages, timings, (events, counters) = await future
+        except Exception as e:
+            self._record(pid, e, stats, completes)
+            return
+        finally:
+            self._render_slots.release()
+
+        METRICS.merge(events, counters)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, pid, jobs, pages)
+        except Exception as e:
+            self._record(pid, e, stats, completes)
+            return
+        if degraded:
+            self._record(pid, DegradedOutput("FAQ request failed, fallback FAQs written"), stats, completes)
+            return
+        # Charge the product its share of the batched FAQ requests
+        if llm_seconds and timings.get("faq"):
+            timings["faq"][-1] += llm_seconds
+        self._record(pid, timings, stats, completes)
+
+    def _write(self, pid: str, jobs: list, pages: List[str]):
+        with METRICS.product(pid):
+            for (page, variant, _, fingerprint), content in zip(jobs, pages):
+                with METRICS.stage("write", page=page):
+                    location = self.sink.write(pid, page, content, variant)
+                if fingerprint is not None:
+                    key = RunManifest.key(pid, f"{page}/{variant}" if variant else page)
+                    self.manifest.record(key, fingerprint, location)
+
+    async def _drain(self):
+        while self._pending:
+            await asyncio.gather(*list(self._pending))
+
+    async def _pipeline(self, input_path: str, stats: BatchStats):
+        self._render_slots = asyncio.Semaphore(self.render_workers * 2)
+        self._pending: Set[asyncio.Task] = set()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._llm_worker(queue, stats)) for _ in range(self.concurrency)]
+
+        seen: Dict[str, int] = {}
+        group: List[Tuple[str, Product, str]] = []
+        async for index, raw, product, error in self._products(input_path):
+            if error is not None:
+                self._reject(index, error, stats)
+                continue
+            pid, product_fp = self._register(index, raw, product, seen)
+            if self._given_up(pid, stats):
+                continue
+            group.append((pid, product, product_fp))
+            if len(group) >= self.faq_batch_size:
+                await queue.put(group)
+                group = []
+        if group:
+            await queue.put(group)
+
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        await self._drain()
+
+        self._build_index()
+        for index, pid in enumerate(self._ids):
+            card, product_fp = self._cards[index], self._fingerprints[index]
+            facts = self._facts(pid)
+            jobs = []
+            for rival in self._rivals(index):
+                rid = self._ids[rival]
+                fingerprint = page_fingerprint(product_fp + self._fingerprints[rival], Config.TEMPLATE_COMPARISON)
+                if self._stale(pid, "comparison", rid, fingerprint):
+                    jobs.append(("comparison", rid, (card, self._cards[rival], facts, self._facts(rid)), fingerprint))
+            await self._dispatch(pid, jobs, stats, False)
+        await self._drain()
+
+    def run(self, input_path: str, output_dir: Optional[str] = None) -> BatchStats:
+        stats = BatchStats()
+        start = time.perf_counter()
+        self._start_run(input_path, output_dir)
+
+        print(
+            f"🚀 Staged batch: streaming {input_path}, llm_concurrency={self.concurrency}, "
+            f"render_workers={self.render_workers}, faq_batch={self.faq_batch_size}"
+        )
+
+        self._pool = ProcessPoolExecutor(max_workers=self.render_workers, initializer=_init_render_worker)
+        try:
+            # Start the render processes before the pipeline threads exist
+            list(self._pool.map(_warm, range(self.render_workers)))
+            asyncio.run(self._pipeline(input_path, stats))
+        except BaseException:
+            self._pool.shutdown()
+            self.sink.abort()
+            raise
+        else:
+            self._pool.shutdown()
+            self._close_sink(stats)
+        finally:
+            self.manifest.save()
+
+        return self._finish_run(stats, start)
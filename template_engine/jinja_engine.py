@@ -1,38 +1,139 @@
 # template_engine/jinja_engine.py
 
 import json
+import random
+import threading
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
+from typing import Dict, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from infrastructure.config import Config
+from infrastructure.instrumentation import METRICS
+from template_engine.schema import SchemaValidator, load_validator
+
+VALIDATION_MODES = ("always", "sample", "off")
+
 
 class JinjaEngine:
     """
     Simple JSON-safe Jinja template renderer.
+
+    Templates are compiled once (backed by an on-disk bytecode cache) and
+    kept in memory, so rendering cost does not grow with page count.
+
+    A template with a JSON Schema in `templates/schemas/` has its context
+    checked against the schema before rendering; the templates write
+    every value with `tojson`, so the output is JSON by construction.
+    Templates without a schema get their output parsed instead. Validation
+    can be switched to "sample" or "off".
     """
 
-    def __init__(self):
+    def __init__(self, templates_dir: Optional[Path] = None,
+                 validation: Optional[str] = None,
+                 sample_rate: Optional[float] = None):
         root_dir = Path(__file__).resolve().parents[1]
-        templates_dir = root_dir / "templates"
+        self.templates_dir = Path(templates_dir or root_dir / "templates")
+
+        self.validation = (validation or Config.TEMPLATE_VALIDATION).lower()
+        if self.validation not in VALIDATION_MODES:
+            raise ValueError(f"Unknown template validation mode: {self.validation}")
+        self.sample_rate = Config.TEMPLATE_VALIDATION_SAMPLE_RATE if sample_rate is None else sample_rate
+
+        bytecode_cache = None
+        if Config.TEMPLATE_BYTECODE_CACHE:
+            cache_dir = Path(Config.TEMPLATE_BYTECODE_CACHE)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
 
         self.env = Environment(
-            loader=FileSystemLoader(str(templates_dir)),
-            autoescape=False
+            loader=FileSystemLoader(str(self.templates_dir)),
+            autoescape=False,
+            bytecode_cache=bytecode_cache,
+            # Templates do not change while the process runs: skip the
+            # per-render mtime check.
+            auto_reload=False
         )
 
+        self._templates: Dict[str, Template] = {}
+        self._validators: Dict[str, Optional[SchemaValidator]] = {}
+        self._lock = threading.Lock()
+
+    def precompile(self) -> int:
+        """
+        Compiles every JSON template in the templates folder, and its
+        schema, up-front. Returns the number of templates loaded.
+        """
+        for path in sorted(self.templates_dir.glob("*.json")):
+            self.get_template(path.name)
+        return len(self._templates)
+
+    def get_template(self, template_path: str) -> Template:
+        template_name = Path(template_path).name
+        template = self._templates.get(template_name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(template_name)
+                if template is None:
+                    template = self.env.get_template(template_name)
+                    self._validators[template_name] = load_validator(self.templates_dir, template_name)
+                    self._templates[template_name] = template
+        return template
+
+    def get_validator(self, template_path: str) -> Optional[SchemaValidator]:
+        """
+        The schema validator of a template, or None when it has none.
+        """
+        self.get_template(template_path)
+        return self._validators[Path(template_path).name]
+
+    def _should_validate(self) -> bool:
+        if self.validation == "always":
+            return True
+        if self.validation == "sample":
+            return random.random() < self.sample_rate
+        return False
+
     def render_template_file(self, template_path: str, context: dict) -> str:
         """
         Renders a Jinja2 template into a JSON string.
-        Ensures the output is valid JSON.
+        Validates the context against the template's schema, or the output
+        as JSON when it has none (per the validation mode); a context that
+        fails raises TemplateValidationError.
         """
 
-        template_name = Path(template_path).name
-        template = self.env.get_template(template_name)
+        template = self.get_template(template_path)
+        validator = self._validators[template.name]
+        validate = self._should_validate()
+
+        if validate and validator is not None:
+            with METRICS.stage("validate", template=template.name):
+                validator.validate(context)
 
-        output = template.render(context)
+        with METRICS.stage("render", template=template.name):
+            output = template.render(context)
 
-        # Validate JSON (required for your assignment)
-        try:
-            json.loads(output)
-        except Exception as e:
-            raise ValueError(f"Template output is not valid JSON: {e}")
+        if validate and validator is None:
+            with METRICS.stage("validate", template=template.name):
+                try:
+                    json.loads(output)
+                except Exception as e:
+                    raise ValueError(f"Template output is not valid JSON: {e}")
 
         return output
+
+
+_ENGINE: Optional[JinjaEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_engine() -> JinjaEngine:
+    """
+    Process-wide engine shared by all agents, precompiled on first use.
+    """
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = JinjaEngine()
+            _ENGINE.precompile()
+        return _ENGINE
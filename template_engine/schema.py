@@ -0,0 +1,101 @@
+# template_engine/schema.py
+
+import json
+from collections.abc import Mapping
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class TemplateValidationError(ValueError):
+    """
+    A template context that does not match the template's schema.
+    `errors` is a list of (JSON path, message).
+    """
+
+    def __init__(self, template: str, errors: List[Tuple[str, str]]):
+        super().__init__(template, errors)
+        self.template = template
+        self.errors = errors
+
+    def __str__(self) -> str:
+        details = "; ".join(f"{path}: {message}" for path, message in self.errors[:3])
+        more = f" (+{len(self.errors) - 3} more)" if len(self.errors) > 3 else ""
+        return f"{self.template} context failed validation: {details}{more}"
+
+
+@lru_cache(maxsize=None)
+def _validator_class(base):
+    from jsonschema import validators
+
+    # Contexts hold Product fields: tuples count as arrays, any Mapping
+    # (Product included) as an object
+    checker = base.TYPE_CHECKER.redefine_many({
+        "array": lambda _, value: isinstance(value, (list, tuple)),
+        "object": lambda _, value: isinstance(value, Mapping),
+    })
+    return validators.extend(base, type_checker=checker)
+
+
+class SchemaValidator:
+    """
+    A JSON Schema checked once and bound to a jsonschema validator of its
+    draft, reused for every context.
+
+    `is_valid` only answers yes or no; the path and message of each error
+    are collected after a failure.
+    """
+
+    def __init__(self, schema: Dict[str, Any], name: str = "schema"):
+        self.schema = schema
+        self.name = name
+        # Imported with the first schema: jsonschema is slow to import
+        from jsonschema import validators
+
+        cls = _validator_class(validators.validator_for(schema))
+        cls.check_schema(schema)
+        self._validator = cls(schema)
+        self.is_valid = self._validator.is_valid
+
+    def errors(self, instance: Any) -> List[Tuple[str, str]]:
+        errors = []
+        # "required" yields one error per missing property, in the order
+        # the keyword lists them: (path, keyword) -> missing properties left
+        missing: Dict[Tuple[str, tuple], Iterator[str]] = {}
+        for error in self._validator.iter_errors(instance):
+            path = error.json_path
+            if error.validator == "required" and isinstance(error.instance, Mapping):
+                # Point at the missing property rather than its parent
+                where = (path, tuple(error.absolute_schema_path))
+                if where not in missing:
+                    missing[where] = iter([key for key in error.validator_value if key not in error.instance])
+                key = next(missing[where], None)
+                if key is not None:
+                    path = f"{path}.{key}"
+            errors.append((path, error.message))
+        return sorted(errors)
+
+    def validate(self, instance: Any):
+        """
+        Raises TemplateValidationError when `instance` does not match.
+        """
+        if not self.is_valid(instance):
+            raise TemplateValidationError(self.name, self.errors(instance) or [("$", "invalid")])
+
+
+def schema_path(templates_dir: Path, template_name: str) -> Path:
+    """
+    templates/schemas/<template stem>.schema.json
+    """
+    return Path(templates_dir) / "schemas" / f"{Path(template_name).stem}.schema.json"
+
+
+def load_validator(templates_dir: Path, template_name: str) -> Optional[SchemaValidator]:
+    """
+    The validator of a template, or None when it has no schema.
+    """
+    path = schema_path(templates_dir, template_name)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return SchemaValidator(json.load(f), name=Path(template_name).name)
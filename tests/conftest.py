@@ -0,0 +1,21 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+# Offline, deterministic runs: set before infrastructure.config is imported
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("LANGCHAIN_TRACING_V2", "false")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def product():
+    with open(ROOT / "input" / "product_data.json", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from orchestrator.batch_runner import BatchRunner, product_id
+
+
+def test_product_id_prefers_explicit_id_then_name():
+    assert product_id({"sku": "SKU 12", "product_name": "Serum"}, 0) == "sku-12"
+    assert product_id({"product_name": "GlowBoost Vitamin C Serum"}, 0) == "glowboost-vitamin-c-serum"
+    assert product_id({"product_name": "!!!"}, 7) == "product-7"
+
+
+@pytest.mark.parametrize("skus, expected", [
+    (["a", "a", "a-2"], ["a", "a-2", "a-2-2"]),
+    (["a-2", "a", "a"], ["a-2", "a", "a-3"]),
+    (["a", "a", "a", "b"], ["a", "a-2", "a-3", "b"]),
+])
+def test_duplicate_ids_never_collide(tmp_path, monkeypatch, product, skus, expected):
+    monkeypatch.setattr("infrastructure.config.Config.CHECKPOINT_ENABLED", False)
+    catalog = tmp_path / "catalog.jsonl"
+    with open(catalog, "w", encoding="utf-8") as f:
+        for n, sku in enumerate(skus):
+            f.write(json.dumps(dict(product, sku=sku, product_name=f"{product['product_name']} {n}")) + "\n")
+
+    runner = BatchRunner(concurrency=2, incremental=False, sink="files", analytics=False)
+    stats = runner.run(str(catalog), str(tmp_path / "out"))
+
+    assert stats.failed == 0
+    assert runner._ids == expected
+    for pid in expected:
+        assert (tmp_path / "out" / pid / "faq.json").exists()
+
+
+def test_unreadable_catalog_aborts_the_run(tmp_path, monkeypatch, product):
+    monkeypatch.setattr("infrastructure.config.Config.CHECKPOINT_ENABLED", False)
+    catalog = tmp_path / "catalog.jsonl"
+    with open(catalog, "w", encoding="utf-8") as f:
+        f.write(json.dumps(dict(product, sku="a")) + "\n")
+        f.write('{"sku": "b", "product_name\n')
+        f.write(json.dumps(dict(product, sku="c")) + "\n")
+
+    runner = BatchRunner(concurrency=2, sink="jsonl", analytics=False)
+    stats = runner.run(str(catalog), str(tmp_path / "out"))
+
+    assert stats.input_error and "line 2" in stats.input_error
+    assert runner._ids == ["a"]
+    # A stream sink does not publish an incomplete catalog
+    assert not list((tmp_path / "out").glob("*.jsonl"))
@@ -0,0 +1,60 @@
+from orchestrator.checkpoint import CheckpointJournal, RetryPolicy
+
+
+def _journal(tmp_path, attempts: int = 2) -> CheckpointJournal:
+    return CheckpointJournal(str(tmp_path / "checkpoint.sqlite"), RetryPolicy(max_attempts=attempts))
+
+
+def test_unfinished_run_is_resumed_with_its_pages(tmp_path):
+    journal = _journal(tmp_path)
+    assert not journal.start("catalog.jsonl")
+    journal.page_done("a/faq", "fp-a", "out/a/faq.json")
+    journal.close()
+
+    journal = _journal(tmp_path)
+    assert journal.start("catalog.jsonl")
+    assert journal.pages() == {"a/faq": ("fp-a", "out/a/faq.json")}
+    # Another input starts its own run
+    assert not _journal(tmp_path).start("other.jsonl")
+
+
+def test_finished_run_starts_over(tmp_path):
+    journal = _journal(tmp_path)
+    journal.start("catalog.jsonl")
+    journal.page_done("a/faq", "fp-a", "out/a/faq.json")
+    journal.finish()
+
+    assert not journal.start("catalog.jsonl")
+    assert journal.pages() == {}
+
+
+def test_failures_count_once_per_run_until_exhausted(tmp_path):
+    journal = _journal(tmp_path, attempts=2)
+    journal.start("catalog.jsonl")
+    assert journal.product_failed("a", RuntimeError("boom")) == 1
+    assert journal.product_failed("a", RuntimeError("again")) == 1
+    # A second failure would use up the last attempt
+    assert not journal.may_retry("a")
+    assert not journal.exhausted("a")
+    assert journal.retryable() == 1
+    journal.close()
+
+    journal = _journal(tmp_path, attempts=2)
+    journal.start("catalog.jsonl")
+    assert journal.product_failed("a", RuntimeError("boom")) == 2
+    assert journal.exhausted("a")
+    assert journal.retryable() == 0
+    assert journal.failures() == [("a", 2, "boom")]
+
+
+def test_product_done_clears_earlier_failures(tmp_path):
+    journal = _journal(tmp_path)
+    journal.start("catalog.jsonl")
+    journal.product_failed("a", RuntimeError("boom"))
+    journal.close()
+
+    journal = _journal(tmp_path)
+    journal.start("catalog.jsonl")
+    journal.product_done("a")
+    assert journal.attempts("a") == 0
+    assert journal.failures() == []
@@ -0,0 +1,78 @@
+from infrastructure.json_extract import JSONItemStream, extract_json
+
+ITEMS = '[{"question": "A?"}, {"question": "B?"}, {"question": "C?"}]'
+
+
+def test_well_formed_array_is_complete():
+    result = extract_json(ITEMS)
+    assert result.complete
+    assert [item["question"] for item in result.items] == ["A?", "B?", "C?"]
+
+
+def test_fenced_and_prose_wrapped_array():
+    result = extract_json(f"Here you go:\n```json\n{ITEMS}\n```\nEnjoy!")
+    assert result.complete
+    assert len(result.items) == 3
+
+
+def test_truncated_array_keeps_whole_items():
+    result = extract_json(ITEMS[:-20])
+    assert not result.complete
+    assert result.ok
+    assert [item["question"] for item in result.items] == ["A?", "B?"]
+    assert result.dropped == 0
+
+
+def test_near_json_syntax_is_repaired():
+    result = extract_json("[{'question': 'A?', 'answered': True}, {question: \"B?\"},]")
+    assert not result.complete
+    assert result.items == [{"question": "A?", "answered": True}, {"question": "B?"}]
+
+
+def test_unreadable_items_are_dropped_and_counted():
+    result = extract_json('[{"question": "A?"}, @@@, {"question": "B?"}]')
+    assert [item["question"] for item in result.items] == ["A?", "B?"]
+    assert result.dropped == 1
+
+
+def test_array_wrapped_in_object_is_unwrapped():
+    result = extract_json(f'{{"faqs": {ITEMS}}}')
+    assert len(result.items) == 3
+
+
+def test_nested_array_of_wrong_type_is_never_complete():
+    # An object with several lists is not the array that was asked for
+    result = extract_json('{"a": [1], "b": [2]}')
+    assert not result.complete
+
+
+def test_expected_object():
+    result = extract_json('{"p1": [{"question": "A?"}], "p2": []}', dict)
+    assert result.complete
+    assert result.value["p1"] == [{"question": "A?"}]
+    # An array where an object was asked for is never reported as complete
+    assert not extract_json(ITEMS, dict).complete
+
+
+def test_no_json_at_all():
+    for raw in ("", None, "Sorry, I cannot help with that."):
+        result = extract_json(raw)
+        assert not result.ok
+        assert result.items == []
+
+
+def test_item_stream_matches_whole_extraction():
+    reader = JSONItemStream()
+    seen = []
+    for i in range(0, len(ITEMS), 7):
+        seen.extend(reader.feed(ITEMS[i:i + 7]))
+    assert seen == extract_json(ITEMS).items
+    assert reader.close().complete
+
+
+def test_item_stream_salvages_cut_off_tail():
+    reader = JSONItemStream()
+    reader.feed(ITEMS[:-20])
+    result = reader.close()
+    assert not result.complete
+    assert [item["question"] for item in result.items] == ["A?", "B?"]
@@ -0,0 +1,62 @@
+from infrastructure.llm_cache import LLMCache, cache_key
+
+
+def _request(**changes) -> dict:
+    request = {
+        "model": "m",
+        "messages": [{"role": "system", "content": "S"}, {"role": "user", "content": "P"}],
+        "temperature": 0.2,
+        "max_tokens": 100,
+    }
+    request.update(changes)
+    return request
+
+
+def test_key_covers_every_request_parameter():
+    key = cache_key(_request())
+    assert cache_key(_request()) == key
+    assert cache_key(dict(reversed(list(_request().items())))) == key
+    for changes in (
+        {"model": "other"},
+        {"temperature": 0.3},
+        {"max_tokens": 101},
+        {"stop": ["\n\n"]},
+        {"messages": [{"role": "system", "content": "S2"}, {"role": "user", "content": "P"}]},
+    ):
+        assert cache_key(_request(**changes)) != key, changes
+
+
+def test_memory_and_disk_levels(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMCache(path, memory_size=1)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("b") == "B"
+    assert cache.get("a") == "A"            # evicted from memory, read from disk
+    assert cache.get("c") is None
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 1, "misses": 1, "writes": 2}
+    cache.close()
+
+    reopened = LLMCache(path)
+    assert reopened.get("a") == "A"
+    reopened.close()
+
+
+def test_delete_drops_both_levels(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"))
+    cache.put("a", "A")
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.delete("missing")
+    cache.close()
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("infrastructure.llm_cache.time.time", lambda: now[0])
+    cache = LLMCache(ttl=10)
+    cache.put("a", "A")
+    now[0] += 5
+    assert cache.get("a") == "A"
+    now[0] += 10
+    assert cache.get("a") is None
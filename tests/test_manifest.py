@@ -0,0 +1,16 @@
+from orchestrator.manifest import RunManifest
+
+
+def test_prune_drops_unchecked_comparisons_of_current_products(tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.json"))
+    for key in ("a/faq", "a/comparison/b", "a/comparison/c", "z/comparison/a"):
+        manifest.record(key, "fp", f"out/{key}")
+    manifest.save()
+
+    manifest = RunManifest(str(tmp_path / "manifest.json"))
+    manifest.check("a/faq", "fp")
+    manifest.check("a/comparison/b", "fp")
+
+    # z is not in this run's catalog: its pages are left alone
+    assert manifest.prune("comparison", {"a"}) == ["out/a/comparison/c"]
+    assert sorted(manifest.pages) == ["a/comparison/b", "a/faq", "z/comparison/a"]
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from infrastructure.page_store import INDEX_FILE, SEGMENT_FILE, PageStore, SegmentSink, compact
+
+
+def _page(n: int) -> str:
+    return json.dumps({"title": f"Page {n}", "items": list(range(n))}, indent=2)
+
+
+def _crash(sink: SegmentSink):
+    # Stops the sink like a killed process: no index written
+    sink._file.close()
+    sink._writer_lock.close()
+
+
+def test_pages_round_trip(tmp_path):
+    with SegmentSink(str(tmp_path)) as sink:
+        for n in range(5):
+            sink.write(f"p{n}", "faq", _page(n))
+        sink.write("p0", "comparison", _page(9), variant="p1")
+
+    with PageStore(str(tmp_path)) as store:
+        assert len(store) == 6
+        assert store.load("p3", "faq") == json.loads(_page(3))
+        assert store.load("p0", "comparison", "p1") == json.loads(_page(9))
+        assert store.get("missing", "faq") is None
+        assert ("p0", "comparison", "p1") in store
+        assert sorted(store.keys())[0] == ("p0", "comparison", "p1")
+
+
+def test_unindexed_tail_is_merged_with_index(tmp_path):
+    with SegmentSink(str(tmp_path)) as sink:
+        sink.write("a", "faq", _page(1))
+        sink.write("b", "faq", _page(2))
+
+    sink = SegmentSink(str(tmp_path))
+    sink.write("a", "faq", _page(3))        # supersedes an indexed page
+    sink.write("c", "faq", _page(4))        # new page past the index
+    _crash(sink)
+
+    with PageStore(str(tmp_path)) as store:
+        assert len(store) == 3
+        assert store.load("a", "faq") == json.loads(_page(3))
+        assert store.load("b", "faq") == json.loads(_page(2))
+        assert store.load("c", "faq") == json.loads(_page(4))
+
+
+def test_torn_last_record_is_cut_off(tmp_path):
+    sink = SegmentSink(str(tmp_path))
+    sink.write("a", "faq", _page(1))
+    sink.write("b", "faq", _page(2))
+    _crash(sink)
+
+    segment = tmp_path / SEGMENT_FILE
+    whole = segment.stat().st_size
+    with open(segment, "r+b") as f:
+        f.truncate(whole - 5)
+
+    with PageStore(str(tmp_path)) as store:
+        assert list(store.keys()) == [("a", "faq", "")]
+
+    # The next writer truncates the torn record and appends after it
+    with SegmentSink(str(tmp_path)) as sink:
+        assert sink.exists(sink.location("a", "faq"))
+        assert not sink.exists(sink.location("b", "faq"))
+        sink.write("b", "faq", _page(5))
+
+    with PageStore(str(tmp_path)) as store:
+        assert store.load("a", "faq") == json.loads(_page(1))
+        assert store.load("b", "faq") == json.loads(_page(5))
+
+
+def test_compaction_keeps_latest_pages(tmp_path):
+    with SegmentSink(str(tmp_path)) as sink:
+        for round_ in range(3):
+            for n in range(4):
+                sink.write(f"p{n}", "faq", _page(n + round_))
+
+    with PageStore(str(tmp_path)) as store:
+        before = {key: store.load(*key) for key in store.keys()}
+        stats = store.stats()
+        assert stats["live_bytes"] < stats["segment_bytes"]
+
+    result = compact(str(tmp_path))
+    assert result["pages"] == 4
+    assert result["after_bytes"] < result["before_bytes"]
+    assert (tmp_path / INDEX_FILE).exists()
+
+    with PageStore(str(tmp_path)) as store:
+        assert {key: store.load(*key) for key in store.keys()} == before
+        stats = store.stats()
+        assert stats["live_bytes"] == stats["segment_bytes"]
+
+
+def test_open_store_follows_appends_and_compaction(tmp_path):
+    with SegmentSink(str(tmp_path)) as sink:
+        sink.write("a", "faq", _page(1))
+        sink.write("a", "faq", _page(2))
+
+    store = PageStore(str(tmp_path))
+    view = store.get("a", "faq")
+
+    with SegmentSink(str(tmp_path)) as sink:
+        sink.write("b", "faq", _page(3))
+    assert store.refresh() == 1
+    assert store.load("b", "faq") == json.loads(_page(3))
+
+    compact(str(tmp_path))
+    assert store.refresh() == 2
+    assert store.load("a", "faq") == json.loads(_page(2))
+    # Views handed out before stay readable
+    assert json.loads(bytes(view)) == json.loads(_page(2))
+    view.release()
+    store.close()
+
+
+def test_compaction_refused_while_a_run_writes(tmp_path):
+    sink = SegmentSink(str(tmp_path))
+    sink.write("a", "faq", _page(1))
+    with pytest.raises(BlockingIOError):
+        compact(str(tmp_path))
+    sink.close()
+    assert compact(str(tmp_path))["pages"] == 1
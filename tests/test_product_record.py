@@ -0,0 +1,52 @@
+import pickle
+
+from agents.product_record import Product, new_vocabularies
+
+
+def _product(name, ingredients, vocabularies=None):
+    return Product(product_name=name, key_ingredients=ingredients, vocabularies=vocabularies)
+
+
+def test_ids_are_sorted_distinct_16_bit_arrays():
+    product = _product("A", ["Retinol", "Niacinamide", "Retinol"])
+    assert product.ingredient_ids.typecode == "H"
+    assert list(product.ingredient_ids) == sorted(set(product.ingredient_ids))
+    assert len(product.ingredient_ids) == 2
+
+
+def test_shared_and_unique_ingredients():
+    vocabularies = new_vocabularies()
+    a = _product("A", ["Retinol", "Niacinamide", "Squalane"], vocabularies)
+    b = _product("B", ["Squalane", "Retinol"], vocabularies)
+
+    assert a.shared_ingredients(b) == ["Retinol", "Squalane"]
+    assert b.shared_ingredients(a) == ["Squalane", "Retinol"]
+    assert a.has_unique_ingredients(b)
+    assert not b.has_unique_ingredients(a)
+    assert not a.has_unique_ingredients(a)
+
+
+def test_products_of_different_generations_compare_by_value():
+    a = _product("A", ["Retinol", "Ceramides"], new_vocabularies())
+    b = _product("B", ["Ceramides", "Peptides"], new_vocabularies())
+
+    assert a.vocabularies is not b.vocabularies
+    assert a.shared_ingredients(b) == ["Ceramides"]
+    assert a.has_unique_ingredients(b)
+    assert b.has_unique_ingredients(a)
+
+
+def test_single_string_and_unhashable_items():
+    vocabularies = new_vocabularies()
+    a = _product("A", "Retinol", vocabularies)
+    b = _product("B", [["Retinol"], "Retinol"], vocabularies)
+    assert a.shared_ingredients(b) == ["Retinol"]
+    assert b.shared_ingredients(a) == ["Retinol"]
+    assert b.has_unique_ingredients(a)
+
+
+def test_pickled_product_is_rebuilt():
+    product = _product("A", ["Retinol"])
+    copy = pickle.loads(pickle.dumps(product))
+    assert copy.as_dict() == product.as_dict()
+    assert copy.shared_ingredients(product) == ["Retinol"]
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+
+from infrastructure.config import Config
+from template_engine.schema import SchemaValidator, TemplateValidationError, load_validator
+
+SCHEMA = {
+    "type": "object",
+    "required": ["name", "items"],
+    "properties": {
+        "name": {"type": "string", "minLength": 1},
+        "items": {
+            "type": "array",
+            "items": {"type": "object", "required": ["question"]},
+        },
+    },
+}
+
+
+def test_valid_context_passes():
+    validator = SchemaValidator(SCHEMA, "page.json")
+    validator.validate({"name": "Serum", "items": [{"question": "Why?"}]})
+
+
+def test_tuples_and_mappings_count_as_arrays_and_objects():
+    from types import MappingProxyType
+
+    validator = SchemaValidator(SCHEMA)
+    assert validator.is_valid(MappingProxyType({"name": "Serum", "items": ({"question": "Why?"},)}))
+
+
+def test_errors_point_at_the_offending_value():
+    validator = SchemaValidator(SCHEMA, "page.json")
+    with pytest.raises(TemplateValidationError) as raised:
+        validator.validate({"name": "", "items": [{"question": "Why?"}, {}]})
+    paths = [path for path, _ in raised.value.errors]
+    assert paths == ["$.items[1].question", "$.name"]
+    assert "page.json" in str(raised.value)
+
+
+def test_missing_properties_are_reported_by_name():
+    errors = SchemaValidator(SCHEMA).errors({})
+    assert [path for path, _ in errors] == ["$.items", "$.name"]
+
+
+def test_invalid_schema_is_rejected():
+    from jsonschema.exceptions import SchemaError
+
+    with pytest.raises(SchemaError):
+        SchemaValidator({"type": "not-a-type"})
+
+
+@pytest.mark.parametrize("template", [Config.TEMPLATE_FAQ, Config.TEMPLATE_PRODUCT, Config.TEMPLATE_COMPARISON])
+def test_shipped_schemas_load(template):
+    templates_dir = Path(__file__).resolve().parent.parent / "templates"
+    assert load_validator(templates_dir, Path(template).name) is not None
+
+
+def test_each_missing_property_gets_its_own_path():
+    schema = {"type": "object", "required": ["alpha", "beta", "gamma"]}
+    errors = SchemaValidator(schema).errors({"beta": 1})
+    assert [path for path, _ in errors] == ["$.alpha", "$.gamma"]
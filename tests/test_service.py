@@ -0,0 +1,30 @@
+import json
+
+from orchestrator.service import DropDirWatcher, GenerationService
+
+
+def test_outbox_results_never_overwrite_each_other(tmp_path, product):
+    service = GenerationService(output_dir=str(tmp_path / "out"), workers=2)
+    watcher = DropDirWatcher(service, str(tmp_path / "drop"))
+    try:
+        for name in ("catalog.json", "catalog.jsonl", "catalog.json"):
+            (watcher.dirs["inbox"] / name).write_text(json.dumps(product), encoding="utf-8")
+            assert watcher.poll() == 1
+    finally:
+        service.close()
+
+    results = sorted(watcher.dirs["outbox"].glob("*.result.json"))
+    assert len(results) == 3
+    assert {json.loads(path.read_text())["input"] for path in results} == {"catalog.json", "catalog.jsonl"}
+
+
+def test_manifest_is_saved_on_an_interval_and_at_close(tmp_path, product, monkeypatch):
+    monkeypatch.setattr("infrastructure.config.Config.SERVICE_MANIFEST_INTERVAL", 3600.0)
+    service = GenerationService(output_dir=str(tmp_path / "out"), workers=2)
+    manifest = tmp_path / "out" / "manifest.json"
+    try:
+        service.generate([product])
+        assert not manifest.exists()
+    finally:
+        service.close()
+    assert json.loads(manifest.read_text())["pages"]
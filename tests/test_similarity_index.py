@@ -0,0 +1,49 @@
+import random
+
+from agents.similarity_index import SimilarityIndex, product_features
+
+
+def _catalog(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    ingredients = [f"ingredient {n}" for n in range(30)]
+    return [
+        {
+            "key_ingredients": rng.sample(ingredients, rng.randint(0, 4)),
+            "benefits": [f"benefit {rng.randrange(8)}"],
+            "skin_type": rng.choice([["Oily"], ["Dry"], ["Oily", "Dry"]]),
+        }
+        for _ in range(size)
+    ]
+
+
+def _jaccard(a, b) -> float:
+    a, b = set(product_features(a)), set(product_features(b))
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+def test_scores_match_brute_force_jaccard():
+    products = _catalog(120)
+    index = SimilarityIndex(products)
+    for i in range(0, len(products), 7):
+        candidates, scores = index.scores(i)
+        assert i not in candidates.tolist()
+        expected = {j: _jaccard(products[i], p) for j, p in enumerate(products) if j != i}
+        expected = {j: s for j, s in expected.items() if s > 0}
+        assert dict(zip(candidates.tolist(), scores.tolist())) == expected
+
+
+def test_top_k_is_best_first_with_catalog_order_ties():
+    products = _catalog(80)
+    index = SimilarityIndex(products)
+    for i in range(len(products)):
+        expected = sorted(
+            ((j, _jaccard(products[i], p)) for j, p in enumerate(products) if j != i),
+            key=lambda pair: (-pair[1], pair[0]),
+        )
+        expected = [(j, s) for j, s in expected if s > 0][:3]
+        assert index.top_k(i, 3) == expected
+
+
+def test_product_without_features_has_no_rivals():
+    index = SimilarityIndex([{"key_ingredients": []}, {"key_ingredients": ["Retinol"]}])
+    assert index.top_k(0, 3) == []